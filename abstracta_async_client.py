@@ -0,0 +1,513 @@
+import asyncio
+import json
+import time
+from collections import deque
+from abstracta_client import (
+    ABSTRACTA_ASSIGN_PARALLELISM,
+    ABSTRACTA_CATALOG_PAGE_SIZE,
+    ABSTRACTA_METADATA_API_URL,
+    ABSTRACTA_PAGE_SIZE,
+    ABSTRACTA_READ_PARALLELISM,
+    AbstractaClientBase,
+    DataPage,
+    ThroughputReport,
+    token_manager,
+)
+from abstracta_cache import metadata_cache
+from client_metrics import instrumented
+from abstracta_transport import AsyncAbstractaTransport, get_async_transport
+from query_builder import QuerySpec
+from single_flight import async_single_flight, request_key
+from user_directory import ABSTRACTA_USER_PAGE_SIZE, user_directory
+from api_builder_agent import APIBuilderPayload
+from dq_rules_builder_agent import DQRulesBuilderPayload
+from profile_builder_agent import ProfileBuilderPayload
+
+
+class AsyncAbstractaClient(AbstractaClientBase):
+    """
+    Non-blocking mirror of AbstractaClient for use inside `async def` pipeline
+    steps. Every I/O method has the same name and arguments as its
+    AbstractaClient counterpart and must be awaited; the URL generators are
+    shared and stay synchronous.
+    """
+
+    def __init__(self, transport: AsyncAbstractaTransport | None = None) -> None:
+        super().__init__()
+        self._transport = transport
+
+    @property
+    def transport(self) -> AsyncAbstractaTransport:
+        # Resolved lazily so the client can be constructed outside a running loop.
+        if self._transport is None:
+            self._transport = get_async_transport()
+        return self._transport
+
+    @instrumented
+    async def perform_auth(self, force_refresh: bool = False):
+        return await token_manager.get_token_async(
+            self.request_access_token, force_refresh=force_refresh
+        )
+
+    async def request_access_token(self):
+        url = self.generate_auth_url()
+        headers = {"content-type": "application/x-www-form-urlencoded"}
+
+        response = await self.transport.post(
+            url, headers=headers, content=self._auth_payload()
+        )
+        return self._check_response(response, "Failed to authenticate")
+
+    async def _post(self, access_token: str, url: str, payload, error_message: str):
+        if not self._is_query_url(url):
+            return await self._send(access_token, url, payload, error_message)
+        return await async_single_flight.do(
+            request_key(access_token, url, payload),
+            lambda: self._send(access_token, url, payload, error_message),
+        )
+
+    async def _send(self, access_token: str, url: str, payload, error_message: str):
+        response = await self.transport.post(
+            url, headers=self._auth_headers(access_token), json=payload
+        )
+        return self._check_response(response, error_message)
+
+    @instrumented
+    async def fetch_page(
+        self,
+        access_token: str,
+        api_url: str,
+        from_: int,
+        to: int,
+        query: QuerySpec | None = None,
+    ) -> DataPage:
+        payload = self._data_payload(from_=from_, to=to, query=query)
+        return await async_single_flight.do(
+            request_key(access_token, api_url, payload),
+            lambda: self._fetch_page(access_token, api_url, from_, to, payload),
+        )
+
+    async def _fetch_page(
+        self, access_token: str, api_url: str, from_: int, to: int, payload
+    ) -> DataPage:
+        started = time.perf_counter()
+        response = await self.transport.post(
+            api_url, headers=self._auth_headers(access_token), json=payload
+        )
+        rows = self._check_response(response, "Failed to get data")
+        return DataPage(
+            from_=from_,
+            to=to,
+            rows=rows,
+            nbytes=len(response.content),
+            elapsed=time.perf_counter() - started,
+        )
+
+    @instrumented
+    async def get_data_from_api_url(
+        self,
+        access_token: str,
+        api_url: str,
+        from_: int = 1,
+        to: int = 100,
+        query: QuerySpec | None = None,
+    ):
+        page = await self.fetch_page(
+            access_token, api_url, from_=from_, to=to, query=query
+        )
+        return page.rows
+
+    @instrumented
+    async def iter_data_from_api_url(
+        self,
+        access_token: str,
+        api_url: str,
+        page_size: int = ABSTRACTA_PAGE_SIZE,
+        limit: int | None = None,
+        batches: bool = False,
+        query: QuerySpec | None = None,
+        start: int = 1,
+    ):
+        """Async-iterator counterpart of AbstractaClient.iter_data_from_api_url."""
+        for from_, to in self._iter_page_windows(page_size, limit, start):
+            page = await self.fetch_page(
+                access_token, api_url, from_=from_, to=to, query=query
+            )
+            if page.rows:
+                if batches:
+                    yield page.rows
+                else:
+                    for row in page.rows:
+                        yield row
+            if page.is_last:
+                break
+
+    @instrumented
+    async def read_data_parallel(
+        self,
+        access_token: str,
+        api_url: str,
+        page_size: int = ABSTRACTA_PAGE_SIZE,
+        parallelism: int = ABSTRACTA_READ_PARALLELISM,
+        limit: int | None = None,
+        report: ThroughputReport | None = None,
+        query: QuerySpec | None = None,
+    ):
+        """
+        Async counterpart of AbstractaClient.read_data_parallel: up to
+        `parallelism` page windows are fetched concurrently as tasks and the
+        pages are yielded in row order.
+        """
+        if parallelism < 1:
+            raise ValueError(f"parallelism must be positive, got {parallelism}")
+        report = report if report is not None else ThroughputReport()
+        report.start(page_size, parallelism)
+        windows = self._iter_page_windows(page_size, limit)
+        in_flight = deque()
+
+        def schedule_next():
+            window = next(windows, None)
+            if window is not None:
+                in_flight.append(
+                    asyncio.create_task(
+                        self.fetch_page(
+                            access_token, api_url, window[0], window[1], query
+                        )
+                    )
+                )
+
+        try:
+            for _ in range(parallelism):
+                schedule_next()
+            while in_flight:
+                page = await in_flight.popleft()
+                report.record(page)
+                if page.rows:
+                    yield page.rows
+                if page.is_last:
+                    break
+                schedule_next()
+        finally:
+            report.stop()
+            for task in in_flight:
+                task.cancel()
+
+    def iter_data(
+        self,
+        access_token: str,
+        org: str,
+        app: str,
+        datasource: str,
+        service: str,
+        version: str,
+        page_size: int = ABSTRACTA_PAGE_SIZE,
+        limit: int | None = None,
+        batches: bool = False,
+        query: QuerySpec | None = None,
+        start: int = 1,
+    ):
+        url = self.generate_api_url(org, app, datasource, service, version)
+        return self.iter_data_from_api_url(
+            access_token=access_token,
+            api_url=url,
+            page_size=page_size,
+            limit=limit,
+            batches=batches,
+            query=query,
+            start=start,
+        )
+
+    @instrumented
+    async def get_data(
+        self,
+        access_token: str,
+        org: str,
+        app: str,
+        datasource: str,
+        service: str,
+        version: str,
+        query: QuerySpec | None = None,
+    ):
+        url = self.generate_api_url(org, app, datasource, service, version)
+        return await self.get_data_from_api_url(
+            access_token=access_token, api_url=url, query=query
+        )
+
+    @instrumented
+    async def get_data_sources(self, access_token: str, org: str, app: str):
+        data_sources = metadata_cache.get("data_sources", org, app)
+        if data_sources is not None:
+            return data_sources
+
+        request_url = self.generate_system_api_url("dq_databases", "0.0.0")
+
+        data = await self._post(
+            access_token,
+            request_url,
+            self._data_sources_payload(org, app),
+            "Failed to get data sources",
+        )
+        data_sources = [item["dqdb_db_name"] for item in data]
+        metadata_cache.set("data_sources", data_sources, org, app)
+        return data_sources
+
+    @instrumented
+    async def get_organizations(self, access_token: str):
+        data = metadata_cache.get("organizations")
+        if data is None:
+            request_url = self.generate_system_api_url("dq_org", "0.0.0")
+
+            data = await self._post(
+                access_token,
+                request_url,
+                self._organizations_payload(),
+                "Failed to get organizations",
+            )
+            metadata_cache.set("organizations", data)
+        self.organizations = data
+        return [item["org_name"] for item in data]
+
+    @instrumented
+    async def get_applications(self, access_token: str, org: str):
+        applications = metadata_cache.get("applications", org)
+        if applications is not None:
+            return applications
+
+        request_url = self.generate_system_api_url("dq_apps", "2.0.0")
+
+        data = await self._post(
+            access_token,
+            request_url,
+            self._applications_payload(org),
+            "Failed to get applications",
+        )
+        applications = [item["app_name"] for item in data]
+        metadata_cache.set("applications", applications, org)
+        return applications
+
+    @instrumented
+    async def get_profiles(self, access_token: str, org: str):
+        profiles = metadata_cache.get("profiles", org)
+        if profiles is not None:
+            return profiles
+
+        request_url = self.generate_system_api_url("dq_profiles", "0.0.0")
+
+        profiles = await self._post(
+            access_token,
+            request_url,
+            self._profiles_payload(org),
+            "Failed to get applications",
+        )
+        metadata_cache.set("profiles", profiles, org)
+        return profiles
+
+    @instrumented
+    async def get_users(self, access_token: str):
+        request_url = self.generate_system_api_url("vw_users", "0.0.0")
+
+        data = await self._post(
+            access_token, request_url, self._users_payload(), "Failed to get users"
+        )
+        self.users = data
+        return data
+
+    @instrumented
+    async def create_api(self, access_token: str, prmServiceInfo: APIBuilderPayload):
+        response_json = await self._post(
+            access_token,
+            self._create_api_url(prmServiceInfo),
+            prmServiceInfo.model_dump(),
+            "Failed to create API",
+        )
+        self._evict_created_service(prmServiceInfo)
+        return response_json
+
+    @instrumented
+    async def grant_service_access(
+        self,
+        access_token: str,
+        org: str,
+        app: str,
+        datasource: str,
+        service: str,
+        version: str,
+        userId: list[str],
+        roleName: list[str],
+    ):
+        url = self._grant_service_access_url(org, app, datasource, service, version)
+
+        payload = {"userIdCsv": ",".join(userId), "roleNameCsv": ",".join(roleName)}
+
+        return await self._post(
+            access_token, url, payload, "Failed to grant service access"
+        )
+
+    @instrumented
+    async def add_data_quality_rule(
+        self, access_token: str, payload: DQRulesBuilderPayload
+    ):
+        url = self._data_quality_rule_url(payload)
+
+        payload = json.loads(payload.dqRuleParametersPayloadJson)
+
+        response_json = await self._post(
+            access_token, url, payload, "Failed to add data quality rule"
+        )
+        self._check_status_body(
+            response_json, "Failed to add data quality rule", "Status"
+        )
+
+    @instrumented
+    async def add_profile(self, access_token: str, payload: ProfileBuilderPayload):
+        if not self.organizations:
+            await self.get_organizations(access_token=access_token)
+        org_id = self._find_org_id(payload.orgName)
+        url = f"{ABSTRACTA_METADATA_API_URL}/admin/orgs/find/{org_id}/profiles/add"
+
+        response_json = await self._post(
+            access_token,
+            url,
+            self._profile_payload(org_id, payload),
+            "Failed to add profile",
+        )
+        self._check_status_body(response_json, "Failed to add profile", "status")
+        metadata_cache.invalidate("profiles", payload.orgName)
+
+    @instrumented
+    async def iter_users(
+        self,
+        access_token: str,
+        page_size: int = ABSTRACTA_USER_PAGE_SIZE,
+        after_user_sys_no=None,
+    ):
+        """Async-iterator counterpart of AbstractaClient.iter_users."""
+        request_url = self.generate_system_api_url("vw_users", "0.0.0")
+
+        for from_, to in self._iter_page_windows(page_size):
+            page = await self._post(
+                access_token,
+                request_url,
+                self._users_page_payload(from_, to, after_user_sys_no),
+                "Failed to get users",
+            )
+            for user in page:
+                yield user
+            if len(page) < to - from_ + 1:
+                break
+
+    @instrumented
+    async def refresh_user_directory(self, access_token: str, full: bool = False):
+        after_user_sys_no = None if full else user_directory.last_user_sys_no
+        user_directory.merge(
+            [
+                user
+                async for user in self.iter_users(
+                    access_token, after_user_sys_no=after_user_sys_no
+                )
+            ],
+            replace=after_user_sys_no is None,
+        )
+
+    async def _resolve_users(self, access_token: str, user_names: list[str]):
+        if user_directory.is_stale():
+            await self.refresh_user_directory(access_token, full=True)
+        found, missing = user_directory.find(user_names)
+        if missing:
+            await self.refresh_user_directory(access_token)
+            found, missing = user_directory.find(user_names)
+        return found, missing
+
+    @instrumented
+    async def assign_profile_to_user(self, access_token: str, user_sys_no, profile_id):
+        response_json = await self._post(
+            access_token,
+            self._profile_attribute_url(user_sys_no),
+            self._profile_attribute_payload(user_sys_no, profile_id),
+            "Failed to add profile",
+        )
+        self._check_status_body(response_json, "Failed to add profile", "status")
+
+    @instrumented
+    async def assign_profile_to_users(
+        self,
+        access_token: str,
+        payload: ProfileBuilderPayload,
+        parallelism: int = ABSTRACTA_ASSIGN_PARALLELISM,
+    ):
+        """Async counterpart of AbstractaClient.assign_profile_to_users."""
+        if not self.organizations:
+            await self.get_organizations(access_token=access_token)
+
+        self._find_org_id(payload.orgName)
+        profile_id = self._find_profile_id(
+            await self.get_profiles(access_token=access_token, org=payload.orgName),
+            payload,
+        )
+        found, _ = await self._resolve_users(access_token, payload.user_names)
+        semaphore = asyncio.Semaphore(parallelism)
+
+        async def assign(user_name):
+            async with semaphore:
+                try:
+                    await self.assign_profile_to_user(
+                        access_token, found[user_name]["user_sys_no"], profile_id
+                    )
+                except Exception as e:
+                    return user_name, str(e)
+                return user_name, None
+
+        outcomes = dict(await asyncio.gather(*(assign(name) for name in found)))
+        return self._assignment_results(payload.user_names, found, outcomes)
+
+    @instrumented
+    async def get_services(
+        self, access_token: str, org: str, app: str, datasource: str
+    ):
+        services = metadata_cache.get("services", org, app, datasource)
+        if services is not None:
+            return services
+
+        request_url = self.generate_system_api_url("vw_db_tables", "0.0.0")
+
+        services = await self._post(
+            access_token,
+            request_url,
+            self._services_payload(org, app, datasource),
+            "Failed to get services",
+        )
+        metadata_cache.set("services", services, org, app, datasource)
+        return services
+
+    @instrumented
+    async def get_all_services(self, access_token: str):
+        request_url = self.generate_system_api_url("vw_db_tables", "0.0.0")
+
+        return await self._post(
+            access_token,
+            request_url,
+            self._all_services_payload(),
+            "Failed to get all services",
+        )
+
+    @instrumented
+    async def iter_all_services(
+        self,
+        access_token: str,
+        page_size: int = ABSTRACTA_CATALOG_PAGE_SIZE,
+        created_after=None,
+    ):
+        """Async-iterator counterpart of AbstractaClient.iter_all_services."""
+        request_url = self.generate_system_api_url("vw_db_tables", "0.0.0")
+
+        for from_, to in self._iter_page_windows(page_size):
+            page = await self._post(
+                access_token,
+                request_url,
+                self._catalog_payload(from_, to, created_after),
+                "Failed to get all services",
+            )
+            for row in page:
+                yield row
+            if len(page) < to - from_ + 1:
+                break
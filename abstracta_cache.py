@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Seconds each kind of metadata stays fresh. Organizations and applications
+# are rarely created; services change whenever an API is built.
+ABSTRACTA_METADATA_TTLS = {
+    "organizations": float(os.getenv("ABSTRACTA_CACHE_TTL_ORGANIZATIONS", "600")),
+    "applications": float(os.getenv("ABSTRACTA_CACHE_TTL_APPLICATIONS", "300")),
+    "data_sources": float(os.getenv("ABSTRACTA_CACHE_TTL_DATA_SOURCES", "300")),
+    "services": float(os.getenv("ABSTRACTA_CACHE_TTL_SERVICES", "60")),
+    "profiles": float(os.getenv("ABSTRACTA_CACHE_TTL_PROFILES", "60")),
+}
+# Upper bound on cached keys per entity; least recently used keys go first.
+ABSTRACTA_CACHE_MAX_ENTRIES = int(os.getenv("ABSTRACTA_CACHE_MAX_ENTRIES", "256"))
+
+
+class TTLCache:
+    """A thread-safe LRU mapping whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, ttl: float, max_entries: int = ABSTRACTA_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return the cached value, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one key, or every key when `key` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "ttl": self.ttl,
+            }
+
+
+class MetadataCache:
+    """
+    Per-entity TTL caches for the org → app → datasource → service hierarchy.
+
+    Keys are the hierarchy path of the lookup (e.g. `("org", "app")` for data
+    sources) and are scoped to the `forUser` identity the query runs as,
+    since Abstracta filters metadata by that user.
+    """
+
+    def __init__(
+        self,
+        ttls: dict = ABSTRACTA_METADATA_TTLS,
+        max_entries: int = ABSTRACTA_CACHE_MAX_ENTRIES,
+    ):
+        self.enabled = os.getenv("ABSTRACTA_CACHE_ENABLED", "true").lower() == "true"
+        self.caches = {
+            entity: TTLCache(ttl, max_entries) for entity, ttl in ttls.items()
+        }
+
+    def _key(self, key: tuple):
+        return (os.getenv("ABSTRACTA_FOR_USER"), *key)
+
+    def get(self, entity: str, *key):
+        if not self.enabled:
+            return None
+        return self.caches[entity].get(self._key(key))
+
+    def set(self, entity: str, value, *key):
+        if self.enabled:
+            self.caches[entity].set(self._key(key), value)
+
+    def invalidate(self, entity: str, *key):
+        """Evict `entity` for the given path, or all of `entity` when no path is given."""
+        if key:
+            self.caches[entity].invalidate(self._key(key))
+        else:
+            self.caches[entity].invalidate()
+
+    def clear(self):
+        for cache in self.caches.values():
+            cache.invalidate()
+
+    def stats(self) -> dict:
+        return {entity: cache.stats() for entity, cache in self.caches.items()}
+
+
+metadata_cache = MetadataCache()
@@ -1,39 +1,241 @@
+import asyncio
 import json
-from nt import access
-import requests
+import threading
+import time
+import weakref
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from dotenv import load_dotenv
+from abstracta_cache import metadata_cache
+from client_metrics import bind_operation, instrumented
+from abstracta_transport import AbstractaTransport, get_transport
+from result_decoder import decode_json
+from query_builder import QuerySpec
+from single_flight import request_key, single_flight
+from user_directory import ABSTRACTA_USER_PAGE_SIZE, user_directory
 from api_builder_agent import APIBuilderPayload
 from dq_rules_builder_agent import DQRulesBuilderPayload
 from profile_builder_agent import ProfileBuilderPayload
 
-load_dotenv(override=True)
+# Variables already set win over .env, so that e.g. `batch_runner.py
+# --fake-abstracta` can point the clients at the fake before they are imported.
+load_dotenv()
+
+# Point these at another deployment, or at fake_abstracta_server.py.
+ABSTRACTA_API_URL = os.getenv(
+    "ABSTRACTA_API_URL", "http://localhost:8080/rest/data/queryv2"
+)
+ABSTRACTA_METADATA_API_URL = os.getenv(
+    "ABSTRACTA_METADATA_API_URL", "http://localhost:8080/rest/metadata"
+)
+ABSTRACTA_WEB_URL = os.getenv("ABSTRACTA_WEB_URL", "http://localhost/services")
+ABSTRACTA_AUTH_URL = os.getenv(
+    "ABSTRACTA_AUTH_URL",
+    "http://localhost:8180/auth/realms/abstracta/protocol/openid-connect/token",
+)
+
+# Refresh the cached token this many seconds before Keycloak says it expires,
+# so a token handed out is never about to lapse mid-request.
+ABSTRACTA_TOKEN_REFRESH_MARGIN = float(
+    os.getenv("ABSTRACTA_TOKEN_REFRESH_MARGIN", "30")
+)
+# Used when the token endpoint does not report `expires_in`.
+ABSTRACTA_TOKEN_DEFAULT_TTL = 60.0
+# Rows requested per queryv2 call when streaming a service page by page.
+ABSTRACTA_PAGE_SIZE = int(os.getenv("ABSTRACTA_PAGE_SIZE", "100"))
+# Page windows kept in flight at once by read_data_parallel.
+ABSTRACTA_READ_PARALLELISM = int(os.getenv("ABSTRACTA_READ_PARALLELISM", "4"))
+# Concurrent per-user calls made by assign_profile_to_users.
+ABSTRACTA_ASSIGN_PARALLELISM = int(os.getenv("ABSTRACTA_ASSIGN_PARALLELISM", "8"))
+# Rows per queryv2 call when paging through the whole service catalog.
+ABSTRACTA_CATALOG_PAGE_SIZE = int(os.getenv("ABSTRACTA_CATALOG_PAGE_SIZE", "1000"))
+
+# Columns of a service row in the vw_db_tables system query.
+SERVICE_COLUMNS = (
+    "org_name",
+    "app_name",
+    "dqdb_db_name",
+    "dtbl_table_name",
+    "dtbl_version",
+)
+
+
+class TokenManager:
+    """
+    Process-wide cache for the client-credentials access token.
+
+    The token is reused until it is within `refresh_margin` seconds of its
+    `expires_in`, then refreshed. Concurrent callers (one per Gradio session
+    thread) that find the token stale wait on the same lock, so only one
+    request to the token endpoint is in flight at a time and the others pick
+    up its result.
+    """
+
+    def __init__(self, refresh_margin: float = ABSTRACTA_TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        self._access_token = None
+        self._expires_at = 0.0
+        self._credentials = None
+        self._async_locks = weakref.WeakKeyDictionary()
+        self._async_locks_lock = threading.Lock()
+
+    def _current_credentials(self):
+        return (
+            os.getenv("ABSTRACTA_CLIENT_ID"),
+            os.getenv("ABSTRACTA_CLIENT_SECRET"),
+            os.getenv("ABSTRACTA_AUDIENCE"),
+        )
+
+    def _is_valid(self, credentials) -> bool:
+        return (
+            self._access_token is not None
+            and self._credentials == credentials
+            and time.monotonic() < self._expires_at - self.refresh_margin
+        )
+
+    def get_token(self, fetch_token, force_refresh: bool = False) -> str:
+        """
+        Return a cached access token, calling `fetch_token()` to obtain a new
+        token response when the cached one is missing, stale or issued for
+        different credentials.
+        """
+        credentials = self._current_credentials()
+        if not force_refresh and self._is_valid(credentials):
+            return self._access_token
+
+        with self._lock:
+            # Another caller may have refreshed while we waited on the lock.
+            if not force_refresh and self._is_valid(credentials):
+                return self._access_token
+
+            self._store(fetch_token(), credentials)
+            return self._access_token
+
+    async def get_token_async(self, fetch_token, force_refresh: bool = False) -> str:
+        """
+        Async counterpart of `get_token`; `fetch_token` is a coroutine
+        function. Refreshes are shared between tasks of the same event loop.
+        """
+        credentials = self._current_credentials()
+        if not force_refresh and self._is_valid(credentials):
+            return self._access_token
+
+        async with self._async_lock():
+            if not force_refresh and self._is_valid(credentials):
+                return self._access_token
+
+            self._store(await fetch_token(), credentials)
+            return self._access_token
+
+    def _async_lock(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        with self._async_locks_lock:
+            if loop not in self._async_locks:
+                self._async_locks[loop] = asyncio.Lock()
+            return self._async_locks[loop]
+
+    def _store(self, token_response, credentials):
+        expires_in = float(
+            token_response.get("expires_in") or ABSTRACTA_TOKEN_DEFAULT_TTL
+        )
+        self._access_token = token_response["access_token"]
+        self._expires_at = time.monotonic() + expires_in
+        self._credentials = credentials
+
+    def invalidate(self):
+        with self._lock:
+            self._access_token = None
+            self._expires_at = 0.0
+
+
+token_manager = TokenManager()
+
+
+@dataclass
+class DataPage:
+    """One queryv2 row window and what it cost to fetch."""
+
+    from_: int
+    to: int
+    rows: list
+    nbytes: int
+    elapsed: float
+
+    @property
+    def is_last(self) -> bool:
+        # A page shorter than its window means the service has no more rows.
+        return len(self.rows) < self.to - self.from_ + 1
+
+
+@dataclass
+class ThroughputReport:
+    """Accumulates page timings of a parallel read."""
+
+    page_size: int = 0
+    parallelism: int = 0
+    pages: int = 0
+    rows: int = 0
+    bytes: int = 0
+    page_seconds: float = 0.0
+    elapsed: float = 0.0
+    _started_at: float = field(default=0.0, repr=False)
+
+    def start(self, page_size: int, parallelism: int):
+        self.page_size = page_size
+        self.parallelism = parallelism
+        self._started_at = time.perf_counter()
+
+    def record(self, page: DataPage):
+        self.pages += 1
+        self.rows += len(page.rows)
+        self.bytes += page.nbytes
+        self.page_seconds += page.elapsed
+        self.elapsed = time.perf_counter() - self._started_at
+
+    def stop(self):
+        self.elapsed = time.perf_counter() - self._started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mean_page_latency(self) -> float:
+        return self.page_seconds / self.pages if self.pages else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "page_size": self.page_size,
+            "parallelism": self.parallelism,
+            "pages": self.pages,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "elapsed": self.elapsed,
+            "rows_per_second": self.rows_per_second,
+            "bytes_per_second": self.bytes_per_second,
+            "mean_page_latency": self.mean_page_latency,
+        }
 
-ABSTRACTA_API_URL = "http://localhost:8080/rest/data/queryv2"
-ABSTRACTA_METADATA_API_URL = "http://localhost:8080/rest/metadata"
-ABSTRACTA_WEB_URL = "http://localhost/services"
 
+class AbstractaClientBase:
+    """
+    URL, payload and response handling shared by AbstractaClient and
+    AsyncAbstractaClient. Subclasses only add the I/O.
+    """
 
-class AbstractaClient:
     def __init__(self) -> None:
         self.organizations = []
         self.users = []
 
-    def perform_auth(self):
-        url = self.generate_auth_url()
-
-        payload = f'grant_type=client_credentials&client_id={os.getenv("ABSTRACTA_CLIENT_ID")}&client_secret={os.getenv("ABSTRACTA_CLIENT_SECRET")}&audience={os.getenv("ABSTRACTA_AUDIENCE")}'
-        print(payload)
-        headers = {"content-type": "application/x-www-form-urlencoded"}
-
-        response = requests.request("POST", url, headers=headers, data=payload)
-
-        return response.json()["access_token"]
-
     def generate_auth_url(self):
-        return (
-            "http://localhost:8180/auth/realms/abstracta/protocol/openid-connect/token"
-        )
+        return ABSTRACTA_AUTH_URL
 
     def generate_web_url(
         self, org: str, app: str, datasource: str, service: str, version: str
@@ -48,27 +250,437 @@ class AbstractaClient:
     def generate_system_api_url(self, service: str, version: str):
         return self.generate_api_url("ekahaa", "abstracta", "dq_repo", service, version)
 
-    def get_data_from_api_url(self, access_token: str, api_url: str):
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        payload = {
-            "where": f"1 = 1",
-            "from": 1,
-            "to": 100,
-            "columns": "*",
-            "lean": True,
-            "forUser": os.getenv("ABSTRACTA_FOR_USER"),
-            "forUserSecret": os.getenv("ABSTRACTA_FOR_USER_SECRET"),
-        }
+    def _auth_payload(self):
+        return f'grant_type=client_credentials&client_id={os.getenv("ABSTRACTA_CLIENT_ID")}&client_secret={os.getenv("ABSTRACTA_CLIENT_SECRET")}&audience={os.getenv("ABSTRACTA_AUDIENCE")}'
+
+    def _auth_headers(self, access_token: str):
+        return {"Authorization": f"Bearer {access_token}"}
+
+    def _query_payload(self, spec: QuerySpec):
+        payload = spec.fields()
+        payload.update(
+            {
+                "lean": True,
+                "forUser": os.getenv("ABSTRACTA_FOR_USER"),
+                "forUserSecret": os.getenv("ABSTRACTA_FOR_USER_SECRET"),
+            }
+        )
+        return payload
 
-        response = requests.post(api_url, headers=headers, json=payload)
+    def _is_query_url(self, url: str) -> bool:
+        # Only queryv2 reads are safe to share between callers; metadata
+        # calls create or change things and must each be sent.
+        return url.startswith(ABSTRACTA_API_URL)
+
+    def _check_response(self, response, error_message: str):
+        """Return the decoded body of a 200 response, raise otherwise."""
         if response.status_code == 200:
-            return response.json()
+            return decode_json(response.content)
         else:
+            raise Exception(f"{error_message}: {response.status_code} {response.text}")
+
+    def _check_status_body(self, response_json, error_message: str, key: str):
+        """Metadata endpoints report failures inside a 200 body."""
+        if response_json[f"{key}Code"] != 200:
+            raise Exception(
+                f"{error_message}: {response_json[f"{key}Code"]} {response_json[f"{key}Message"]}"
+            )
+
+    def _data_payload(
+        self, from_: int = 1, to: int = 100, query: QuerySpec | None = None
+    ):
+        """`query` narrows the select-everything default; its window is replaced."""
+        return self._query_payload((query or QuerySpec()).page(from_, to))
+
+    def _iter_page_windows(
+        self, page_size: int, limit: int | None = None, start: int = 1
+    ):
+        """
+        Yield successive 1-based, inclusive (from, to) row windows beginning at
+        row `start`, clipped to `limit` rows.
+        """
+        if page_size < 1:
+            raise ValueError(f"page_size must be positive, got {page_size}")
+        last = None if limit is None else start + limit - 1
+        while last is None or start <= last:
+            end = start + page_size - 1
+            if last is not None:
+                end = min(end, last)
+            yield start, end
+            start = end + 1
+
+    # System queries project only the columns their callers read.
+    def _data_sources_payload(self, org: str, app: str):
+        return self._query_payload(
+            QuerySpec()
+            .select("dqdb_db_name")
+            .where_sql(
+                "dqdb_app_sys_no = (select app_sys_no from dq_apps where app_name = :app"
+                " and app_org_sys_no = (select org_sys_no from dq_org where org_name = :org))",
+                app=app,
+                org=org,
+            )
+            .page(1, 100)
+        )
+
+    def _organizations_payload(self):
+        return self._query_payload(
+            QuerySpec().select("org_sys_no", "org_name").page(1, 100)
+        )
+
+    def _applications_payload(self, org: str):
+        return self._query_payload(
+            QuerySpec()
+            .select("app_name")
+            .where_sql(
+                "app_org_sys_no = (select org_sys_no from dq_org where org_name = :org)",
+                org=org,
+            )
+            .page(0, 100)
+        )
+
+    def _profiles_payload(self, org: str):
+        return self._query_payload(
+            QuerySpec()
+            .select("prof_sys_no", "prof_name")
+            .where_sql(
+                "prof_org_sys_no = (select org_sys_no from dq_org where org_name = :org)",
+                org=org,
+            )
+            .page(0, 100)
+        )
+
+    def _users_payload(self):
+        return self._query_payload(
+            QuerySpec().select("user_sys_no", "user_id").page(0, 10000)
+        )
+
+    def _users_page_payload(self, from_: int, to: int, after_user_sys_no=None):
+        spec = QuerySpec().select("user_sys_no", "user_id").order_by("user_sys_no")
+        if after_user_sys_no is not None:
+            spec = spec.where("user_sys_no", ">", int(after_user_sys_no))
+        return self._query_payload(spec.page(from_, to))
+
+    def _services_payload(self, org: str, app: str, datasource: str):
+        return self._query_payload(
+            QuerySpec()
+            .select(*SERVICE_COLUMNS)
+            .where("org_name", "=", org)
+            .where("app_name", "=", app)
+            .where("dqdb_db_name", "=", datasource)
+            .page(1, 100)
+        )
+
+    def _all_services_payload(self):
+        return self._query_payload(
+            QuerySpec()
+            .select(*SERVICE_COLUMNS)
+            .order_by("dtbl_when_created", "desc")
+            .page(1, 1000)
+        )
+
+    def _catalog_payload(self, from_: int, to: int, created_after=None):
+        # Oldest first, so services created while paging land on later pages
+        # instead of shifting rows across the windows already read.
+        spec = (
+            QuerySpec()
+            .select(*SERVICE_COLUMNS, "dtbl_when_created")
+            .order_by("dtbl_when_created")
+        )
+        if created_after is not None:
+            # Inclusive: a service created in the same instant as the newest
+            # one already read may not have been visible to that read.
+            spec = spec.where("dtbl_when_created", ">=", created_after)
+        return self._query_payload(spec.page(from_, to))
+
+    def _system_table_payload(self, columns: tuple, from_: int, to: int):
+        # Ordered by the first column (the key), so the windows are stable.
+        return self._query_payload(
+            QuerySpec().select(*columns).order_by(columns[0]).page(from_, to)
+        )
+
+    def _create_api_url(self, prmServiceInfo: APIBuilderPayload):
+        return f"{ABSTRACTA_METADATA_API_URL}/{prmServiceInfo.orgName}/{prmServiceInfo.appName}/connectors/{prmServiceInfo.connectorType}/find/{prmServiceInfo.datasourceName}/services/add"
+
+    def _grant_service_access_url(
+        self, org: str, app: str, datasource: str, service: str, version: str
+    ):
+        return f"{ABSTRACTA_METADATA_API_URL}/{org}/{app}/connectors/rdbms/find/{datasource}/services/find/{service}/{version}/grant"
+
+    def _data_quality_rule_url(self, payload: DQRulesBuilderPayload):
+        return f"{ABSTRACTA_METADATA_API_URL}/{payload.orgName}/{payload.appName}/connectors/rdbms/find/{payload.datasourceName}/services/find/{payload.serviceName}/{payload.version}/fields/find/{payload.fieldName}/dqchecks/find/{payload.dqCheckName}"
+
+    def _evict_created_service(self, prmServiceInfo: APIBuilderPayload):
+        # A new service (or version) appears under its datasource; the
+        # datasource list changes too if the service created it.
+        metadata_cache.invalidate(
+            "services",
+            prmServiceInfo.orgName,
+            prmServiceInfo.appName,
+            prmServiceInfo.datasourceName,
+        )
+        metadata_cache.invalidate(
+            "data_sources", prmServiceInfo.orgName, prmServiceInfo.appName
+        )
+
+    def _find_org_id(self, org_name: str):
+        try:
+            return [
+                org["org_sys_no"]
+                for org in self.organizations
+                if org["org_name"] == org_name
+            ][0]
+        except:
+            raise Exception(f"unable to find a match for org {org_name}")
+
+    def _find_profile_id(self, profiles, payload: ProfileBuilderPayload):
+        try:
+            return [
+                profile["prof_sys_no"]
+                for profile in profiles
+                if profile["prof_name"]
+                == f"{payload.profile_key}~{payload.profile_value}"
+            ][0]
+        except:
             raise Exception(
-                f"Failed to get data: {response.status_code} {response.text}"
+                f"unable to find a match for profile {payload.profile_key}~{payload.profile_value}"
+            )
+
+    def _assignment_results(
+        self, user_names: list[str], found: dict, outcomes: dict
+    ) -> list[dict]:
+        """One report entry per requested user, in request order."""
+        results = []
+        for user_name in dict.fromkeys(user_names):
+            if user_name not in found:
+                results.append(
+                    {
+                        "user_name": user_name,
+                        "user_sys_no": None,
+                        "status": "not_found",
+                        "error": f"unable to find a match for user {user_name}",
+                    }
+                )
+                continue
+            error = outcomes.get(user_name)
+            results.append(
+                {
+                    "user_name": user_name,
+                    "user_sys_no": found[user_name]["user_sys_no"],
+                    "status": "assigned" if error is None else "failed",
+                    "error": error,
+                }
             )
+        return results
+
+    def _profile_payload(self, org_id, payload: ProfileBuilderPayload):
+        return {
+            "name": f"{payload.profile_key}~{payload.profile_value}",
+            "desc": payload.profile_description,
+            "orgId": org_id,
+        }
+
+    def _profile_attribute_url(self, user_id):
+        return f"{ABSTRACTA_METADATA_API_URL}/admin/users/find/{user_id}/profileAttributes/manage"
+
+    def _profile_attribute_payload(self, user_id, profile_id):
+        return {
+            "id": None,
+            "deleteAction": False,
+            "userSysNo": user_id,
+            "profileSysNo": profile_id,
+        }
+
+
+class AbstractaClient(AbstractaClientBase):
+    def __init__(self, transport: AbstractaTransport | None = None) -> None:
+        super().__init__()
+        self.transport = transport or get_transport()
+
+    @instrumented
+    def perform_auth(self, force_refresh: bool = False):
+        return token_manager.get_token(
+            self.request_access_token, force_refresh=force_refresh
+        )
+
+    def request_access_token(self):
+        url = self.generate_auth_url()
+        headers = {"content-type": "application/x-www-form-urlencoded"}
 
+        response = self.transport.post(url, headers=headers, data=self._auth_payload())
+        return self._check_response(response, "Failed to authenticate")
+
+    def _post(self, access_token: str, url: str, payload, error_message: str):
+        if not self._is_query_url(url):
+            return self._send(access_token, url, payload, error_message)
+        return single_flight.do(
+            request_key(access_token, url, payload),
+            lambda: self._send(access_token, url, payload, error_message),
+        )
+
+    def _send(self, access_token: str, url: str, payload, error_message: str):
+        response = self.transport.post(
+            url, headers=self._auth_headers(access_token), json=payload
+        )
+        return self._check_response(response, error_message)
+
+    @instrumented
+    def fetch_page(
+        self,
+        access_token: str,
+        api_url: str,
+        from_: int,
+        to: int,
+        query: QuerySpec | None = None,
+    ) -> DataPage:
+        payload = self._data_payload(from_=from_, to=to, query=query)
+        return single_flight.do(
+            request_key(access_token, api_url, payload),
+            lambda: self._fetch_page(access_token, api_url, from_, to, payload),
+        )
+
+    def _fetch_page(
+        self, access_token: str, api_url: str, from_: int, to: int, payload
+    ) -> DataPage:
+        started = time.perf_counter()
+        response = self.transport.post(
+            api_url, headers=self._auth_headers(access_token), json=payload
+        )
+        rows = self._check_response(response, "Failed to get data")
+        return DataPage(
+            from_=from_,
+            to=to,
+            rows=rows,
+            nbytes=len(response.content),
+            elapsed=time.perf_counter() - started,
+        )
+
+    @instrumented
+    def get_data_from_api_url(
+        self,
+        access_token: str,
+        api_url: str,
+        from_: int = 1,
+        to: int = 100,
+        query: QuerySpec | None = None,
+    ):
+        return self.fetch_page(
+            access_token, api_url, from_=from_, to=to, query=query
+        ).rows
+
+    @instrumented
+    def iter_data_from_api_url(
+        self,
+        access_token: str,
+        api_url: str,
+        page_size: int = ABSTRACTA_PAGE_SIZE,
+        limit: int | None = None,
+        batches: bool = False,
+        query: QuerySpec | None = None,
+        start: int = 1,
+    ):
+        """
+        Stream the rows of a service by walking the queryv2 `from`/`to` window
+        one page at a time, so only one page is held in memory.
+
+        Yields individual rows, or one list per page when `batches` is true.
+        Starts at row `start` (1-based) and stops after `limit` rows, or when
+        the server returns a short page.
+        """
+        for from_, to in self._iter_page_windows(page_size, limit, start):
+            page = self.fetch_page(
+                access_token, api_url, from_=from_, to=to, query=query
+            )
+            if page.rows:
+                if batches:
+                    yield page.rows
+                else:
+                    yield from page.rows
+            if page.is_last:
+                break
+
+    @instrumented
+    def read_data_parallel(
+        self,
+        access_token: str,
+        api_url: str,
+        page_size: int = ABSTRACTA_PAGE_SIZE,
+        parallelism: int = ABSTRACTA_READ_PARALLELISM,
+        limit: int | None = None,
+        report: ThroughputReport | None = None,
+        query: QuerySpec | None = None,
+    ):
+        """
+        Like `iter_data_from_api_url(..., batches=True)`, but keeps up to
+        `parallelism` page windows in flight on a thread pool to hide
+        round-trip latency. Pages are yielded in row order; at most
+        `parallelism` pages are buffered. Pass a ThroughputReport to collect
+        rows/s and bytes/s for tuning `page_size` and `parallelism`.
+        """
+        if parallelism < 1:
+            raise ValueError(f"parallelism must be positive, got {parallelism}")
+        report = report if report is not None else ThroughputReport()
+        report.start(page_size, parallelism)
+        windows = self._iter_page_windows(page_size, limit)
+        in_flight = deque()
+
+        executor = ThreadPoolExecutor(max_workers=parallelism)
+
+        def schedule_next():
+            window = next(windows, None)
+            if window is not None:
+                in_flight.append(
+                    executor.submit(
+                        bind_operation(self.fetch_page),
+                        access_token,
+                        api_url,
+                        window[0],
+                        window[1],
+                        query,
+                    )
+                )
+
+        try:
+            for _ in range(parallelism):
+                schedule_next()
+            while in_flight:
+                page = in_flight.popleft().result()
+                report.record(page)
+                if page.rows:
+                    yield page.rows
+                if page.is_last:
+                    break
+                schedule_next()
+        finally:
+            report.stop()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def iter_data(
+        self,
+        access_token: str,
+        org: str,
+        app: str,
+        datasource: str,
+        service: str,
+        version: str,
+        page_size: int = ABSTRACTA_PAGE_SIZE,
+        limit: int | None = None,
+        batches: bool = False,
+        query: QuerySpec | None = None,
+        start: int = 1,
+    ):
+        url = self.generate_api_url(org, app, datasource, service, version)
+        return self.iter_data_from_api_url(
+            access_token=access_token,
+            api_url=url,
+            page_size=page_size,
+            limit=limit,
+            batches=batches,
+            query=query,
+            start=start,
+        )
+
+    @instrumented
     def get_data(
         self,
         access_token: str,
@@ -77,161 +689,113 @@ class AbstractaClient:
         datasource: str,
         service: str,
         version: str,
+        query: QuerySpec | None = None,
     ):
         url = self.generate_api_url(org, app, datasource, service, version)
-        return self.get_data_from_api_url(access_token=access_token, api_url=url)
+        return self.get_data_from_api_url(
+            access_token=access_token, api_url=url, query=query
+        )
 
+    @instrumented
     def get_data_sources(self, access_token: str, org: str, app: str):
-        request_url = self.generate_system_api_url("dq_databases", "0.0.0")
-
-        headers = {"Authorization": f"Bearer {access_token}"}
+        data_sources = metadata_cache.get("data_sources", org, app)
+        if data_sources is not None:
+            return data_sources
 
-        payload = {
-            "where": f"dqdb_app_sys_no = (select app_sys_no from dq_apps where app_name = '{app}' and app_org_sys_no = (select org_sys_no from dq_org where org_name = '{org}'))",
-            "from": 1,
-            "to": 100,
-            "columns": "dqdb_db_name",
-            "lean": True,
-            "forUser": os.getenv("ABSTRACTA_FOR_USER"),
-            "forUserSecret": os.getenv("ABSTRACTA_FOR_USER_SECRET"),
-        }
+        request_url = self.generate_system_api_url("dq_databases", "0.0.0")
 
-        response = requests.post(request_url, headers=headers, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            return [item["dqdb_db_name"] for item in data]
-        else:
-            raise Exception(
-                f"Failed to get data sources: {response.status_code} {response.text}"
-            )
+        data = self._post(
+            access_token,
+            request_url,
+            self._data_sources_payload(org, app),
+            "Failed to get data sources",
+        )
+        data_sources = [item["dqdb_db_name"] for item in data]
+        metadata_cache.set("data_sources", data_sources, org, app)
+        return data_sources
 
+    @instrumented
     def get_organizations(self, access_token: str):
-        print("Getting organizations")
-        request_url = self.generate_system_api_url("dq_org", "0.0.0")
-
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        payload = {
-            "where": "1 = 1",
-            "from": 1,
-            "to": 100,
-            "columns": "*",
-            "lean": True,
-            "forUser": os.getenv("ABSTRACTA_FOR_USER"),
-            "forUserSecret": os.getenv("ABSTRACTA_FOR_USER_SECRET"),
-        }
-
-        response = requests.post(request_url, headers=headers, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            self.organizations = data
-            return [item["org_name"] for item in data]
-        else:
-            raise Exception(
-                f"Failed to get organizations: {response.status_code} {response.text}"
+        data = metadata_cache.get("organizations")
+        if data is None:
+            print("Getting organizations")
+            request_url = self.generate_system_api_url("dq_org", "0.0.0")
+
+            data = self._post(
+                access_token,
+                request_url,
+                self._organizations_payload(),
+                "Failed to get organizations",
             )
+            metadata_cache.set("organizations", data)
+        self.organizations = data
+        return [item["org_name"] for item in data]
 
+    @instrumented
     def get_applications(self, access_token: str, org: str):
+        applications = metadata_cache.get("applications", org)
+        if applications is not None:
+            return applications
+
         print(f"Getting applications for org: {org}")
         request_url = self.generate_system_api_url("dq_apps", "2.0.0")
 
         print(request_url)
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        payload = {
-            "where": f"app_org_sys_no = (select org_sys_no from dq_org where org_name = '{org}')",
-            "from": 0,
-            "to": 100,
-            "columns": "app_name",
-            "lean": True,
-            "forUser": os.getenv("ABSTRACTA_FOR_USER"),
-            "forUserSecret": os.getenv("ABSTRACTA_FOR_USER_SECRET"),
-        }
-
+        payload = self._applications_payload(org)
         print(payload)
 
-        response = requests.post(request_url, headers=headers, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            return [item["app_name"] for item in data]
-        else:
-            raise Exception(
-                f"Failed to get applications: {response.status_code} {response.text}"
-            )
+        data = self._post(
+            access_token, request_url, payload, "Failed to get applications"
+        )
+        applications = [item["app_name"] for item in data]
+        metadata_cache.set("applications", applications, org)
+        return applications
 
+    @instrumented
     def get_profiles(self, access_token: str, org: str):
+        profiles = metadata_cache.get("profiles", org)
+        if profiles is not None:
+            return profiles
+
         print(f"Getting profiles for org: {org}")
         request_url = self.generate_system_api_url("dq_profiles", "0.0.0")
 
         print(request_url)
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        payload = {
-            "where": f"prof_org_sys_no = (select org_sys_no from dq_org where org_name = '{org}')",
-            "from": 0,
-            "to": 100,
-            "columns": "*",
-            "lean": True,
-            "forUser": os.getenv("ABSTRACTA_FOR_USER"),
-            "forUserSecret": os.getenv("ABSTRACTA_FOR_USER_SECRET"),
-        }
-
+        payload = self._profiles_payload(org)
         print(payload)
 
-        response = requests.post(request_url, headers=headers, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            return data
-        else:
-            raise Exception(
-                f"Failed to get applications: {response.status_code} {response.text}"
-            )
+        profiles = self._post(
+            access_token, request_url, payload, "Failed to get applications"
+        )
+        metadata_cache.set("profiles", profiles, org)
+        return profiles
 
+    @instrumented
     def get_users(self, access_token: str):
         print(f"Getting users")
         request_url = self.generate_system_api_url("vw_users", "0.0.0")
 
         print(request_url)
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        payload = {
-            "where": f"",
-            "from": 0,
-            "to": 10000,
-            "columns": "*",
-            "lean": True,
-            "forUser": os.getenv("ABSTRACTA_FOR_USER"),
-            "forUserSecret": os.getenv("ABSTRACTA_FOR_USER_SECRET"),
-        }
-
+        payload = self._users_payload()
         print(payload)
 
-        response = requests.post(request_url, headers=headers, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            self.users = data
-            return data
-        else:
-            raise Exception(
-                f"Failed to get users: {response.status_code} {response.text}"
-            )
+        data = self._post(access_token, request_url, payload, "Failed to get users")
+        self.users = data
+        return data
 
+    @instrumented
     def create_api(self, access_token: str, prmServiceInfo: APIBuilderPayload):
         print("Creating API ...", prmServiceInfo.model_dump())
-        url = f"{ABSTRACTA_METADATA_API_URL}/{prmServiceInfo.orgName}/{prmServiceInfo.appName}/connectors/{prmServiceInfo.connectorType}/find/{prmServiceInfo.datasourceName}/services/add"
+        url = self._create_api_url(prmServiceInfo)
         print(url)
 
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        response = requests.post(url, headers=headers, json=prmServiceInfo.model_dump())
-
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(
-                f"Failed to create API: {response.status_code} {response.text}"
-            )
+        response_json = self._post(
+            access_token, url, prmServiceInfo.model_dump(), "Failed to create API"
+        )
+        self._evict_created_service(prmServiceInfo)
+        return response_json
 
+    @instrumented
     def grant_service_access(
         self,
         access_token: str,
@@ -243,182 +807,204 @@ class AbstractaClient:
         userId: list[str],
         roleName: list[str],
     ):
-        url = f"{ABSTRACTA_METADATA_API_URL}/{org}/{app}/connectors/rdbms/find/{datasource}/services/find/{service}/{version}/grant"
+        url = self._grant_service_access_url(org, app, datasource, service, version)
 
         payload = {"userIdCsv": ",".join(userId), "roleNameCsv": ",".join(roleName)}
 
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(
-                f"Failed to grant service access: {response.status_code} {response.text}"
-            )
+        return self._post(access_token, url, payload, "Failed to grant service access")
 
+    @instrumented
     def add_data_quality_rule(self, access_token: str, payload: DQRulesBuilderPayload):
-        url = f"{ABSTRACTA_METADATA_API_URL}/{payload.orgName}/{payload.appName}/connectors/rdbms/find/{payload.datasourceName}/services/find/{payload.serviceName}/{payload.version}/fields/find/{payload.fieldName}/dqchecks/find/{payload.dqCheckName}"
+        url = self._data_quality_rule_url(payload)
 
         payload = json.loads(payload.dqRuleParametersPayloadJson)
 
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            response_json = response.json()
-            if response_json["StatusCode"] != 200:
-                raise Exception(
-                    f"Failed to add data quality rule: {response_json["StatusCode"]} {response_json["StatusMessage"]}"
-                )
-        else:
-            raise Exception(
-                f"Failed to add data quality rule: {response.status_code} {response.text}"
-            )
+        response_json = self._post(
+            access_token, url, payload, "Failed to add data quality rule"
+        )
+        self._check_status_body(
+            response_json, "Failed to add data quality rule", "Status"
+        )
 
+    @instrumented
     def add_profile(self, access_token: str, payload: ProfileBuilderPayload):
+        org_name = payload.orgName
         if not self.organizations:
             self.get_organizations(access_token=access_token)
-        try:
-            org_id = [
-                org["org_sys_no"]
-                for org in self.organizations
-                if org["org_name"] == payload.orgName
-            ][0]
-        except:
-            raise Exception(f"unable to find a match for org {payload.orgName}")
+        org_id = self._find_org_id(payload.orgName)
         print("self.organizations = ", self.organizations)
         url = f"{ABSTRACTA_METADATA_API_URL}/admin/orgs/find/{org_id}/profiles/add"
 
-        payload = {
-            "name": f"{payload.profile_key}~{payload.profile_value}",
-            "desc": payload.profile_description,
-            "orgId": org_id,
-        }
+        payload = self._profile_payload(org_id, payload)
         print("payload = ", payload)
-        headers = {"Authorization": f"Bearer {access_token}"}
 
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            response_json = response.json()
-            if response_json["statusCode"] != 200:
-                raise Exception(
-                    f"Failed to add profile: {response_json["statusCode"]} {response_json["statusMessage"]}"
-                )
-        else:
-            raise Exception(
-                f"Failed to add profile: {response.status_code} {response.text}"
+        response_json = self._post(access_token, url, payload, "Failed to add profile")
+        self._check_status_body(response_json, "Failed to add profile", "status")
+        metadata_cache.invalidate("profiles", org_name)
+
+    @instrumented
+    def iter_users(
+        self,
+        access_token: str,
+        page_size: int = ABSTRACTA_USER_PAGE_SIZE,
+        after_user_sys_no=None,
+    ):
+        """Page through vw_users by `user_sys_no`, optionally only past `after_user_sys_no`."""
+        request_url = self.generate_system_api_url("vw_users", "0.0.0")
+
+        for from_, to in self._iter_page_windows(page_size):
+            page = self._post(
+                access_token,
+                request_url,
+                self._users_page_payload(from_, to, after_user_sys_no),
+                "Failed to get users",
             )
+            yield from page
+            if len(page) < to - from_ + 1:
+                break
+
+    @instrumented
+    def refresh_user_directory(self, access_token: str, full: bool = False):
+        after_user_sys_no = None if full else user_directory.last_user_sys_no
+        user_directory.merge(
+            self.iter_users(access_token, after_user_sys_no=after_user_sys_no),
+            replace=after_user_sys_no is None,
+        )
+
+    def _resolve_users(self, access_token: str, user_names: list[str]):
+        if user_directory.is_stale():
+            self.refresh_user_directory(access_token, full=True)
+        found, missing = user_directory.find(user_names)
+        if missing:
+            # They may have been created since the last refresh.
+            self.refresh_user_directory(access_token)
+            found, missing = user_directory.find(user_names)
+        return found, missing
+
+    @instrumented
+    def assign_profile_to_user(self, access_token: str, user_sys_no, profile_id):
+        url = self._profile_attribute_url(user_sys_no)
+        print("url = ", url)
+
+        response_json = self._post(
+            access_token,
+            url,
+            self._profile_attribute_payload(user_sys_no, profile_id),
+            "Failed to add profile",
+        )
+        self._check_status_body(response_json, "Failed to add profile", "status")
 
+    @instrumented
     def assign_profile_to_users(
-        self, access_token: str, payload: ProfileBuilderPayload
+        self,
+        access_token: str,
+        payload: ProfileBuilderPayload,
+        parallelism: int = ABSTRACTA_ASSIGN_PARALLELISM,
     ):
+        """
+        Assign the profile to every user in `payload.user_names`, sending up
+        to `parallelism` per-user calls at once.
+
+        A failing user does not stop the others. Returns one entry per user
+        with `status` "assigned", "failed" or "not_found" and the `error`.
+        """
         if not self.organizations:
             self.get_organizations(access_token=access_token)
-        if not self.users:
-            self.get_users(access_token=access_token)
 
-        try:
-            org_id = [
-                org["org_sys_no"]
-                for org in self.organizations
-                if org["org_name"] == payload.orgName
-            ][0]
-        except:
-            raise Exception(f"unable to find a match for org {payload.orgName}")
+        self._find_org_id(payload.orgName)
+        profile_id = self._find_profile_id(
+            self.get_profiles(access_token=access_token, org=payload.orgName),
+            payload,
+        )
+        found, _ = self._resolve_users(access_token, payload.user_names)
 
-        try:
-            profile_id = [
-                profile["prof_sys_no"]
-                for profile in self.get_profiles(
-                    access_token=access_token, org=payload.orgName
+        def assign(user_name):
+            try:
+                self.assign_profile_to_user(
+                    access_token, found[user_name]["user_sys_no"], profile_id
                 )
-                if profile["prof_name"]
-                == f"{payload.profile_key}~{payload.profile_value}"
-            ][0]
-        except:
-            raise Exception(
-                f"unable to find a match for profile {payload.profile_key}~{payload.profile_value}"
-            )
-
-        try:
-            user_ids = [
-                user["user_sys_no"]
-                for user in self.users
-                if user["user_id"] in payload.user_names
-            ]
-        except:
-            raise Exception(f"unable to find a match for users {payload.user_names}")
-
-        for user_id in user_ids:
-            url = f"{ABSTRACTA_METADATA_API_URL}/admin/users/find/{user_id}/profileAttributes/manage"
-            print("url = ", url)
-            payload = {
-                "id": None,
-                "deleteAction": False,
-                "userSysNo": user_id,
-                "profileSysNo": profile_id,
-            }
-
-            headers = {"Authorization": f"Bearer {access_token}"}
+            except Exception as e:
+                return user_name, str(e)
+            return user_name, None
 
-            response = requests.post(url, headers=headers, json=payload)
-            if response.status_code == 200:
-                response_json = response.json()
-                if response_json["statusCode"] != 200:
-                    raise Exception(
-                        f"Failed to add profile: {response_json["statusCode"]} {response_json["statusMessage"]}"
-                    )
-            else:
-                raise Exception(
-                    f"Failed to add profile: {response.status_code} {response.text}"
-                )
+        outcomes = {}
+        if found:
+            with ThreadPoolExecutor(max_workers=parallelism) as executor:
+                outcomes = dict(executor.map(bind_operation(assign), found))
+        return self._assignment_results(payload.user_names, found, outcomes)
 
+    @instrumented
     def get_services(self, access_token: str, org: str, app: str, datasource: str):
+        services = metadata_cache.get("services", org, app, datasource)
+        if services is not None:
+            return services
+
         request_url = self.generate_system_api_url("vw_db_tables", "0.0.0")
 
-        headers = {"Authorization": f"Bearer {access_token}"}
+        services = self._post(
+            access_token,
+            request_url,
+            self._services_payload(org, app, datasource),
+            "Failed to get services",
+        )
+        metadata_cache.set("services", services, org, app, datasource)
+        return services
 
-        payload = {
-            "where": f" org_name = '{org}' AND app_name = '{app}' and dqdb_db_name='{datasource}'",
-            "from": 1,
-            "to": 100,
-            "columns": "org_name, app_name, dqdb_db_name, dtbl_table_name, dtbl_version",
-            "lean": True,
-            "forUser": os.getenv("ABSTRACTA_FOR_USER"),
-            "forUserSecret": os.getenv("ABSTRACTA_FOR_USER_SECRET"),
-        }
+    @instrumented
+    def get_all_services(self, access_token: str):
+        request_url = self.generate_system_api_url("vw_db_tables", "0.0.0")
 
-        response = requests.post(request_url, headers=headers, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            return data
-        else:
-            raise Exception(
-                f"Failed to get services: {response.status_code} {response.text}"
-            )
+        return self._post(
+            access_token,
+            request_url,
+            self._all_services_payload(),
+            "Failed to get all services",
+        )
 
-    def get_all_services(self, access_token: str):
+    @instrumented
+    def iter_all_services(
+        self,
+        access_token: str,
+        page_size: int = ABSTRACTA_CATALOG_PAGE_SIZE,
+        created_after=None,
+    ):
+        """
+        Page through every vw_db_tables row, oldest first, without the
+        1000-row cap of get_all_services. With `created_after`, only services
+        created at or after that `dtbl_when_created` value are returned.
+        """
         request_url = self.generate_system_api_url("vw_db_tables", "0.0.0")
 
-        headers = {"Authorization": f"Bearer {access_token}"}
-
-        payload = {
-            "where": f" 1 = 1",
-            "from": 1,
-            "to": 1000,
-            "columns": "org_name, app_name, dqdb_db_name, dtbl_table_name, dtbl_version",
-            "lean": True,
-            "orderby": "dtbl_when_created desc",
-            "forUser": os.getenv("ABSTRACTA_FOR_USER"),
-            "forUserSecret": os.getenv("ABSTRACTA_FOR_USER_SECRET"),
-        }
+        for from_, to in self._iter_page_windows(page_size):
+            page = self._post(
+                access_token,
+                request_url,
+                self._catalog_payload(from_, to, created_after),
+                "Failed to get all services",
+            )
+            yield from page
+            if len(page) < to - from_ + 1:
+                break
 
-        response = requests.post(request_url, headers=headers, json=payload)
-        if response.status_code == 200:
-            data = response.json()
-            return data
-        else:
-            raise Exception(
-                f"Failed to get all services: {response.status_code} {response.text}"
+    @instrumented
+    def iter_system_table(
+        self,
+        access_token: str,
+        table: str,
+        version: str,
+        columns: tuple,
+        page_size: int = ABSTRACTA_CATALOG_PAGE_SIZE,
+    ):
+        """Page through every row of a system table, keeping only `columns`."""
+        request_url = self.generate_system_api_url(table, version)
+
+        for from_, to in self._iter_page_windows(page_size):
+            page = self._post(
+                access_token,
+                request_url,
+                self._system_table_payload(columns, from_, to),
+                f"Failed to read {table}",
             )
+            yield from page
+            if len(page) < to - from_ + 1:
+                break
@@ -0,0 +1,218 @@
+import asyncio
+import os
+import threading
+import weakref
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from client_metrics import client_metrics
+
+# Number of distinct hosts (Abstracta, Keycloak, ...) to keep connection pools for.
+ABSTRACTA_POOL_CONNECTIONS = int(os.getenv("ABSTRACTA_POOL_CONNECTIONS", "4"))
+# Maximum number of kept-alive sockets per host; size this to the number of
+# concurrent Gradio workers hitting Abstracta.
+ABSTRACTA_POOL_MAXSIZE = int(os.getenv("ABSTRACTA_POOL_MAXSIZE", "20"))
+# When true, callers wait for a free socket instead of opening a throwaway one.
+ABSTRACTA_POOL_BLOCK = os.getenv("ABSTRACTA_POOL_BLOCK", "false").lower() == "true"
+ABSTRACTA_CONNECT_TIMEOUT = float(os.getenv("ABSTRACTA_CONNECT_TIMEOUT", "5"))
+ABSTRACTA_READ_TIMEOUT = float(os.getenv("ABSTRACTA_READ_TIMEOUT", "120"))
+ABSTRACTA_KEEP_ALIVE = os.getenv("ABSTRACTA_KEEP_ALIVE", "true").lower() == "true"
+
+
+class AbstractaTransport:
+    """
+    A pooled, keep-alive HTTP transport shared by every AbstractaClient in
+    the process.
+
+    Wraps a single `requests.Session` whose adapters keep up to
+    `pool_maxsize` sockets open per host, so consecutive queries reuse
+    connections instead of paying a TCP handshake each time.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = ABSTRACTA_POOL_CONNECTIONS,
+        pool_maxsize: int = ABSTRACTA_POOL_MAXSIZE,
+        pool_block: bool = ABSTRACTA_POOL_BLOCK,
+        connect_timeout: float = ABSTRACTA_CONNECT_TIMEOUT,
+        read_timeout: float = ABSTRACTA_READ_TIMEOUT,
+        keep_alive: bool = ABSTRACTA_KEEP_ALIVE,
+    ) -> None:
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.keep_alive = keep_alive
+
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        if not keep_alive:
+            self.session.headers["Connection"] = "close"
+
+        self._lock = threading.Lock()
+        self._requests_sent = 0
+        self._requests_failed = 0
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._requests_failed += 1
+            raise
+        with self._lock:
+            self._requests_sent += 1
+        body = response.request.body
+        client_metrics.record_transfer(
+            len(body) if body else 0, len(response.content)
+        )
+        return response
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def get_pool_stats(self) -> dict:
+        """
+        Return a snapshot of the connection pools, one entry per host, plus
+        transport-wide request counters.
+
+        `connections_opened` counts new sockets and `requests` counts requests
+        served by that pool; a ratio close to 1 means connections are not
+        being reused and `pool_maxsize` is too small for the load.
+        `idle_connections` is how many sockets are currently parked in the pool.
+        """
+        pools = []
+        pool_manager = self.adapter.poolmanager
+        with pool_manager.pools.lock:
+            host_pools = [pool_manager.pools[key] for key in pool_manager.pools.keys()]
+        for pool in host_pools:
+            pools.append(
+                {
+                    "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    # Empty slots in the queue are None placeholders.
+                    "idle_connections": (
+                        sum(1 for conn in list(pool.pool.queue) if conn is not None)
+                        if pool.pool
+                        else 0
+                    ),
+                    "maxsize": pool.pool.maxsize if pool.pool else 0,
+                }
+            )
+        with self._lock:
+            return {
+                "pool_connections": self.pool_connections,
+                "pool_maxsize": self.pool_maxsize,
+                "keep_alive": self.keep_alive,
+                "requests_sent": self._requests_sent,
+                "requests_failed": self._requests_failed,
+                "pools": pools,
+            }
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncAbstractaTransport:
+    """
+    asyncio counterpart of AbstractaTransport, backed by an
+    `httpx.AsyncClient` with the same pool and timeout settings.
+
+    httpx connection pools are bound to the event loop that created them, so
+    `get_async_transport()` keeps one instance per running loop.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = ABSTRACTA_POOL_CONNECTIONS,
+        pool_maxsize: int = ABSTRACTA_POOL_MAXSIZE,
+        connect_timeout: float = ABSTRACTA_CONNECT_TIMEOUT,
+        read_timeout: float = ABSTRACTA_READ_TIMEOUT,
+        keep_alive: bool = ABSTRACTA_KEEP_ALIVE,
+    ) -> None:
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.keep_alive = keep_alive
+
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=pool_connections * pool_maxsize,
+                max_keepalive_connections=pool_maxsize if keep_alive else 0,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            headers=None if keep_alive else {"Connection": "close"},
+        )
+
+        self._requests_sent = 0
+        self._requests_failed = 0
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self._requests_failed += 1
+            raise
+        self._requests_sent += 1
+        client_metrics.record_transfer(
+            len(response.request.content), len(response.content)
+        )
+        return response
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def get_pool_stats(self) -> dict:
+        return {
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": self.pool_maxsize,
+            "keep_alive": self.keep_alive,
+            "requests_sent": self._requests_sent,
+            "requests_failed": self._requests_failed,
+        }
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+_async_transports = weakref.WeakKeyDictionary()
+
+
+def get_transport() -> AbstractaTransport:
+    """Return the process-wide transport, creating it on first use."""
+    global _transport
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                _transport = AbstractaTransport()
+    return _transport
+
+
+def get_async_transport() -> AsyncAbstractaTransport:
+    """Return the transport for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    if loop not in _async_transports:
+        _async_transports[loop] = AsyncAbstractaTransport()
+    return _async_transports[loop]
+
+
+async def close_async_transport():
+    """
+    Close the running loop's transport, if it has one. Call this before a
+    loop started with `asyncio.run` ends, or its sockets are left open.
+    """
+    transport = _async_transports.pop(asyncio.get_running_loop(), None)
+    if transport is not None:
+        await transport.aclose()
+
+
+def get_pool_stats() -> dict:
+    return get_transport().get_pool_stats()
@@ -0,0 +1,176 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from agents import Runner
+from pydantic import BaseModel, ValidationError
+
+ABSTRACTA_AGENT_CACHE_ENABLED = (
+    os.getenv("ABSTRACTA_AGENT_CACHE_ENABLED", "true").lower() == "true"
+)
+ABSTRACTA_AGENT_CACHE_DIR = os.path.expanduser(
+    os.getenv("ABSTRACTA_AGENT_CACHE_DIR", "~/.cache/abstracta/agent_payloads")
+)
+# Seconds a cached agent payload is reused; the default is one week.
+ABSTRACTA_AGENT_CACHE_TTL = float(os.getenv("ABSTRACTA_AGENT_CACHE_TTL", "604800"))
+
+
+def normalize_requirements(text: str) -> str:
+    """Collapse whitespace so re-typed or re-wrapped prompts share an entry."""
+    return " ".join(text.split())
+
+
+def _sha256(value) -> str:
+    return hashlib.sha256(
+        json.dumps(value, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class AgentPayloadCache:
+    """
+    On-disk cache of the structured output of builder agents, one JSON file
+    per entry.
+
+    Entries are keyed by the agent name, model, instructions, a hash of the
+    output schema and the normalized requirement text, so changing any of
+    them misses. Payloads are validated against the agent's `output_type`
+    when read; an entry that no longer validates is dropped. Agents without
+    a pydantic `output_type` are never cached.
+    """
+
+    def __init__(
+        self,
+        directory: str = ABSTRACTA_AGENT_CACHE_DIR,
+        ttl: float = ABSTRACTA_AGENT_CACHE_TTL,
+        enabled: bool = ABSTRACTA_AGENT_CACHE_ENABLED,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cacheable(agent) -> bool:
+        output_type = agent.output_type
+        return isinstance(output_type, type) and issubclass(output_type, BaseModel)
+
+    def key(self, agent, requirements: str) -> str:
+        instructions = (
+            agent.instructions if isinstance(agent.instructions, str) else None
+        )
+        return _sha256(
+            [
+                agent.name,
+                str(agent.model),
+                instructions,
+                _sha256(agent.output_type.model_json_schema()),
+                normalize_requirements(requirements),
+            ]
+        )
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, agent, key: str):
+        """Return the cached payload as an `output_type` instance, or None."""
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            if time.time() - entry["created_at"] > self.ttl:
+                os.remove(path)
+                return None
+            return agent.output_type.model_validate(entry["payload"])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, ValidationError) as e:
+            logging.warning(f"Discarding unusable agent cache entry {key}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def put(self, agent, key: str, payload: BaseModel):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write a private file and rename it into place, so readers never see
+        # a half-written entry.
+        staging = self._path(f".{key}.{uuid.uuid4().hex}")
+        try:
+            with open(staging, "w") as f:
+                json.dump(
+                    {
+                        "agent": agent.name,
+                        "model": str(agent.model),
+                        "created_at": time.time(),
+                        "payload": payload.model_dump(mode="json"),
+                    },
+                    f,
+                )
+            os.replace(staging, self._path(key))
+        except BaseException:
+            try:
+                os.remove(staging)
+            except OSError:
+                pass
+            raise
+
+    async def run(self, agent, requirements: str, refresh: bool = False):
+        """
+        Return the agent's final output for `requirements`, from the cache when
+        possible. `refresh=True` always calls the model and replaces the entry.
+        """
+        if not self.enabled or not self.cacheable(agent):
+            return (await Runner.run(agent, requirements)).final_output
+        key = self.key(agent, requirements)
+        if not refresh:
+            payload = self.get(agent, key)
+            if payload is not None:
+                with self._lock:
+                    self.hits += 1
+                logging.info("Reusing cached %s payload %s", agent.name, key[:12])
+                return payload
+        with self._lock:
+            self.misses += 1
+        payload = (await Runner.run(agent, requirements)).final_output
+        try:
+            self.put(agent, key, payload)
+        except OSError as e:
+            logging.warning(f"Could not cache {agent.name} payload: {e}")
+        return payload
+
+    def clear(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if name.endswith(".json"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        try:
+            entries = sum(
+                not name.startswith(".") and name.endswith(".json")
+                for name in os.listdir(self.directory)
+            )
+        except FileNotFoundError:
+            entries = 0
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl": self.ttl,
+            "directory": self.directory,
+        }
+
+
+agent_payload_cache = AgentPayloadCache()
@@ -0,0 +1,220 @@
+"""
+Batch runner
+------------
+Feeds a file of natural-language requirements through the same pipelines as
+the UI buttons (API builder, DQ rules, data security profile), without
+Gradio, and writes a JSON report with the outcome and step timings of each:
+
+    python batch_runner.py requirements.jsonl --pipeline api --concurrency 8 --output report.json
+
+The input is either JSON Lines, one object per item with `requirements` and
+optionally `pipeline` and `id`, or plain text with one requirement per line.
+`--fake-abstracta` runs the items against an in-process fake Abstracta
+server (the agents still call the model).
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass
+from abstracta_transport import close_async_transport
+
+# Number of pipelines run at the same time.
+ABSTRACTA_BATCH_CONCURRENCY = int(os.getenv("ABSTRACTA_BATCH_CONCURRENCY", "4"))
+
+PIPELINE_NAMES = ("api", "dq", "profile")
+
+
+@dataclass
+class BatchItem:
+    requirements: str
+    pipeline: str = "api"
+    id: str | None = None
+
+
+@functools.cache
+def _pipelines() -> dict:
+    # Imported on first use so that `--fake-abstracta` can set the client URLs first.
+    from api_builder_ui_helper import buildAPI
+    from dq_rules_ui_helper import buildDataQualityRulesForExistingAPI
+    from profile_ui_helper import createProfile
+
+    return {
+        "api": buildAPI,
+        "dq": buildDataQualityRulesForExistingAPI,
+        "profile": createProfile,
+    }
+
+
+def load_items(path: str, pipeline: str = "api") -> list[BatchItem]:
+    """Read batch items from a JSON Lines or plain text file."""
+    items = []
+    with open(path) as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                item = BatchItem(
+                    requirements=entry["requirements"],
+                    pipeline=entry.get("pipeline", pipeline),
+                    id=entry.get("id"),
+                )
+            else:
+                item = BatchItem(requirements=line, pipeline=pipeline)
+            if item.pipeline not in PIPELINE_NAMES:
+                raise ValueError(f"{path}:{number}: unknown pipeline: {item.pipeline}")
+            item.id = item.id or str(number)
+            items.append(item)
+    return items
+
+
+def _summarize(value):
+    """JSON-friendly form of a step result; row lists are reduced to their count."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        return {"rows": len(value)}
+    return value
+
+
+async def run_item(item: BatchItem, regenerate: bool = False) -> dict:
+    """
+    Run one item headless and return its report. `regenerate` asks the agent
+    again instead of reusing a cached payload for the same requirements.
+    """
+    report = {}
+    pipeline = _pipelines()[item.pipeline]
+    try:
+        async for _ in pipeline(
+            item.requirements,
+            regenerate=regenerate,
+            report=report,
+            session=f"batch:{item.id}",
+        ):
+            pass
+    except Exception as e:
+        if report.get("status") in (None, "cancelled"):
+            report.update(status="error", error=str(e))
+    return {
+        "id": item.id,
+        "pipeline": item.pipeline,
+        "requirements": item.requirements,
+        "status": report.get("status", "error"),
+        "error": report.get("error"),
+        "elapsed_seconds": report.get("elapsed_seconds"),
+        "steps": report.get("steps", []),
+        "results": {
+            key: _summarize(value)
+            for key, value in report.get("results", {}).items()
+            # The token is not worth keeping and should not end up in a file.
+            if key != "abstracta_auth"
+        },
+    }
+
+
+async def run_batch(
+    items: list[BatchItem],
+    concurrency: int = ABSTRACTA_BATCH_CONCURRENCY,
+    on_result=None,
+    regenerate: bool = False,
+) -> dict:
+    """
+    Run `items` with at most `concurrency` pipelines in flight and return the
+    report: a summary plus one entry per item, in input order. `on_result` is
+    called with each item report as it completes.
+    """
+    _pipelines()  # import the UI modules before timing the batch
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def run(item):
+        async with semaphore:
+            result = await run_item(item, regenerate)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    try:
+        results = await asyncio.gather(*(run(item) for item in items))
+    finally:
+        await close_async_transport()
+    return {
+        "summary": {
+            "items": len(results),
+            "ok": sum(result["status"] == "ok" for result in results),
+            "failed": sum(result["status"] != "ok" for result in results),
+            "concurrency": concurrency,
+            "elapsed_seconds": time.perf_counter() - started,
+        },
+        "items": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="JSON Lines or text file of requirements")
+    parser.add_argument("--pipeline", choices=PIPELINE_NAMES, default="api")
+    parser.add_argument("--concurrency", type=int, default=ABSTRACTA_BATCH_CONCURRENCY)
+    parser.add_argument("--output", help="report file (default: stdout)")
+    parser.add_argument(
+        "--regenerate",
+        action="store_true",
+        help="call the agents even for requirements with a cached payload",
+    )
+    parser.add_argument(
+        "--fake-abstracta",
+        action="store_true",
+        help="run against an in-process fake Abstracta server",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    items = load_items(args.input, args.pipeline)
+    server = None
+    if args.fake_abstracta:
+        from fake_abstracta_server import FakeAbstractaServer, client_env
+
+        # The clients read their URLs on import, after which the fake could
+        # no longer take effect and the batch would hit the real deployment.
+        if "abstracta_client" in sys.modules:
+            parser.error("--fake-abstracta needs a fresh process")
+
+        server = FakeAbstractaServer().start()
+        os.environ.update(client_env(server.base_url))
+
+    def progress(result):
+        print(
+            f"[{result['status']}] {result['pipeline']} {result['id']}"
+            f" ({result['elapsed_seconds'] or 0:.1f}s)"
+            + (f": {result['error']}" if result["error"] else ""),
+            file=sys.stderr,
+        )
+
+    try:
+        report = asyncio.run(
+            run_batch(
+                items, args.concurrency, on_result=progress, regenerate=args.regenerate
+            )
+        )
+    finally:
+        if server is not None:
+            server.stop()
+
+    text = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report["summary"]["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import logging
+import os
+import threading
+from abstracta_client import AbstractaClient
+
+# Seconds between background catalog refreshes.
+ABSTRACTA_CATALOG_REFRESH_SECONDS = float(
+    os.getenv("ABSTRACTA_CATALOG_REFRESH_SECONDS", "60")
+)
+# Every Nth refresh re-reads the whole catalog instead of only new services,
+# so deleted services eventually drop out of the index.
+ABSTRACTA_CATALOG_FULL_REFRESH_EVERY = int(
+    os.getenv("ABSTRACTA_CATALOG_FULL_REFRESH_EVERY", "10")
+)
+
+
+def _newest_created(rows, newest=None):
+    """The latest `dtbl_when_created` among `rows` and `newest`."""
+    for row in rows:
+        created = row.get("dtbl_when_created")
+        if created is not None and (newest is None or created > newest):
+            newest = created
+    return newest
+
+
+class CatalogIndex:
+    """
+    In-memory index of the service catalog, built from `dq_org`, `dq_apps`,
+    `dq_databases` and `vw_db_tables`.
+
+    Rows are grouped into an org → app → datasource → service → versions
+    tree, with a flat map of service lists alongside it, so every lookup in
+    the Data Previewer is a dict access instead of a queryv2 round trip.
+    The tree is seeded from the hierarchy tables, so applications and
+    datasources without any service are listed too.
+
+    After the initial load each refresh re-reads the (small) hierarchy
+    tables and only the services created since the newest
+    `dtbl_when_created` seen; every `full_refresh_every`th refresh rebuilds
+    the whole index, so deleted entries eventually drop out. Lookups return
+    None until the index is loaded, and callers then query Abstracta.
+    """
+
+    def __init__(
+        self,
+        client: AbstractaClient | None = None,
+        refresh_interval: float = ABSTRACTA_CATALOG_REFRESH_SECONDS,
+        full_refresh_every: int = ABSTRACTA_CATALOG_FULL_REFRESH_EVERY,
+    ):
+        self.client = client or AbstractaClient()
+        self.refresh_interval = refresh_interval
+        self.full_refresh_every = full_refresh_every
+        self.loaded = False
+
+        self._lock = threading.Lock()
+        self._tree = {}
+        self._services = {}
+        self._last_created = None
+        self._refreshes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _read_hierarchy(self, access_token: str):
+        """
+        Every org, app and datasource as an (org, app, datasource) path, with
+        None below the level the row describes.
+        """
+        read = self.client.iter_system_table
+        orgs = {
+            row["org_sys_no"]: row["org_name"]
+            for row in read(access_token, "dq_org", "0.0.0", ("org_sys_no", "org_name"))
+        }
+        apps = {
+            row["app_sys_no"]: (orgs[row["app_org_sys_no"]], row["app_name"])
+            for row in read(
+                access_token,
+                "dq_apps",
+                "2.0.0",
+                ("app_sys_no", "app_name", "app_org_sys_no"),
+            )
+            if row["app_org_sys_no"] in orgs
+        }
+        datasources = [
+            (*apps[row["dqdb_app_sys_no"]], row["dqdb_db_name"])
+            for row in read(
+                access_token,
+                "dq_databases",
+                "0.0.0",
+                ("dqdb_sys_no", "dqdb_db_name", "dqdb_app_sys_no"),
+            )
+            if row["dqdb_app_sys_no"] in apps
+        ]
+        return (
+            [(org, None, None) for org in orgs.values()]
+            + [(org, app, None) for org, app in apps.values()]
+            + datasources
+        )
+
+    @staticmethod
+    def _add_path(tree: dict, org: str, app: str | None, datasource: str | None):
+        node = tree.setdefault(org, {})
+        if app is not None:
+            node = node.setdefault(app, {})
+            if datasource is not None:
+                node.setdefault(datasource, {})
+
+    @staticmethod
+    def _add_row(tree: dict, services: dict, row: dict):
+        org = row["org_name"]
+        app = row["app_name"]
+        datasource = row["dqdb_db_name"]
+        service = row["dtbl_table_name"]
+        version = row["dtbl_version"]
+
+        versions = (
+            tree.setdefault(org, {})
+            .setdefault(app, {})
+            .setdefault(datasource, {})
+            .setdefault(service, {})
+        )
+        if version in versions:
+            return
+        versions[version] = row
+
+        services.setdefault((org, app, datasource), []).append(
+            {
+                "org_name": org,
+                "app_name": app,
+                "dqdb_db_name": datasource,
+                "dtbl_table_name": service,
+                "dtbl_version": version,
+            }
+        )
+
+    def load(self, access_token: str | None = None):
+        """Rebuild the index from a full catalog snapshot."""
+        access_token = access_token or self.client.perform_auth()
+        paths = self._read_hierarchy(access_token)
+        rows = list(self.client.iter_all_services(access_token))
+        # Build the new maps aside and swap them in, so readers never see a
+        # half-built index during a rebuild.
+        tree, services = {}, {}
+        for path in paths:
+            self._add_path(tree, *path)
+        for row in rows:
+            self._add_row(tree, services, row)
+        with self._lock:
+            self._tree = tree
+            self._services = services
+            self._last_created = _newest_created(rows)
+            self.loaded = True
+        logging.info("Catalog index loaded with %d service versions.", len(rows))
+
+    def refresh(self, access_token: str | None = None):
+        """Merge new hierarchy entries and services created since the last read."""
+        if not self.loaded or self._last_created is None:
+            return self.load(access_token)
+        access_token = access_token or self.client.perform_auth()
+        paths = self._read_hierarchy(access_token)
+        rows = list(
+            self.client.iter_all_services(
+                access_token, created_after=self._last_created
+            )
+        )
+        with self._lock:
+            for path in paths:
+                self._add_path(self._tree, *path)
+            for row in rows:
+                self._add_row(self._tree, self._services, row)
+            self._last_created = _newest_created(rows, self._last_created)
+        logging.debug("Catalog index refreshed with %d new rows.", len(rows))
+
+    def add_service(
+        self, org: str, app: str, datasource: str, service: str, version: str
+    ):
+        """Add a service this process just created, ahead of the next refresh."""
+        with self._lock:
+            if not self.loaded:
+                # A partial index would hide the services not yet loaded.
+                return
+            self._add_row(
+                self._tree,
+                self._services,
+                {
+                    "org_name": org,
+                    "app_name": app,
+                    "dqdb_db_name": datasource,
+                    "dtbl_table_name": service,
+                    "dtbl_version": version,
+                },
+            )
+
+    def organizations(self):
+        """Organization names, or None while the index is not loaded."""
+        with self._lock:
+            return list(self._tree) if self.loaded else None
+
+    def applications(self, org: str):
+        """Application names of `org`, or None while the index is not loaded."""
+        with self._lock:
+            return list(self._tree.get(org, {})) if self.loaded else None
+
+    def data_sources(self, org: str, app: str):
+        """Datasource names of `app`, or None while the index is not loaded."""
+        with self._lock:
+            if not self.loaded:
+                return None
+            return list(self._tree.get(org, {}).get(app, {}))
+
+    def services(self, org: str, app: str, datasource: str):
+        """
+        Rows shaped like AbstractaClient.get_services, or None while the
+        index is not loaded.
+        """
+        with self._lock:
+            if not self.loaded:
+                return None
+            return list(self._services.get((org, app, datasource), []))
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            self._refreshes += 1
+            try:
+                if self._refreshes % self.full_refresh_every == 0:
+                    self.load()
+                else:
+                    self.refresh()
+            except Exception as e:
+                logging.warning("Catalog index refresh failed: %s", e)
+
+    def start_background_refresh(self):
+        """Keep the index current from a daemon thread until `stop()`."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._refresh_loop, name="catalog-index-refresh", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+catalog_index = CatalogIndex()
@@ -0,0 +1,369 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import logging
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ABSTRACTA_METRICS_ENABLED = (
+    os.getenv("ABSTRACTA_METRICS_ENABLED", "true").lower() == "true"
+)
+# Port of the Prometheus scrape endpoint started by the UI. The endpoint is
+# unauthenticated, so it is only started when a port is set, and listens on
+# loopback unless ABSTRACTA_METRICS_HOST says otherwise.
+ABSTRACTA_METRICS_PORT = os.getenv("ABSTRACTA_METRICS_PORT", "")
+ABSTRACTA_METRICS_HOST = os.getenv("ABSTRACTA_METRICS_HOST", "127.0.0.1")
+# Upper bounds, in seconds, of the latency histogram buckets.
+ABSTRACTA_LATENCY_BUCKETS = tuple(
+    float(bound)
+    for bound in os.getenv(
+        "ABSTRACTA_LATENCY_BUCKETS",
+        "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60",
+    ).split(",")
+)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, as Prometheus exposes it."""
+
+    def __init__(self, buckets=ABSTRACTA_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Yield (upper bound, observations <= bound), ending with +Inf."""
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket."""
+        if not self.count:
+            return math.nan
+        rank = q * self.count
+        lower, below = 0.0, 0
+        for bound, total in self.cumulative():
+            if total >= rank:
+                if math.isinf(bound):
+                    return lower
+                in_bucket = total - below
+                return lower + (bound - lower) * (rank - below) / in_bucket
+            lower, below = bound, total
+        return lower
+
+
+class Operation:
+    """Counters for one logical client operation, e.g. `get_services`."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.rows = 0
+
+
+class _Call:
+    """One in-progress operation; HTTP transfers inside it are added here."""
+
+    def __init__(self, parent=None):
+        self.parent = parent
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.rows = 0
+
+
+_current_call = contextvars.ContextVar("abstracta_operation", default=None)
+
+
+class ClientMetrics:
+    """
+    Process-wide metrics for AbstractaClient and AsyncAbstractaClient,
+    labelled by operation name and client kind ("sync" or "async").
+
+    Byte counts come from the transports: every request sent while an
+    operation runs is added to it and to the operations it is nested in,
+    so `get_data` includes the bytes of the pages it read.
+    """
+
+    def __init__(self, enabled: bool = ABSTRACTA_METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._operations = {}
+
+    def _finish(self, key: tuple, call: _Call, elapsed: float, failed: bool):
+        with self._lock:
+            operation = self._operations.get(key)
+            if operation is None:
+                operation = self._operations[key] = Operation()
+            operation.latency.observe(elapsed)
+            operation.errors += failed
+            operation.request_bytes += call.request_bytes
+            operation.response_bytes += call.response_bytes
+            operation.rows += call.rows
+
+    def record_transfer(self, request_bytes: int, response_bytes: int):
+        """Called by the transports after each HTTP exchange."""
+        call = _current_call.get()
+        # Worker threads bound to the same parent call update it concurrently.
+        with self._lock:
+            while call is not None:
+                call.request_bytes += request_bytes
+                call.response_bytes += response_bytes
+                call = call.parent
+
+    def snapshot(self) -> list[dict]:
+        """One row per (operation, client) with call counts and latency quantiles."""
+        with self._lock:
+            items = sorted(self._operations.items())
+            rows = []
+            for (name, client), operation in items:
+                latency = operation.latency
+                rows.append(
+                    {
+                        "operation": name,
+                        "client": client,
+                        "calls": latency.count,
+                        "errors": operation.errors,
+                        "mean_ms": (
+                            1000 * latency.sum / latency.count if latency.count else 0.0
+                        ),
+                        "p50_ms": 1000 * latency.quantile(0.5),
+                        "p95_ms": 1000 * latency.quantile(0.95),
+                        "p99_ms": 1000 * latency.quantile(0.99),
+                        "request_bytes": operation.request_bytes,
+                        "response_bytes": operation.response_bytes,
+                        "rows": operation.rows,
+                    }
+                )
+        return rows
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self._operations.items())
+            lines = [
+                "# HELP abstracta_client_operation_duration_seconds Latency of Abstracta client operations.",
+                "# TYPE abstracta_client_operation_duration_seconds histogram",
+            ]
+            for (name, client), operation in items:
+                labels = f'operation="{name}",client="{client}"'
+                for bound, total in operation.latency.cumulative():
+                    le = "+Inf" if math.isinf(bound) else repr(bound)
+                    lines.append(
+                        f'abstracta_client_operation_duration_seconds_bucket{{{labels},le="{le}"}} {total}'
+                    )
+                lines.append(
+                    f"abstracta_client_operation_duration_seconds_sum{{{labels}}} {operation.latency.sum}"
+                )
+                lines.append(
+                    f"abstracta_client_operation_duration_seconds_count{{{labels}}} {operation.latency.count}"
+                )
+            for metric, help_text in (
+                ("errors", "Operations that raised an exception."),
+                ("request_bytes", "HTTP request body bytes sent."),
+                ("response_bytes", "HTTP response body bytes received."),
+                ("rows", "Rows returned to the caller."),
+            ):
+                lines.append(f"# HELP abstracta_client_{metric}_total {help_text}")
+                lines.append(f"# TYPE abstracta_client_{metric}_total counter")
+                for (name, client), operation in items:
+                    lines.append(
+                        f'abstracta_client_{metric}_total{{operation="{name}",client="{client}"}} {getattr(operation, metric)}'
+                    )
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._operations = {}
+
+
+client_metrics = ClientMetrics()
+
+
+def _count_rows(result) -> int:
+    if isinstance(result, list):
+        return len(result)
+    rows = getattr(result, "rows", None)  # DataPage
+    return len(rows) if isinstance(rows, list) else 0
+
+
+def instrumented(fn):
+    """
+    Record latency, errors, bytes and rows of a client method under its name.
+
+    Works on plain, coroutine, generator and async generator methods; for
+    generators the operation spans from the call until the generator is
+    exhausted or closed, and rows are counted as they are yielded.
+    """
+    name = fn.__name__
+
+    def start():
+        call = _Call(parent=_current_call.get())
+        return call, time.perf_counter()
+
+    def finish(client, call, started, failed):
+        client_metrics._finish(
+            (name, client), call, time.perf_counter() - started, failed
+        )
+
+    if inspect.isasyncgenfunction(fn):
+
+        @functools.wraps(fn)
+        async def async_gen_wrapper(*args, **kwargs):
+            if not client_metrics.enabled:
+                async for item in fn(*args, **kwargs):
+                    yield item
+                return
+            call, started = start()
+            failed = False
+            agen = fn(*args, **kwargs)
+            try:
+                while True:
+                    token = _current_call.set(call)
+                    try:
+                        item = await agen.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    finally:
+                        _current_call.reset(token)
+                    call.rows += len(item) if isinstance(item, list) else 1
+                    yield item
+            except Exception:
+                failed = True
+                raise
+            finally:
+                await agen.aclose()
+                finish("async", call, started, failed)
+
+        return async_gen_wrapper
+
+    if inspect.isgeneratorfunction(fn):
+
+        @functools.wraps(fn)
+        def gen_wrapper(*args, **kwargs):
+            if not client_metrics.enabled:
+                yield from fn(*args, **kwargs)
+                return
+            call, started = start()
+            failed = False
+            gen = fn(*args, **kwargs)
+            try:
+                while True:
+                    token = _current_call.set(call)
+                    try:
+                        item = next(gen)
+                    except StopIteration:
+                        break
+                    finally:
+                        _current_call.reset(token)
+                    call.rows += len(item) if isinstance(item, list) else 1
+                    yield item
+            except Exception:
+                failed = True
+                raise
+            finally:
+                gen.close()
+                finish("sync", call, started, failed)
+
+        return gen_wrapper
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            if not client_metrics.enabled:
+                return await fn(*args, **kwargs)
+            call, started = start()
+            token = _current_call.set(call)
+            failed = False
+            try:
+                result = await fn(*args, **kwargs)
+                call.rows += _count_rows(result)
+                return result
+            except Exception:
+                failed = True
+                raise
+            finally:
+                _current_call.reset(token)
+                finish("async", call, started, failed)
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not client_metrics.enabled:
+            return fn(*args, **kwargs)
+        call, started = start()
+        token = _current_call.set(call)
+        failed = False
+        try:
+            result = fn(*args, **kwargs)
+            call.rows += _count_rows(result)
+            return result
+        except Exception:
+            failed = True
+            raise
+        finally:
+            _current_call.reset(token)
+            finish("sync", call, started, failed)
+
+    return wrapper
+
+
+def bind_operation(fn):
+    """
+    Carry the caller's current operation into `fn` when it runs on another
+    thread (thread pools do not copy context variables).
+    """
+    call = _current_call.get()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current_call.set(call)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current_call.reset(token)
+
+    return wrapper
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = client_metrics.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.debug("metrics endpoint: " + format, *args)
+
+
+def start_metrics_server(
+    port: int, host: str = ABSTRACTA_METRICS_HOST
+) -> ThreadingHTTPServer:
+    """
+    Serve `GET /metrics` on a daemon thread. Raises OSError when the port is
+    taken, e.g. by another instance of the app.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,42 +1,62 @@
 import logging
+from contextlib import aclosing
 import gradio as gr
 from dotenv import load_dotenv
-import pandas
-from abstracta_client import AbstractaClient
+from abstracta_async_client import AsyncAbstractaClient
 from api_builder_agent import apiBuilderAgent
-from agents import Runner, trace
+from agent_cache import agent_payload_cache
 from markdown_formatter import format_url_as_markdown
+from result_decoder import rows_to_dataframe
+from step_checkpoints import run_id_for, step_checkpoints
 from steps_executor import steps_executor, fn_report_build_progress
 from dq_rules_builder_agent import dqRulesBuilderAgent
 
 
-async def buildDataQualityRulesForExistingAPI(requirements):
+async def buildDataQualityRulesForExistingAPI(
+    requirements,
+    regenerate=False,
+    request: gr.Request = None,
+    report=None,
+    session=None,
+):
     """
     Main async function that runs the data quality rules building process.
     Yields status updates at each step for live progress display.
+
+    The agent's payload is reused from the agent cache when the same
+    requirements were built before; `regenerate=True` asks the model again.
+
+    With `report` (a dict) the pipeline runs headless for batch use: nothing
+    is rendered or yielded and the dict receives the outcome, step timings
+    and results (see steps_executor). `session` stands in for the Gradio
+    session when there is no request: a retry with the same session and
+    requirements resumes from the failed step.
     """
 
+    abstractaClient = AsyncAbstractaClient()
+
     async def buildPayload(context):
-        with trace("abstracta-dq-rules-builder-agent"):
-            payload_result = await Runner.run(dqRulesBuilderAgent, requirements)
-            logging.info("payload_result = %s", payload_result.final_output)
-            return payload_result.final_output
+        payload_result = await agent_payload_cache.run(
+            dqRulesBuilderAgent, requirements, refresh=regenerate
+        )
+        logging.info("payload_result = %s", payload_result)
+        return payload_result
 
     async def performAuth(context):
-        return AbstractaClient().perform_auth()
+        return await abstractaClient.perform_auth()
 
     async def createDataQualityRule(context):
         access_token = context.get("abstracta_auth")
         payload_result = context.get("construct_payload")
         logging.info("access_token = %s", access_token)
         logging.info("payload_result = %s", payload_result)
-        return AbstractaClient().add_data_quality_rule(access_token, payload_result)
+        return await abstractaClient.add_data_quality_rule(access_token, payload_result)
 
     async def generateApiUrl(context):
         payload = context.get("construct_payload")
         return format_url_as_markdown(
             "API URL",
-            AbstractaClient().generate_api_url(
+            abstractaClient.generate_api_url(
                 payload.orgName,
                 payload.appName,
                 payload.datasourceName,
@@ -49,7 +69,7 @@ async def buildDataQualityRulesForExistingAPI(requirements):
         payload = context.get("construct_payload")
         return format_url_as_markdown(
             "Web URL",
-            AbstractaClient().generate_web_url(
+            abstractaClient.generate_web_url(
                 payload.orgName,
                 payload.appName,
                 payload.datasourceName,
@@ -61,7 +81,7 @@ async def buildDataQualityRulesForExistingAPI(requirements):
     async def fetchData(context):
         access_token = context.get("abstracta_auth")
         payload = context.get("construct_payload")
-        return AbstractaClient().get_data(
+        return await abstractaClient.get_data(
             access_token,
             payload.orgName,
             payload.appName,
@@ -79,10 +99,7 @@ async def buildDataQualityRulesForExistingAPI(requirements):
         if not dataframe:
             return gr.update(value=context[attribute], visible=visible)
         else:
-            df = pandas.DataFrame(context[attribute])
-            dq_df = pandas.json_normalize(df["_dq"])
-            dq_df.columns = [f"_dq.{subcol}" for subcol in dq_df.columns]
-            df_flat = pandas.concat([df.drop(columns=["_dq"]), dq_df], axis=1)
+            df_flat = rows_to_dataframe(context[attribute])
 
             return gr.update(value=df_flat, visible=visible)
 
@@ -96,119 +113,118 @@ async def buildDataQualityRulesForExistingAPI(requirements):
         makeComponentVisible(visible=False),  # dataframe_view
     )
 
+    def showIfDone(attribute: str, missing, **kwargs):
+        return lambda context: (
+            updateComponentData(context, attribute=attribute, **kwargs)
+            if attribute in context
+            else missing(context)
+        )
+
+    # Steps run concurrently and finish in any order, so every update shows
+    # everything produced so far instead of what one step added.
+    outputs = [
+        showIfDone("gen_api_url", lambda context: "", visible=True),
+        showIfDone(
+            "gen_web_url",
+            lambda context: makeComponentVisible(visible=False),
+            visible=True,
+        ),
+        showIfDone(
+            "fetch_data",
+            lambda context: makeComponentVisible(visible=False),
+            visible=False,
+        ),
+        showIfDone(
+            "fetch_data",
+            lambda context: makeComponentVisible(visible=False),
+            visible=True,
+            dataframe=True,
+        ),
+    ]
+
     steps_info = [
         {
             "key": "construct_payload",
             "name": "Constructing DQ Rule Builder Payload",
             "func": buildPayload,
-            "yield": [
-                lambda context: "",
-                lambda context: "",
-                lambda context: makeComponentVisible(visible=False),
-                lambda context: makeComponentVisible(visible=False),
-            ],
+            "depends_on": [],
+            "yield": outputs,
         },
         {
             "key": "abstracta_auth",
             "name": "Authenticating to Abstracta API",
             "func": performAuth,
-            "yield": [
-                lambda context: "",
-                lambda context: "",
-                lambda context: makeComponentVisible(visible=False),
-                lambda context: makeComponentVisible(visible=False),
-            ],
+            "depends_on": [],
+            # The client's token manager already reuses a valid token and
+            # refreshes an expired one, so a resumed run asks it again.
+            "checkpoint": False,
+            "yield": outputs,
         },
         {
             "key": "create_dq_rule",
             "name": "Creating Data Quality Rule",
             "func": createDataQualityRule,
-            "yield": [
-                lambda context: "",
-                lambda context: "",
-                lambda context: makeComponentVisible(visible=False),
-                lambda context: makeComponentVisible(visible=False),
-            ],
+            "depends_on": ["construct_payload", "abstracta_auth"],
+            "yield": outputs,
         },
         {
             "key": "gen_api_url",
             "name": "Generate API URL",
             "func": generateApiUrl,
-            "yield": [
-                lambda context: updateComponentData(
-                    context := context, attribute="gen_api_url", visible=True
-                ),
-                lambda context: makeComponentVisible(visible=False),
-                lambda context: makeComponentVisible(visible=False),
-                lambda context: makeComponentVisible(visible=False),
-            ],
+            "depends_on": ["construct_payload"],
+            "yield": outputs,
         },
         {
             "key": "gen_web_url",
             "name": "Generate Web URL",
             "func": generateWebUrl,
-            "yield_before": [
-                lambda context: updateComponentData(
-                    context := context, attribute="gen_api_url", visible=True
-                ),
-                lambda context: makeComponentVisible(visible=False),
-                lambda context: makeComponentVisible(visible=False),
-                lambda context: makeComponentVisible(visible=False),
-            ],
-            "yield": [
-                lambda context: updateComponentData(
-                    context := context, attribute="gen_api_url", visible=True
-                ),
-                lambda context: updateComponentData(
-                    context := context, attribute="gen_web_url", visible=True
-                ),
-                lambda context: makeComponentVisible(visible=False),
-                lambda context: makeComponentVisible(visible=False),
-            ],
+            "depends_on": ["construct_payload"],
+            "yield": outputs,
         },
         {
             "key": "fetch_data",
             "name": "Fetching data from API",
             "func": fetchData,
-            "yield_before": [
-                lambda context: updateComponentData(
-                    context := context, attribute="gen_api_url", visible=True
-                ),
-                lambda context: updateComponentData(
-                    context := context, attribute="gen_web_url", visible=True
-                ),
-                lambda context: makeComponentVisible(visible=False),
-                lambda context: makeComponentVisible(visible=False),
-            ],
-            "yield": [
-                lambda context: updateComponentData(
-                    context := context, attribute="gen_api_url", visible=True
-                ),
-                lambda context: updateComponentData(
-                    context := context, attribute="gen_web_url", visible=True
-                ),
-                lambda context: updateComponentData(
-                    context := context, attribute="fetch_data", visible=False
-                ),
-                lambda context: updateComponentData(
-                    context := context,
-                    attribute="fetch_data",
-                    visible=True,
-                    dataframe=True,
-                ),
-            ],
+            "depends_on": ["construct_payload", "abstracta_auth", "create_dq_rule"],
+            "yield": outputs,
+            # Flattening the rows into a DataFrame is CPU-bound.
+            "blocking_yield": True,
         },
         # Add more steps
     ]
 
     # final_outputs = ("Final API URL", "Final Web URL", data, pd.DataFrame(data))
 
-    async for step in steps_executor(
-        steps_info=steps_info,
-        initial_outputs=initial_outputs,
-        build_progress_fn=fn_report_build_progress,
-        final_message="✅ All done!",
-        final_outputs=None,
-    ):
-        logging.debug("results = %s", step)
-        yield step
+    # Checkpoints and superseding are per browser session (or per batch
+    # item), so users submitting the same text never share a run.
+    session = request.session_hash if request else session
+    run_id = (
+        run_id_for("abstracta-dq-rules-builder-agent", session, requirements)
+        if session
+        else None
+    )
+    if regenerate and run_id:
+        # Steps saved from a failed attempt were built on the old payload.
+        step_checkpoints.discard(run_id)
+
+    # Close the executor as soon as Gradio stops reading (tab closed), so its
+    # in-flight steps are cancelled instead of running to completion.
+    async with aclosing(
+        steps_executor(
+            steps_info=steps_info,
+            initial_outputs=initial_outputs,
+            build_progress_fn=fn_report_build_progress,
+            trace_name="abstracta-dq-rules-builder-agent",
+            # Retrying the same requirements after a failure resumes from the
+            # failed step instead of calling the agent again.
+            run_id=run_id,
+            # A new build from the same browser session cancels this one.
+            cancel_key=session,
+            report=report,
+            final_message="✅ All done!",
+            final_outputs=None,
+        )
+    ) as steps:
+        async for step in steps:
+            logging.debug("results = %s", step)
+            yield step
@@ -0,0 +1,590 @@
+"""
+Fake Abstracta server
+---------------------
+A local stand-in for Abstracta and its Keycloak token endpoint, for exercising
+and benchmarking the clients and UI pipelines without a real install:
+
+    python fake_abstracta_server.py --port 8080 --rows 100000 --latency-ms 20
+
+then point the clients at it (the server prints these on startup):
+
+    ABSTRACTA_API_URL=http://127.0.0.1:8080/rest/data/queryv2
+    ABSTRACTA_METADATA_API_URL=http://127.0.0.1:8080/rest/metadata
+    ABSTRACTA_AUTH_URL=http://127.0.0.1:8080/auth/realms/abstracta/protocol/openid-connect/token
+
+Catalog, users, profiles and service rows are synthetic tables in an
+in-memory SQLite database, so queryv2 `where`, `columns`, `from`, `to` and
+`orderby` behave like SQL. Latency and error injection can be set on the
+command line or changed while running via `POST /_fake/config`.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from urllib.parse import parse_qs
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+SYSTEM_PATH = ("ekahaa", "abstracta", "dq_repo")
+TOKEN_PATH = "/auth/realms/abstracta/protocol/openid-connect/token"
+
+
+class FakeAbstractaConfig:
+    """Knobs for the fake server; `RUNTIME_FIELDS` can be changed while it runs."""
+
+    def __init__(
+        self,
+        rows: int = int(os.getenv("ABSTRACTA_FAKE_ROWS", "10000")),
+        users: int = int(os.getenv("ABSTRACTA_FAKE_USERS", "1000")),
+        services: int = int(os.getenv("ABSTRACTA_FAKE_SERVICES", "20")),
+        latency_ms: float = float(os.getenv("ABSTRACTA_FAKE_LATENCY_MS", "0")),
+        jitter_ms: float = float(os.getenv("ABSTRACTA_FAKE_JITTER_MS", "0")),
+        per_row_us: float = float(os.getenv("ABSTRACTA_FAKE_PER_ROW_US", "0")),
+        error_rate: float = float(os.getenv("ABSTRACTA_FAKE_ERROR_RATE", "0")),
+        error_status: int = int(os.getenv("ABSTRACTA_FAKE_ERROR_STATUS", "500")),
+        token_ttl: int = int(os.getenv("ABSTRACTA_FAKE_TOKEN_TTL", "300")),
+        seed: int = 42,
+    ):
+        self.rows = rows
+        self.users = users
+        self.services = services
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.per_row_us = per_row_us
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.token_ttl = token_ttl
+        self.seed = seed
+
+    # Fields that may be changed through POST /_fake/config.
+    RUNTIME_FIELDS = (
+        "latency_ms",
+        "jitter_ms",
+        "per_row_us",
+        "error_rate",
+        "error_status",
+        "token_ttl",
+    )
+
+    def as_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class FakeAbstracta:
+    """The fake's state: a SQLite catalog plus one table per service version."""
+
+    def __init__(self, config: FakeAbstractaConfig):
+        self.config = config
+        self._random = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(":memory:", check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._tokens = {}
+        self._dq_checks = {}
+        self.stats = {"requests": 0, "errors_injected": 0, "rows_served": 0}
+        self._create_schema()
+        self._seed()
+
+    def _create_schema(self):
+        self._db.executescript("""
+            CREATE TABLE dq_org (org_sys_no INTEGER PRIMARY KEY, org_name TEXT UNIQUE);
+            CREATE TABLE dq_apps (
+                app_sys_no INTEGER PRIMARY KEY, app_name TEXT, app_org_sys_no INTEGER
+            );
+            CREATE TABLE dq_databases (
+                dqdb_sys_no INTEGER PRIMARY KEY, dqdb_db_name TEXT, dqdb_app_sys_no INTEGER
+            );
+            CREATE TABLE vw_db_tables (
+                dtbl_sys_no INTEGER PRIMARY KEY,
+                org_name TEXT, app_name TEXT, dqdb_db_name TEXT,
+                dtbl_table_name TEXT, dtbl_version TEXT,
+                dtbl_when_created TEXT, dtbl_data_table TEXT
+            );
+            CREATE TABLE dq_profiles (
+                prof_sys_no INTEGER PRIMARY KEY, prof_name TEXT,
+                prof_desc TEXT, prof_org_sys_no INTEGER
+            );
+            CREATE TABLE vw_users (user_sys_no INTEGER PRIMARY KEY, user_id TEXT);
+            CREATE TABLE dq_profile_attributes (
+                user_sys_no INTEGER, profile_sys_no INTEGER,
+                PRIMARY KEY (user_sys_no, profile_sys_no)
+            );
+            """)
+
+    def _seed(self):
+        config = self.config
+        self._db.executemany(
+            "INSERT INTO vw_users (user_sys_no, user_id) VALUES (?, ?)",
+            [(i, f"user{i}") for i in range(1, config.users + 1)],
+        )
+        for i in range(config.services):
+            self.add_service(
+                "demo",
+                f"app{i % 3}",
+                f"db{i % 2}",
+                f"service{i}",
+                rows=config.rows,
+            )
+        self._db.commit()
+
+    # ---------------------------------------------------------------- catalog
+
+    def _id(self, table: str, key: str, where: str, params: tuple, insert: str):
+        row = self._db.execute(f"SELECT {key} FROM {table} WHERE {where}", params)
+        row = row.fetchone()
+        if row is not None:
+            return row[0]
+        return self._db.execute(insert, params).lastrowid
+
+    def _ensure_path(self, org: str, app: str, datasource: str):
+        org_id = self._id(
+            "dq_org",
+            "org_sys_no",
+            "org_name = ?",
+            (org,),
+            "INSERT INTO dq_org (org_name) VALUES (?)",
+        )
+        app_id = self._id(
+            "dq_apps",
+            "app_sys_no",
+            "app_name = ? AND app_org_sys_no = ?",
+            (app, org_id),
+            "INSERT INTO dq_apps (app_name, app_org_sys_no) VALUES (?, ?)",
+        )
+        self._id(
+            "dq_databases",
+            "dqdb_sys_no",
+            "dqdb_db_name = ? AND dqdb_app_sys_no = ?",
+            (datasource, app_id),
+            "INSERT INTO dq_databases (dqdb_db_name, dqdb_app_sys_no) VALUES (?, ?)",
+        )
+        return org_id
+
+    def add_service(
+        self,
+        org: str,
+        app: str,
+        datasource: str,
+        service: str,
+        rows: int | None = None,
+        version_type: str = "MAJOR",
+    ) -> str:
+        """Register a new version of `service` backed by a synthetic table."""
+        with self._lock:
+            self._ensure_path(org, app, datasource)
+            latest = self._db.execute(
+                "SELECT dtbl_version FROM vw_db_tables WHERE org_name = ? AND "
+                "app_name = ? AND dqdb_db_name = ? AND dtbl_table_name = ? "
+                "ORDER BY dtbl_sys_no DESC LIMIT 1",
+                (org, app, datasource, service),
+            ).fetchone()
+            version = _next_version(latest[0] if latest else None, version_type)
+            data_table = f"svc_{uuid.uuid4().hex}"
+            self._create_data_table(
+                data_table, self.config.rows if rows is None else rows
+            )
+            self._db.execute(
+                "INSERT INTO vw_db_tables (org_name, app_name, dqdb_db_name, "
+                "dtbl_table_name, dtbl_version, dtbl_when_created, dtbl_data_table) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    org,
+                    app,
+                    datasource,
+                    service,
+                    version,
+                    _timestamp(),
+                    data_table,
+                ),
+            )
+            self._db.commit()
+            return version
+
+    def _create_data_table(self, name: str, rows: int):
+        self._db.execute(
+            f"CREATE TABLE {name} (id INTEGER PRIMARY KEY, name TEXT, "
+            "state TEXT, amount REAL, quantity INTEGER, active INTEGER, "
+            "created_at TEXT)"
+        )
+        states = ["CA", "NY", "TX", "WA", "FL", None]
+        self._db.executemany(
+            f"INSERT INTO {name} VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    i,
+                    f"item {i}",
+                    self._random.choice(states),
+                    round(self._random.uniform(0, 1000), 2),
+                    self._random.randint(0, 100),
+                    self._random.random() < 0.8,
+                    f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}",
+                )
+                for i in range(1, rows + 1)
+            ),
+        )
+
+    def data_table(self, org, app, datasource, service, version) -> str | None:
+        with self._lock:
+            if (org, app, datasource) == SYSTEM_PATH:
+                exists = self._db.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                    (service,),
+                ).fetchone()
+                return service if exists else None
+            row = self._db.execute(
+                "SELECT dtbl_data_table FROM vw_db_tables WHERE org_name = ? AND "
+                "app_name = ? AND dqdb_db_name = ? AND dtbl_table_name = ? AND "
+                "dtbl_version = ?",
+                (org, app, datasource, service, version),
+            ).fetchone()
+            return row[0] if row else None
+
+    def dq_checks(self, service_path: tuple) -> dict:
+        return self._dq_checks.get(service_path, {})
+
+    def add_dq_check(self, service_path: tuple, field: str, check: str):
+        with self._lock:
+            checks = self._dq_checks.setdefault(service_path, {})
+            checks.setdefault(field, set()).add(check)
+
+    def query(self, table: str, payload: dict, dq_checks: dict) -> list[dict]:
+        """Run a queryv2 payload against `table`; `from`/`to` are 1-based and inclusive."""
+        where = (payload.get("where") or "").strip() or "1 = 1"
+        columns = (payload.get("columns") or "").strip() or "*"
+        offset = max(int(payload.get("from") or 1), 1) - 1
+        limit = max(int(payload.get("to") or offset + 100) - offset, 0)
+        sql = f"SELECT {columns} FROM {table} WHERE {where}"
+        if payload.get("orderby"):
+            sql += f" ORDER BY {payload['orderby']}"
+        sql += " LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = [dict(row) for row in self._db.execute(sql, (limit, offset))]
+        if dq_checks:
+            for row in rows:
+                row["_dq"] = {
+                    field: {check: "PASS" for check in checks}
+                    for field, checks in dq_checks.items()
+                }
+        return rows
+
+    def add_profile(self, org_id: int, name: str, desc: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO dq_profiles (prof_name, prof_desc, prof_org_sys_no) "
+                "VALUES (?, ?, ?)",
+                (name, desc, org_id),
+            )
+            self._db.commit()
+
+    def org_exists(self, org_id) -> bool:
+        with self._lock:
+            return (
+                self._db.execute(
+                    "SELECT 1 FROM dq_org WHERE org_sys_no = ?", (org_id,)
+                ).fetchone()
+                is not None
+            )
+
+    def assign_profile(self, user_sys_no, profile_sys_no) -> str | None:
+        """Return an error message, or None once the profile is assigned."""
+        with self._lock:
+            if not self._db.execute(
+                "SELECT 1 FROM vw_users WHERE user_sys_no = ?", (user_sys_no,)
+            ).fetchone():
+                return f"user {user_sys_no} not found"
+            if not self._db.execute(
+                "SELECT 1 FROM dq_profiles WHERE prof_sys_no = ?", (profile_sys_no,)
+            ).fetchone():
+                return f"profile {profile_sys_no} not found"
+            self._db.execute(
+                "INSERT OR IGNORE INTO dq_profile_attributes VALUES (?, ?)",
+                (user_sys_no, profile_sys_no),
+            )
+            self._db.commit()
+            return None
+
+    # ------------------------------------------------------------------ auth
+
+    def issue_token(self) -> dict:
+        token = uuid.uuid4().hex
+        self._tokens[token] = time.monotonic() + self.config.token_ttl
+        return {
+            "access_token": token,
+            "expires_in": self.config.token_ttl,
+            "token_type": "Bearer",
+        }
+
+    def is_authorized(self, request: Request) -> bool:
+        header = request.headers.get("authorization", "")
+        expires_at = self._tokens.get(header.removeprefix("Bearer "))
+        return expires_at is not None and expires_at > time.monotonic()
+
+
+def _timestamp() -> str:
+    # Nanosecond precision keeps services created in the same second ordered.
+    now = time.time_ns()
+    seconds = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now // 10**9))
+    return f"{seconds}.{now % 10**9:09d}"
+
+
+def _next_version(latest: str | None, version_type: str) -> str:
+    if latest is None:
+        return "1.0.0"
+    major, minor, revision = (int(part) for part in latest.split("."))
+    if version_type == "MINOR":
+        return f"{major}.{minor + 1}.0"
+    if version_type == "REVISION":
+        return f"{major}.{minor}.{revision + 1}"
+    return f"{major + 1}.0.0"
+
+
+def _status(code: int = 200, message: str = "OK", key: str = "status") -> dict:
+    """Metadata endpoints report their outcome inside a 200 body."""
+    return {f"{key}Code": code, f"{key}Message": message}
+
+
+def create_app(config: FakeAbstractaConfig | None = None) -> FastAPI:
+    fake = FakeAbstracta(config or FakeAbstractaConfig())
+    app = FastAPI(title="Fake Abstracta")
+    app.state.fake = fake
+
+    @app.middleware("http")
+    async def inject_latency_and_errors(request: Request, call_next):
+        config = fake.config
+        fake.stats["requests"] += 1
+        if request.url.path.startswith("/_fake"):
+            return await call_next(request)
+        delay = config.latency_ms + random.uniform(0, config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if config.error_rate and random.random() < config.error_rate:
+            fake.stats["errors_injected"] += 1
+            return JSONResponse(
+                {"error": "injected failure"}, status_code=config.error_status
+            )
+        return await call_next(request)
+
+    def unauthorized():
+        return JSONResponse({"error": "invalid or expired token"}, status_code=401)
+
+    @app.post(TOKEN_PATH)
+    async def token(request: Request):
+        form = parse_qs((await request.body()).decode())
+        if form.get("grant_type") != ["client_credentials"]:
+            return JSONResponse({"error": "unsupported_grant_type"}, status_code=400)
+        return fake.issue_token()
+
+    @app.post("/rest/data/queryv2/{org}/{app_name}/{datasource}/{service}/{version}")
+    async def queryv2(request: Request, org, app_name, datasource, service, version):
+        if not fake.is_authorized(request):
+            return unauthorized()
+        table = fake.data_table(org, app_name, datasource, service, version)
+        if table is None:
+            return JSONResponse(
+                {"error": f"service {service}/{version} not found"}, status_code=404
+            )
+        payload = await request.json()
+        dq_checks = fake.dq_checks((org, app_name, datasource, service, version))
+        try:
+            rows = fake.query(table, payload, dq_checks)
+        except sqlite3.Error as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        fake.stats["rows_served"] += len(rows)
+        if fake.config.per_row_us:
+            await asyncio.sleep(len(rows) * fake.config.per_row_us / 1_000_000)
+        return rows
+
+    @app.post(
+        "/rest/metadata/{org}/{app_name}/connectors/{connector}/find/{datasource}/services/add"
+    )
+    async def add_service(request: Request, org, app_name, connector, datasource):
+        if not fake.is_authorized(request):
+            return unauthorized()
+        payload = await request.json()
+        service = payload["serviceName"]
+        version = fake.add_service(
+            org,
+            app_name,
+            datasource,
+            service,
+            version_type=payload.get("versionType", "MAJOR"),
+        )
+        return {
+            "service-info": {
+                "tables": [{"dtbl_table_name": service, "dtbl_version": version}]
+            }
+        }
+
+    @app.post(
+        "/rest/metadata/{org}/{app_name}/connectors/{connector}/find/{datasource}"
+        "/services/find/{service}/{version}/grant"
+    )
+    async def grant(
+        request: Request, org, app_name, connector, datasource, service, version
+    ):
+        if not fake.is_authorized(request):
+            return unauthorized()
+        if fake.data_table(org, app_name, datasource, service, version) is None:
+            return _status(404, f"service {service}/{version} not found")
+        await request.json()
+        return _status()
+
+    @app.post(
+        "/rest/metadata/{org}/{app_name}/connectors/{connector}/find/{datasource}"
+        "/services/find/{service}/{version}/fields/find/{field}/dqchecks/find/{check}"
+    )
+    async def add_dq_check(
+        request: Request,
+        org,
+        app_name,
+        connector,
+        datasource,
+        service,
+        version,
+        field,
+        check,
+    ):
+        if not fake.is_authorized(request):
+            return unauthorized()
+        if fake.data_table(org, app_name, datasource, service, version) is None:
+            return _status(404, f"service {service}/{version} not found", "Status")
+        await request.json()
+        fake.add_dq_check((org, app_name, datasource, service, version), field, check)
+        return _status(key="Status")
+
+    @app.post("/rest/metadata/admin/orgs/find/{org_id}/profiles/add")
+    async def add_profile(request: Request, org_id: int):
+        if not fake.is_authorized(request):
+            return unauthorized()
+        if not fake.org_exists(org_id):
+            return _status(404, f"org {org_id} not found")
+        payload = await request.json()
+        fake.add_profile(org_id, payload["name"], payload.get("desc", ""))
+        return _status()
+
+    @app.post("/rest/metadata/admin/users/find/{user_id}/profileAttributes/manage")
+    async def manage_profile_attributes(request: Request, user_id: int):
+        if not fake.is_authorized(request):
+            return unauthorized()
+        payload = await request.json()
+        error = fake.assign_profile(user_id, payload.get("profileSysNo"))
+        return _status(404, error) if error else _status()
+
+    @app.get("/_fake/stats")
+    async def stats():
+        return fake.stats
+
+    @app.get("/_fake/config")
+    async def get_config():
+        return fake.config.as_dict()
+
+    @app.post("/_fake/config")
+    async def set_config(request: Request):
+        changes = await request.json()
+        for name, value in changes.items():
+            if name not in FakeAbstractaConfig.RUNTIME_FIELDS:
+                return JSONResponse(
+                    {"error": f"{name} cannot be changed at runtime"}, status_code=400
+                )
+            setattr(fake.config, name, type(getattr(fake.config, name))(value))
+        return fake.config.as_dict()
+
+    return app
+
+
+def client_env(base_url: str) -> dict:
+    """Environment that points AbstractaClient at a fake server on `base_url`."""
+    return {
+        "ABSTRACTA_API_URL": f"{base_url}/rest/data/queryv2",
+        "ABSTRACTA_METADATA_API_URL": f"{base_url}/rest/metadata",
+        "ABSTRACTA_AUTH_URL": f"{base_url}{TOKEN_PATH}",
+    }
+
+
+class FakeAbstractaServer:
+    """
+    Runs the fake in a background thread, e.g. for benchmarks:
+
+        with FakeAbstractaServer(FakeAbstractaConfig(rows=50000)) as server:
+            os.environ.update(client_env(server.base_url))
+    """
+
+    def __init__(
+        self,
+        config: FakeAbstractaConfig | None = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.app = create_app(config)
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.app, host=host, port=port, log_level="warning")
+        )
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise Exception("Fake Abstracta server failed to start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    defaults = FakeAbstractaConfig()
+    for name in (
+        "rows",
+        "users",
+        "services",
+        "latency_ms",
+        "jitter_ms",
+        "per_row_us",
+        "error_rate",
+        "error_status",
+        "token_ttl",
+        "seed",
+    ):
+        default = getattr(defaults, name)
+        parser.add_argument(
+            f"--{name.replace('_', '-')}", type=type(default), default=default
+        )
+    args = parser.parse_args()
+
+    config = FakeAbstractaConfig(
+        **{k: v for k, v in vars(args).items() if k not in ("host", "port")}
+    )
+    logging.basicConfig(level=logging.INFO)
+    for name, value in client_env(f"http://{args.host}:{args.port}").items():
+        print(f"{name}={value}")
+    uvicorn.run(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,16 +11,26 @@ automatically builds the API using Abstracta's services. It includes:
 
 import asyncio
 import logging
+import os
 import re
-import pandas
 import gradio as gr
 import gradio.themes as themes
 from dotenv import load_dotenv
 from abstracta_client import AbstractaClient
+from agent_cache import agent_payload_cache
 from api_builder_ui_helper import buildAPI
+from abstracta_cache import metadata_cache
+from abstracta_transport import get_pool_stats
+from catalog_index import catalog_index
+from client_metrics import ABSTRACTA_METRICS_PORT, client_metrics, start_metrics_server
 from dq_rules_ui_helper import buildDataQualityRulesForExistingAPI
 from examples import examples
 from profile_ui_helper import createProfile
+from query_builder import FILTER_OPERATORS, build_data_query
+from single_flight import get_single_flight_stats
+from result_cache import result_cache
+from result_decoder import ColumnarTable, rows_to_dataframe
+from update_coalescing import coalesced
 
 
 # --------------------- LOGGING CONFIG ---------------------
@@ -47,15 +57,21 @@ def refreshData(api_url_markdown):
             access_token=abstractaClient.perform_auth(), api_url=url
         )
         return [
-            gr.update(value=pandas.DataFrame(data), visible=True),
+            gr.update(value=rows_to_dataframe(data, flatten=()), visible=True),
             gr.update(value=data, visible=False),
         ]
     else:
         raise Exception("No API url defined!")
 
 
+@coalesced()
 async def typewriter_effect(example_text):
-    """Yields text one character at a time to simulate typing."""
+    """
+    Yields text one character at a time to simulate typing.
+
+    Characters typed between two updates are sent together, so an example
+    costs about ten messages per second instead of one per character.
+    """
     typed_text = ""
     for char in example_text:
         typed_text += char
@@ -65,33 +81,150 @@ async def typewriter_effect(example_text):
 
 # --------------------- DATA FETCHING HELPERS ---------------------
 
+# Rows per Data Previewer page.
+PREVIEW_ROW_LIMIT = int(os.getenv("ABSTRACTA_PREVIEW_ROW_LIMIT", "100"))
+
 
-def get_data(org_name, app_name, datasource_name, service_name, service_version):
+def get_data(
+    org_name,
+    app_name,
+    datasource_name,
+    service_name,
+    service_version,
+    query=None,
+    refresh=False,
+    page=0,
+):
     """
-    Fetch data from Abstracta API and return it as a DataFrame.
+    Fetch one page of data from Abstracta API and return it as a DataFrame.
+    `query` carries the queryv2 where/columns/orderby fields to push down.
+    Previews are served from the on-disk result cache unless `refresh` is set.
     """
     logging.info(
-        f"Fetching data: {org_name}/{app_name}/{datasource_name}/{service_name}/{service_version}"
+        f"Fetching data: {org_name}/{app_name}/{datasource_name}/{service_name}/{service_version} {query or ''}"
     )
-    access_token = AbstractaClient().perform_auth()
+    abstractaClient = AbstractaClient()
+    service = (org_name, app_name, datasource_name, service_name, service_version)
+    start = page * PREVIEW_ROW_LIMIT + 1
+    cache_key = result_cache.key(
+        *service, query=query, limit=PREVIEW_ROW_LIMIT, start=start
+    )
+    table = None if refresh else result_cache.get(cache_key)
+    if table is None:
+        table = ColumnarTable.from_batches(
+            abstractaClient.iter_data(
+                abstractaClient.perform_auth(),
+                *service,
+                limit=PREVIEW_ROW_LIMIT,
+                batches=True,
+                query=query,
+                start=start,
+            ),
+            flatten=(),
+        )
+        result_cache.put(cache_key, table, service)
+    else:
+        logging.info(f"Serving {'/'.join(service)} from the result cache")
+    rows = f"rows {start}–{start + len(table) - 1}" if len(table) else "no more rows"
     return (
-        f"[Open in Abstracta]({AbstractaClient().generate_web_url(org_name, app_name, datasource_name, service_name, service_version)})",
+        f"[Open in Abstracta]({abstractaClient.generate_web_url(*service)})",
         gr.update(
-            label=f"{org_name}/{app_name}/{datasource_name}/{service_name}/{service_version}",
-            value=pandas.DataFrame(
-                AbstractaClient().get_data(
-                    access_token,
-                    org_name,
-                    app_name,
-                    datasource_name,
-                    service_name,
-                    service_version,
-                )
-            ),
+            label=f"{'/'.join(service)} · {rows}",
+            value=table.to_pandas(),
+        ),
+    )
+
+
+def with_page_controls(page, link, data):
+    """Add the page number and the Previous/Next button states to a preview."""
+    return (
+        link,
+        data,
+        page,
+        gr.update(interactive=page > 0),
+        # A short page is the last one.
+        gr.update(interactive=len(data["value"]) == PREVIEW_ROW_LIMIT),
+    )
+
+
+def select_service(service, org_name, app_name, datasource_name):
+    """Load a service unfiltered and offer its columns in the filter panel."""
+    service_name, service_version = service.split("/")
+    link, data = get_data(
+        org_name, app_name, datasource_name, service_name, service_version
+    )
+    columns = list(data["value"].columns)
+    return (
+        *with_page_controls(0, link, data),
+        gr.update(choices=columns, value=[]),
+        gr.update(value=[["", "", ""]]),
+        gr.update(choices=[""] + columns, value=""),
+    )
+
+
+def apply_filters(
+    service,
+    org_name,
+    app_name,
+    datasource_name,
+    columns,
+    filters,
+    order_by,
+    order_direction,
+    page=0,
+    refresh=False,
+):
+    """
+    Re-query a page of the selected service with the filter panel pushed down
+    to Abstracta.
+    """
+    if not service:
+        raise gr.Error("Select a service first.")
+    service_name, service_version = service.split("/")
+    rows = filters.values.tolist() if hasattr(filters, "values") else filters or []
+    try:
+        query = build_data_query(columns, rows, order_by, order_direction)
+    except ValueError as e:
+        raise gr.Error(str(e))
+    return with_page_controls(
+        page,
+        *get_data(
+            org_name,
+            app_name,
+            datasource_name,
+            service_name,
+            service_version,
+            query,
+            refresh,
+            page,
         ),
     )
 
 
+def turn_page(step):
+    """Handler that shows the page `step` pages after (or before) the current one."""
+
+    def handler(*filter_panel_and_page):
+        *filter_panel, page = filter_panel_and_page
+        return apply_filters(*filter_panel, page=max(page + step, 0))
+
+    return handler
+
+
+def reload_service(service, org_name, app_name, datasource_name, *filter_panel):
+    """
+    Drop every cached preview of the service and fetch the current page fresh
+    from Abstracta.
+    """
+    if service:
+        result_cache.invalidate(
+            org_name, app_name, datasource_name, *service.split("/")
+        )
+    return apply_filters(
+        service, org_name, app_name, datasource_name, *filter_panel, refresh=True
+    )
+
+
 def get_all_services():
     """Return all available services from Abstracta."""
     return AbstractaClient().get_all_services(AbstractaClient().perform_auth())
@@ -99,6 +232,9 @@ def get_all_services():
 
 def get_services(org_name, app_name, datasource_name):
     """Return services for a given organization, application, and datasource."""
+    services = catalog_index.services(org_name, app_name, datasource_name)
+    if services is not None:
+        return services
     return AbstractaClient().get_services(
         AbstractaClient().perform_auth(), org_name, app_name, datasource_name
     )
@@ -106,27 +242,30 @@ def get_services(org_name, app_name, datasource_name):
 
 def get_organizations():
     """Return all available organizations."""
+    organizations = catalog_index.organizations()
+    if organizations is not None:
+        return organizations
     return AbstractaClient().get_organizations(AbstractaClient().perform_auth())
 
 
 def get_applications(org_name):
     """Return available applications for a given organization."""
-    return gr.update(
-        choices=AbstractaClient().get_applications(
+    applications = catalog_index.applications(org_name)
+    if applications is None:
+        applications = AbstractaClient().get_applications(
             AbstractaClient().perform_auth(), org_name
-        ),
-        value=None,
-    )
+        )
+    return gr.update(choices=applications, value=None)
 
 
 def get_data_sources(org_name, app_name):
     """Return available datasources for a given organization and application."""
-    return gr.update(
-        choices=AbstractaClient().get_data_sources(
+    data_sources = catalog_index.data_sources(org_name, app_name)
+    if data_sources is None:
+        data_sources = AbstractaClient().get_data_sources(
             AbstractaClient().perform_auth(), org_name, app_name
-        ),
-        value=None,
-    )
+        )
+    return gr.update(choices=data_sources, value=None)
 
 
 # --------------------- UTILS ---------------------
@@ -141,13 +280,59 @@ def requirements_on_change(requirements):
     )
 
 
+def get_metrics_dashboard():
+    """Per-operation client metrics plus connection pool and cache counters."""
+    operations = [
+        {k: round(v, 1) if isinstance(v, float) else v for k, v in row.items()}
+        for row in client_metrics.snapshot()
+    ]
+    return (
+        rows_to_dataframe(operations, flatten=()),
+        {
+            "connection_pool": get_pool_stats(),
+            "single_flight": get_single_flight_stats(),
+            "metadata_cache": metadata_cache.stats(),
+            "result_cache": result_cache.stats(),
+            "agent_cache": agent_payload_cache.stats(),
+        },
+        client_metrics.render_prometheus(),
+    )
+
+
 # --------------------- RENDER UI ---------------------
 
+# Builds spend their time waiting on the model and Abstracta, not on the
+# worker, so several run at once. Gradio would otherwise run one build per
+# button at a time, queueing every user (and a session's own resubmit, which
+# has to start for the previous build to be superseded) behind it.
+BUILD_CONCURRENCY = int(os.getenv("ABSTRACTA_BUILD_CONCURRENCY", "16"))
+
 
 def render():
     """
     Render the Gradio UI for the API Builder and Data Previewer.
     """
+    try:
+        catalog_index.load()
+        catalog_index.start_background_refresh()
+    except Exception as e:
+        logging.warning("Catalog index unavailable, querying Abstracta directly: %s", e)
+    if ABSTRACTA_METRICS_PORT:
+        try:
+            server = start_metrics_server(int(ABSTRACTA_METRICS_PORT))
+            host, port = server.server_address[:2]
+            logging.info(f"Serving client metrics on {host}:{port}/metrics")
+        except OSError as e:
+            # Typically a second instance of the app on the same host.
+            logging.warning("Metrics endpoint not started: %s", e)
+
+    build_ui().launch()
+
+
+def build_ui():
+    """
+    Build the Gradio Blocks for the API Builder, Data Previewer and metrics.
+    """
     theme = themes.Soft(primary_hue="blue", secondary_hue="slate").set(
         body_background_fill_dark="#000000"
     )
@@ -201,6 +386,10 @@ def render():
                             variant="primary",
                             interactive=False,
                         )
+                    regenerate = gr.Checkbox(
+                        label="Regenerate payload (ignore cached agent output)",
+                        value=False,
+                    )
 
                 with gr.Column(scale=3):
                     with gr.Row():
@@ -261,18 +450,24 @@ def render():
 
             buildAPIBtn.click(
                 buildAPI,
-                inputs=[requirements],
+                inputs=[requirements, regenerate],
                 outputs=[status_message, api_url, web_url, json_view, dataframe_view],
+                concurrency_limit=BUILD_CONCURRENCY,
+                concurrency_id="build",
             )
             buildDqRulesBtn.click(
                 buildDataQualityRulesForExistingAPI,
-                inputs=[requirements],
+                inputs=[requirements, regenerate],
                 outputs=[status_message, api_url, web_url, json_view, dataframe_view],
+                concurrency_limit=BUILD_CONCURRENCY,
+                concurrency_id="build",
             )
             createProfileBtn.click(
                 createProfile,
-                inputs=[requirements],
+                inputs=[requirements, regenerate],
                 outputs=[status_message, api_url, web_url, json_view, dataframe_view],
+                concurrency_limit=BUILD_CONCURRENCY,
+                concurrency_id="build",
             )
 
             requirements.change(
@@ -296,12 +491,38 @@ def render():
                         elem_classes="radio-item",
                         visible=False,
                     )
+                    with gr.Accordion("Filter & columns", open=False):
+                        columnsDropDown = gr.Dropdown(
+                            label="Columns", multiselect=True, choices=[]
+                        )
+                        filtersTable = gr.Dataframe(
+                            headers=["column", "operator", "value"],
+                            datatype=["str", "str", "str"],
+                            value=[["", "", ""]],
+                            col_count=(3, "fixed"),
+                            row_count=(1, "dynamic"),
+                            interactive=True,
+                            label=f"Filters (all must match): {', '.join(FILTER_OPERATORS)}",
+                        )
+                        with gr.Row():
+                            orderByDropDown = gr.Dropdown(label="Order by", choices=[])
+                            orderDirection = gr.Radio(
+                                ["asc", "desc"], value="asc", label="Direction"
+                            )
+                        applyFiltersBtn = gr.Button("Apply", variant="primary")
+                    reloadBtn = gr.Button("🔄 Reload from Abstracta")
 
                 with gr.Column(scale=4):
                     abstractaWebHyperLink = gr.Markdown("")
                     dataFrame = gr.DataFrame(
                         value=[], show_search="filter", label="Preview"
                     )
+                    with gr.Row():
+                        previousPageBtn = gr.Button(
+                            "◀ Previous", size="sm", interactive=False
+                        )
+                        nextPageBtn = gr.Button("Next ▶", size="sm", interactive=False)
+                    previewPage = gr.State(0)
 
             orgDropDown.change(get_applications, [orgDropDown], [appDropDown])
             appDropDown.change(
@@ -319,12 +540,62 @@ def render():
                 [service_selector],
             )
             service_selector.change(
-                lambda s, o, a, d: get_data(o, a, d, s.split("/")[0], s.split("/")[1]),
+                select_service,
                 [service_selector, orgDropDown, appDropDown, datasourceDropDown],
-                [abstractaWebHyperLink, dataFrame],
+                [
+                    abstractaWebHyperLink,
+                    dataFrame,
+                    previewPage,
+                    previousPageBtn,
+                    nextPageBtn,
+                    columnsDropDown,
+                    filtersTable,
+                    orderByDropDown,
+                ],
+            )
+            filterInputs = [
+                service_selector,
+                orgDropDown,
+                appDropDown,
+                datasourceDropDown,
+                columnsDropDown,
+                filtersTable,
+                orderByDropDown,
+                orderDirection,
+            ]
+            previewOutputs = [
+                abstractaWebHyperLink,
+                dataFrame,
+                previewPage,
+                previousPageBtn,
+                nextPageBtn,
+            ]
+            # New filters start again from the first page.
+            applyFiltersBtn.click(apply_filters, filterInputs, previewOutputs)
+            reloadBtn.click(
+                reload_service, filterInputs + [previewPage], previewOutputs
             )
+            previousPageBtn.click(
+                turn_page(-1), filterInputs + [previewPage], previewOutputs
+            )
+            nextPageBtn.click(turn_page(1), filterInputs + [previewPage], previewOutputs)
 
-    demo.launch()
+        with gr.Tab("📈 Client Metrics") as metricsTab:
+            gr.Markdown(
+                "### Abstracta client metrics\nLatency, bytes, rows and errors per client operation since startup."
+            )
+            metricsTable = gr.DataFrame(value=[], label="Operations")
+            with gr.Accordion("Connections & caches", open=False):
+                metricsStats = gr.JSON()
+            with gr.Accordion("Prometheus exposition", open=False):
+                metricsText = gr.Code(language=None)
+            refreshMetricsBtn = gr.Button("🔄 Refresh")
+            metricsOutputs = [metricsTable, metricsStats, metricsText]
+            # Collected on demand only: the stats scan the on-disk caches.
+            refreshMetricsBtn.click(get_metrics_dashboard, [], metricsOutputs)
+            metricsTab.select(get_metrics_dashboard, [], metricsOutputs)
+
+    return demo
 
 
 if __name__ == "__main__":
@@ -1,42 +1,97 @@
 import logging
+from contextlib import aclosing
 import gradio as gr
 from dotenv import load_dotenv
-import pandas
-from abstracta_client import AbstractaClient
-from agents import Runner, trace
+from abstracta_async_client import AsyncAbstractaClient
+from agent_cache import agent_payload_cache
 from markdown_formatter import format_url_as_markdown
+from result_decoder import rows_to_dataframe
 from profile_builder_agent import profileBuilderAgent
+from step_checkpoints import run_id_for, step_checkpoints
 from steps_executor import steps_executor, fn_report_build_progress
 
+# Checkpoint entry with the users a failed run already assigned the profile to.
+ASSIGNED_USERS = "assign_profile:assigned_users"
 
-async def createProfile(requirements):
+
+async def createProfile(
+    requirements,
+    regenerate=False,
+    request: gr.Request = None,
+    report=None,
+    session=None,
+):
     """
-    Main async function that runs the data quality rules building process.
+    Main async function that creates a security profile and assigns it to
+    the requested users.
     Yields status updates at each step for live progress display.
+
+    The agent's payload is reused from the agent cache when the same
+    requirements were built before; `regenerate=True` asks the model again.
+
+    With `report` (a dict) the pipeline runs headless for batch use: nothing
+    is rendered or yielded and the dict receives the outcome, step timings
+    and results (see steps_executor). `session` stands in for the Gradio
+    session when there is no request: a retry with the same session and
+    requirements resumes from the failed step.
     """
 
+    abstractaClient = AsyncAbstractaClient()
+
     async def buildPayload(context):
-        with trace("abstracta-profile-builder-agent"):
-            payload_result = await Runner.run(profileBuilderAgent, requirements)
-            logging.info("payload_result = %s", payload_result.final_output)
-            return payload_result.final_output
+        payload_result = await agent_payload_cache.run(
+            profileBuilderAgent, requirements, refresh=regenerate
+        )
+        logging.info("payload_result = %s", payload_result)
+        return payload_result
 
     async def performAuth(context):
-        return AbstractaClient().perform_auth()
+        return await abstractaClient.perform_auth()
 
     async def createProfile(context):
         access_token = context.get("abstracta_auth")
         payload_result = context.get("construct_payload")
         logging.info("access_token = %s", access_token)
         logging.info("payload_result = %s", payload_result)
-        return AbstractaClient().add_profile(access_token, payload_result)
+        return await abstractaClient.add_profile(access_token, payload_result)
 
     async def assignProfileToUsers(context):
         access_token = context.get("abstracta_auth")
         payload_result = context.get("construct_payload")
         logging.info("access_token = %s", access_token)
         logging.info("payload_result = %s", payload_result)
-        return AbstractaClient().assign_profile_to_users(access_token, payload_result)
+        # Users assigned by an earlier, partly failed attempt of this run are
+        # not posted again.
+        assigned = (
+            step_checkpoints.load(run_id).get(ASSIGNED_USERS, {}) if run_id else {}
+        )
+        remaining = [name for name in payload_result.user_names if name not in assigned]
+        newResults = (
+            await abstractaClient.assign_profile_to_users(
+                access_token,
+                payload_result.model_copy(update={"user_names": remaining}),
+            )
+            if remaining
+            else []
+        )
+        resultsByUser = {**assigned, **{r["user_name"]: r for r in newResults}}
+        results = [
+            resultsByUser[name] for name in dict.fromkeys(payload_result.user_names)
+        ]
+        logging.info("assignment results = %s", results)
+        failures = [result for result in results if result["status"] != "assigned"]
+        if failures:
+            if run_id:
+                step_checkpoints.save(
+                    run_id,
+                    ASSIGNED_USERS,
+                    {r["user_name"]: r for r in results if r["status"] == "assigned"},
+                )
+            raise Exception(
+                f"Profile assigned to {len(results) - len(failures)}/{len(results)} users; "
+                + "; ".join(f"{f['user_name']}: {f['error']}" for f in failures)
+            )
+        return results
 
     def makeComponentVisible(visible: bool = True):
         return gr.update(visible=visible)
@@ -47,16 +102,13 @@ async def createProfile(requirements):
         if not dataframe:
             return gr.update(value=context[attribute], visible=visible)
         else:
-            df = pandas.DataFrame(context[attribute])
-            dq_df = pandas.json_normalize(df["_dq"])
-            dq_df.columns = [f"_dq.{subcol}" for subcol in dq_df.columns]
-            df_flat = pandas.concat([df.drop(columns=["_dq"]), dq_df], axis=1)
+            df_flat = rows_to_dataframe(context[attribute])
 
             return gr.update(value=df_flat, visible=visible)
 
     initial_outputs = (
         gr.update(
-            value="Building Data Quality Rules ... please wait.", visible=True
+            value="Building Profile ... please wait.", visible=True
         ),  # status_message
         "",  # api_url
         "",  # web_url
@@ -69,6 +121,7 @@ async def createProfile(requirements):
             "key": "construct_payload",
             "name": "Constructing Profiles Builder Payload",
             "func": buildPayload,
+            "depends_on": [],
             "yield": [
                 lambda context: "",
                 lambda context: "",
@@ -80,6 +133,10 @@ async def createProfile(requirements):
             "key": "abstracta_auth",
             "name": "Authenticating to Abstracta API",
             "func": performAuth,
+            "depends_on": [],
+            # The client's token manager already reuses a valid token and
+            # refreshes an expired one, so a resumed run asks it again.
+            "checkpoint": False,
             "yield": [
                 lambda context: "",
                 lambda context: "",
@@ -91,6 +148,7 @@ async def createProfile(requirements):
             "key": "create_profile",
             "name": "Creating Profile",
             "func": createProfile,
+            "depends_on": ["construct_payload", "abstracta_auth"],
             "yield": [
                 lambda context: "",
                 lambda context: "",
@@ -102,6 +160,7 @@ async def createProfile(requirements):
             "key": "assign_profile",
             "name": "Assigning Profile to users",
             "func": assignProfileToUsers,
+            "depends_on": ["construct_payload", "abstracta_auth", "create_profile"],
             "yield": [
                 lambda context: "",
                 lambda context: "",
@@ -114,18 +173,42 @@ async def createProfile(requirements):
 
     # final_outputs = ("Final API URL", "Final Web URL", data, pd.DataFrame(data))
 
-    async for step in steps_executor(
-        steps_info=steps_info,
-        initial_outputs=initial_outputs,
-        build_progress_fn=fn_report_build_progress,
-        final_message="✅ All done!",
-        final_outputs=(
-            gr.update(value="✅ All done!", visible=True),
-            "",
-            "",
-            makeComponentVisible(visible=False),
-            makeComponentVisible(visible=False),
-        ),
-    ):
-        logging.debug("results = %s", step)
-        yield step
+    # Checkpoints and superseding are per browser session (or per batch
+    # item), so users submitting the same text never share a run.
+    session = request.session_hash if request else session
+    run_id = (
+        run_id_for("abstracta-profile-builder-agent", session, requirements)
+        if session
+        else None
+    )
+    if regenerate and run_id:
+        # Steps saved from a failed attempt were built on the old payload.
+        step_checkpoints.discard(run_id)
+
+    # Close the executor as soon as Gradio stops reading (tab closed), so its
+    # in-flight steps are cancelled instead of running to completion.
+    async with aclosing(
+        steps_executor(
+            steps_info=steps_info,
+            initial_outputs=initial_outputs,
+            build_progress_fn=fn_report_build_progress,
+            trace_name="abstracta-profile-builder-agent",
+            # Retrying the same requirements after a failure resumes from the
+            # failed step instead of calling the agent again.
+            run_id=run_id,
+            # A new build from the same browser session cancels this one.
+            cancel_key=session,
+            report=report,
+            final_message="✅ All done!",
+            final_outputs=(
+                gr.update(value="✅ All done!", visible=True),
+                "",
+                "",
+                makeComponentVisible(visible=False),
+                makeComponentVisible(visible=False),
+            ),
+        )
+    ) as steps:
+        async for step in steps:
+            logging.debug("results = %s", step)
+            yield step
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import re
+from dataclasses import dataclass, replace
+
+PLACEHOLDER_PATTERN = re.compile(r":([A-Za-z_][A-Za-z0-9_]*)")
+IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+# Escape character for LIKE patterns. Not a backslash, which some SQL
+# dialects also treat as an escape inside string literals.
+LIKE_ESCAPE = "!"
+
+# Operators offered by the Data Previewer filter panel.
+FILTER_OPERATORS = [
+    "=",
+    "!=",
+    ">",
+    ">=",
+    "<",
+    "<=",
+    "contains",
+    "starts with",
+    "in",
+    "is null",
+    "is not null",
+]
+
+
+def quote_identifier(name: str) -> str:
+    """Validate a column name before it is placed in a queryv2 clause."""
+    name = str(name).strip()
+    if not IDENTIFIER_PATTERN.match(name):
+        raise ValueError(f"Invalid column name: {name!r}")
+    return name
+
+
+def sql_literal(value) -> str:
+    """Render a Python value as a SQL literal, escaping quotes in strings."""
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def like_pattern(value, prefix: str = "", suffix: str = "") -> str:
+    """
+    A LIKE pattern matching `value` literally between the `prefix` and
+    `suffix` wildcards, with its ESCAPE clause.
+    """
+    escaped = re.sub(r"[%_!]", lambda m: LIKE_ESCAPE + m.group(), str(value))
+    return f"{sql_literal(prefix + escaped + suffix)} ESCAPE '{LIKE_ESCAPE}'"
+
+
+def build_condition(column: str, operator: str, value=None) -> str:
+    column = quote_identifier(column)
+    operator = operator.strip().lower()
+    if operator in ("=", "!=", ">", ">=", "<", "<="):
+        return f"{column} {'<>' if operator == '!=' else operator} {sql_literal(value)}"
+    if operator == "contains":
+        return f"{column} LIKE {like_pattern(value, '%', '%')}"
+    if operator == "starts with":
+        return f"{column} LIKE {like_pattern(value, suffix='%')}"
+    if operator == "in":
+        values = value if isinstance(value, (list, tuple)) else str(value).split(",")
+        return f"{column} IN ({', '.join(sql_literal(v.strip() if isinstance(v, str) else v) for v in values)})"
+    if operator == "is null":
+        return f"{column} IS NULL"
+    if operator == "is not null":
+        return f"{column} IS NOT NULL"
+    raise ValueError(f"Unsupported filter operator: {operator!r}")
+
+
+def bind_sql(sql: str, **params) -> str:
+    """
+    Substitute `:name` placeholders in a trusted SQL template with
+    `sql_literal(params[name])`. Values are inserted after scanning, so
+    their contents are never interpreted as placeholders.
+    """
+
+    def substitute(match):
+        name = match.group(1)
+        if name not in params:
+            raise ValueError(f"Missing value for SQL parameter :{name}")
+        return sql_literal(params[name])
+
+    return PLACEHOLDER_PATTERN.sub(substitute, sql)
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """
+    An immutable queryv2 query: projected columns, filter clauses, ordering
+    and a row window. Builder methods return a new spec, e.g.
+
+        QuerySpec().select("app_name").where("app_name", "=", name).page(0, 100)
+
+    Filter values are always rendered through `sql_literal`, and the same
+    spec always produces the same `cache_key()`.
+    """
+
+    columns: tuple = ()
+    clauses: tuple = ()
+    order: tuple = ()
+    from_: int = 1
+    to: int = 100
+
+    def select(self, *columns: str) -> "QuerySpec":
+        return replace(
+            self, columns=tuple(quote_identifier(column) for column in columns)
+        )
+
+    def where(self, column: str, operator: str, value=None) -> "QuerySpec":
+        return replace(
+            self, clauses=self.clauses + (build_condition(column, operator, value),)
+        )
+
+    def where_sql(self, sql: str, **params) -> "QuerySpec":
+        """Add a trusted SQL clause (e.g. a subquery) with bound `:name` values."""
+        return replace(self, clauses=self.clauses + (bind_sql(sql, **params),))
+
+    def order_by(self, column: str | None, direction: str = "asc") -> "QuerySpec":
+        # No column (e.g. an empty "Order by" dropdown) keeps the spec as is.
+        if not column:
+            return self
+        return replace(self, order=self.order + (build_orderby(column, direction),))
+
+    def page(self, from_: int, to: int) -> "QuerySpec":
+        return replace(self, from_=from_, to=to)
+
+    def fields(self) -> dict:
+        """The queryv2 `where`, `columns`, `from`, `to` and `orderby` fields."""
+        fields = {
+            "where": " AND ".join(self.clauses) if self.clauses else "1 = 1",
+            "from": self.from_,
+            "to": self.to,
+            "columns": ", ".join(self.columns) if self.columns else "*",
+        }
+        if self.order:
+            fields["orderby"] = ", ".join(self.order)
+        return fields
+
+    def cache_key(self) -> str:
+        return hashlib.sha256(
+            json.dumps(self.fields(), sort_keys=True).encode()
+        ).hexdigest()
+
+
+def build_orderby(column: str | None, direction: str = "asc") -> str | None:
+    if not column:
+        return None
+    direction = direction.strip().upper()
+    if direction not in ("ASC", "DESC"):
+        raise ValueError(f"Unsupported sort direction: {direction!r}")
+    return f"{quote_identifier(column)} {direction}"
+
+
+def build_data_query(columns=None, conditions=(), order_by=None, direction="asc"):
+    """QuerySpec for a Data Previewer read from the filter panel's choices."""
+    spec = QuerySpec().select(*(columns or ()))
+    for column, operator, value in conditions:
+        if str(column or "").strip() and str(operator or "").strip():
+            spec = spec.where(column, operator, value)
+    if order_by:
+        spec = spec.order_by(order_by, direction)
+    return spec
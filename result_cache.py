@@ -0,0 +1,217 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import numpy
+from abstracta_client import ABSTRACTA_API_URL
+from result_decoder import ColumnarTable
+
+ABSTRACTA_RESULT_CACHE_ENABLED = (
+    os.getenv("ABSTRACTA_RESULT_CACHE_ENABLED", "true").lower() == "true"
+)
+ABSTRACTA_RESULT_CACHE_DIR = os.path.expanduser(
+    os.getenv("ABSTRACTA_RESULT_CACHE_DIR", "~/.cache/abstracta/results")
+)
+# Seconds a cached preview is served before it is fetched again.
+ABSTRACTA_RESULT_CACHE_TTL = float(os.getenv("ABSTRACTA_RESULT_CACHE_TTL", "600"))
+# Total size of the cache directory; least recently read entries go first.
+ABSTRACTA_RESULT_CACHE_MAX_BYTES = int(
+    os.getenv("ABSTRACTA_RESULT_CACHE_MAX_BYTES", str(512 * 1024 * 1024))
+)
+
+META_FILE = "meta.json"
+
+
+class ResultCache:
+    """
+    On-disk cache of service previews, one directory per entry.
+
+    Each column of a ColumnarTable is written as its own file: typed columns
+    as `.npy` arrays that are memory-mapped on read, object columns (strings,
+    nested values) as JSON. `meta.json` records the column layout, the
+    service the rows came from and when they were fetched; its mtime is
+    bumped on every hit and drives least-recently-used eviction.
+    """
+
+    def __init__(
+        self,
+        directory: str = ABSTRACTA_RESULT_CACHE_DIR,
+        ttl: float = ABSTRACTA_RESULT_CACHE_TTL,
+        max_bytes: int = ABSTRACTA_RESULT_CACHE_MAX_BYTES,
+        enabled: bool = ABSTRACTA_RESULT_CACHE_ENABLED,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(
+        self, org, app, datasource, service, version, query=None, limit=None, start=1
+    ):
+        """
+        Entry name for one preview, scoped to the Abstracta deployment and the
+        `forUser` identity.
+        """
+        identity = [
+            ABSTRACTA_API_URL,
+            os.getenv("ABSTRACTA_FOR_USER"),
+            org,
+            app,
+            datasource,
+            service,
+            version,
+            query.cache_key() if query is not None else None,
+            limit,
+            start,
+        ]
+        return hashlib.sha256(json.dumps(identity).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get(self, key: str) -> ColumnarTable | None:
+        """Return the cached table, or None when missing, expired or unreadable."""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(os.path.join(path, META_FILE)) as f:
+                meta = json.load(f)
+            if time.time() - meta["created_at"] > self.ttl:
+                self._remove(path)
+                self.misses += 1
+                return None
+            columns = {}
+            for column in meta["columns"]:
+                file = os.path.join(path, column["file"])
+                if column["file"].endswith(".npy"):
+                    columns[column["name"]] = numpy.load(file, mmap_mode="r")
+                else:
+                    with open(file) as f:
+                        array = numpy.empty(meta["num_rows"], dtype=object)
+                        array[:] = json.load(f)
+                        columns[column["name"]] = array
+            os.utime(os.path.join(path, META_FILE))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Discarding unreadable result cache entry {key}: {e}")
+            self._remove(path)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ColumnarTable(columns, meta["num_rows"])
+
+    def put(self, key: str, table: ColumnarTable, service: tuple = ()):
+        """Store `table` under `key`; `service` is recorded for `invalidate`."""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # Write to a private directory and rename it into place, so readers
+        # never see a half-written entry.
+        staging = self._path(f".{key}.{uuid.uuid4().hex}")
+        os.makedirs(staging)
+        try:
+            columns = []
+            for i, (name, array) in enumerate(table.columns.items()):
+                if array.dtype == object:
+                    file = f"{i}.json"
+                    with open(os.path.join(staging, file), "w") as f:
+                        json.dump(array.tolist(), f, default=str)
+                else:
+                    file = f"{i}.npy"
+                    numpy.save(os.path.join(staging, file), array)
+                columns.append({"name": name, "file": file})
+            with open(os.path.join(staging, META_FILE), "w") as f:
+                json.dump(
+                    {
+                        "service": list(service),
+                        "created_at": time.time(),
+                        "num_rows": table.num_rows,
+                        "columns": columns,
+                    },
+                    f,
+                )
+            with self._lock:
+                self._remove(self._path(key))
+                os.rename(staging, self._path(key))
+        except BaseException:
+            self._remove(staging)
+            raise
+        self._evict()
+
+    def invalidate(self, *service):
+        """
+        Drop every entry (any query) for the service path given, e.g.
+        `invalidate(org, app, datasource, service, version)`; a shorter path
+        drops everything below it, and no path clears the cache.
+        """
+        for path, meta in self._entries():
+            if list(meta.get("service", []))[: len(service)] == list(service):
+                self._remove(path)
+
+    def clear(self):
+        self.invalidate()
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = self._path(name)
+            if name.startswith("."):
+                continue
+            try:
+                with open(os.path.join(path, META_FILE)) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield path, meta
+
+    def _evict(self):
+        """Remove least recently read entries until the cache fits `max_bytes`."""
+        entries = []
+        total = 0
+        for path, _ in self._entries():
+            try:
+                size = sum(
+                    entry.stat().st_size
+                    for entry in os.scandir(path)
+                    if entry.is_file()
+                )
+                read_at = os.path.getmtime(os.path.join(path, META_FILE))
+            except OSError:
+                continue
+            entries.append((read_at, size, path))
+            total += size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    def _remove(self, path: str):
+        shutil.rmtree(path, ignore_errors=True)
+
+    def stats(self) -> dict:
+        entries = list(self._entries())
+        return {
+            "entries": len(entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl": self.ttl,
+            "max_bytes": self.max_bytes,
+            "directory": self.directory,
+        }
+
+
+result_cache = ResultCache()
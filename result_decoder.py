@@ -0,0 +1,139 @@
+import json
+import numpy
+import pandas
+
+try:
+    import orjson
+except ImportError:  # orjson ships with gradio, but keep the stdlib fallback
+    orjson = None
+
+
+def decode_json(content: bytes):
+    """Decode a response body, using orjson when it is available."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def encode_json(value) -> bytes:
+    """Encode a value as JSON bytes; non-JSON values fall back to `str`."""
+    if orjson is not None:
+        return orjson.dumps(value, default=str)
+    return json.dumps(value, default=str).encode()
+
+
+def _to_array(values: list) -> numpy.ndarray:
+    """
+    Pack one column into the narrowest NumPy dtype that holds it:
+    bool, int64, float64 (ints with nulls become NaN), else object.
+    """
+    kinds = set()
+    has_null = False
+    for value in values:
+        if value is None:
+            has_null = True
+        else:
+            kinds.add(type(value))
+            if len(kinds) > 2:
+                break
+
+    if kinds == {bool} and not has_null:
+        return numpy.array(values, dtype=numpy.bool_)
+    if kinds == {int} and not has_null:
+        try:
+            return numpy.array(values, dtype=numpy.int64)
+        except OverflowError:
+            return numpy.array(values, dtype=object)
+    if kinds and kinds <= {int, float}:
+        return numpy.array(
+            [numpy.nan if value is None else value for value in values],
+            dtype=numpy.float64,
+        )
+    array = numpy.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+class ColumnarTable:
+    """
+    Query result stored column by column as typed NumPy arrays.
+
+    Built straight from lean queryv2 rows (optionally one page at a time),
+    with nested fields such as `_dq` flattened into dotted columns, and
+    handed to pandas without another copy.
+    """
+
+    def __init__(self, columns: dict[str, numpy.ndarray], num_rows: int):
+        self.columns = columns
+        self.num_rows = num_rows
+
+    def __len__(self):
+        return self.num_rows
+
+    @property
+    def column_names(self) -> list[str]:
+        return list(self.columns)
+
+    @classmethod
+    def from_rows(cls, rows, flatten=("_dq",), flatten_prefix: bool = True):
+        return cls.from_batches([rows], flatten, flatten_prefix)
+
+    @classmethod
+    def from_batches(cls, batches, flatten=("_dq",), flatten_prefix: bool = True):
+        """
+        Build a table from an iterable of row lists (e.g. `iter_data(...,
+        batches=True)`). Each batch is folded into the column buffers and can
+        be released before the next one arrives.
+
+        Dict values under a key in `flatten` become one column per leaf,
+        named `key.leaf` (or just `leaf` when `flatten_prefix` is false).
+        """
+        buffers = {}
+        num_rows = 0
+        for batch in batches:
+            for row in batch:
+                flat = _flatten_row(row, flatten, flatten_prefix)
+                for name, value in flat.items():
+                    column = buffers.get(name)
+                    if column is None:
+                        # Rows before this one did not have the column.
+                        column = buffers[name] = [None] * num_rows
+                    column.append(value)
+                num_rows += 1
+                for column in buffers.values():
+                    if len(column) < num_rows:
+                        column.append(None)
+        return cls(
+            {name: _to_array(values) for name, values in buffers.items()}, num_rows
+        )
+
+    def to_pandas(self) -> pandas.DataFrame:
+        # Each array becomes its own block; copy=False keeps pandas from
+        # consolidating them into a new 2-D buffer.
+        return pandas.DataFrame(self.columns, copy=False)
+
+
+def _flatten_row(row: dict, flatten, flatten_prefix: bool) -> dict:
+    flat = {}
+    for key, value in row.items():
+        if key in flatten and isinstance(value, dict):
+            for leaf, leaf_value in _flatten_dict(value, key if flatten_prefix else ""):
+                # Unprefixed leaves must not clobber top-level columns.
+                flat[leaf if leaf not in row else f"{key}.{leaf}"] = leaf_value
+        else:
+            flat[key] = value
+    return flat
+
+
+def _flatten_dict(value: dict, prefix: str):
+    for key, item in value.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(item, dict):
+            yield from _flatten_dict(item, name)
+        else:
+            yield name, item
+
+
+def rows_to_dataframe(rows, flatten=("_dq",), flatten_prefix: bool = True):
+    """Shortcut for `ColumnarTable.from_rows(...).to_pandas()`."""
+    return ColumnarTable.from_rows(rows, flatten, flatten_prefix).to_pandas()
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import os
+import threading
+
+ABSTRACTA_SINGLE_FLIGHT = os.getenv("ABSTRACTA_SINGLE_FLIGHT", "true").lower() == "true"
+
+
+def request_key(access_token: str, url: str, payload) -> tuple:
+    """Identity of a request: same caller, same URL, same payload."""
+    return (access_token, url, json.dumps(payload, sort_keys=True, default=str))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Collapses identical concurrent calls into one.
+
+    The first caller for a key runs `fn`; callers arriving with the same key
+    while it is running block until it finishes and receive the same result
+    (or exception). Results are shared, not copied, so callers must treat
+    them as read-only.
+    """
+
+    def __init__(self, enabled: bool = ABSTRACTA_SINGLE_FLIGHT):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        if not self.enabled:
+            return fn()
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls),
+            }
+
+
+class _AsyncCall:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    asyncio counterpart of SingleFlight. The shared call runs as its own
+    task, so a waiter being cancelled does not cancel it for the others;
+    it is cancelled once the last waiter is, so an abandoned request (e.g.
+    a cancelled pipeline) does not run to completion.
+    """
+
+    def __init__(self, enabled: bool = ABSTRACTA_SINGLE_FLIGHT):
+        self.enabled = enabled
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn):
+        if not self.enabled:
+            return await coro_fn()
+
+        # Tasks belong to one event loop; never share them across loops.
+        key = (id(asyncio.get_running_loop()), key)
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _AsyncCall(asyncio.ensure_future(coro_fn()))
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key, call: _AsyncCall):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._calls),
+        }
+
+
+single_flight = SingleFlight()
+async_single_flight = AsyncSingleFlight()
+
+
+def get_single_flight_stats() -> dict:
+    return {"sync": single_flight.stats(), "async": async_single_flight.stats()}
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+# Seconds the results of a failed run are kept for a retry to resume from.
+ABSTRACTA_CHECKPOINT_TTL = float(os.getenv("ABSTRACTA_CHECKPOINT_TTL", "3600"))
+
+
+def run_id_for(*parts) -> str:
+    """
+    Run ID for a pipeline invocation, scoped to the `forUser` identity. Pass
+    the caller's session among `parts`, so that only that session's retry
+    resumes the run.
+    """
+    identity = [os.getenv("ABSTRACTA_FOR_USER"), *parts]
+    return hashlib.sha256(json.dumps(identity, default=str).encode()).hexdigest()
+
+
+class StepCheckpoints:
+    """
+    Results of the completed steps of each pipeline run, by run ID.
+
+    steps_executor saves every step result as it finishes and discards the
+    run once all steps succeed, so only failed runs stay here. A retry with
+    the same run ID puts the saved results back into the context and only
+    runs what is left. Results are kept in memory as the step returned them
+    (agent output models, API responses), never written to disk.
+    """
+
+    def __init__(self, ttl: float = ABSTRACTA_CHECKPOINT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._runs = {}  # run_id -> (saved_at, {step key: result})
+
+    def _expire(self):
+        now = time.monotonic()
+        for run_id, (saved_at, _) in list(self._runs.items()):
+            if now - saved_at > self.ttl:
+                del self._runs[run_id]
+
+    def load(self, run_id: str) -> dict:
+        """Return the saved step results of `run_id`, by step key."""
+        with self._lock:
+            self._expire()
+            _, results = self._runs.get(run_id, (None, {}))
+            return dict(results)
+
+    def save(self, run_id: str, key: str, result):
+        with self._lock:
+            _, results = self._runs.get(run_id, (None, {}))
+            results[key] = result
+            self._runs[run_id] = (time.monotonic(), results)
+
+    def discard(self, run_id: str):
+        with self._lock:
+            if self._runs.pop(run_id, None) is not None:
+                logging.debug("Discarded checkpoints of run %s.", run_id)
+
+    def clear(self):
+        with self._lock:
+            self._runs = {}
+
+
+step_checkpoints = StepCheckpoints()
@@ -0,0 +1,174 @@
+import asyncio
+import contextvars
+import logging
+import time
+from dataclasses import asdict, dataclass
+from agents import custom_span, trace
+from result_decoder import encode_json
+
+
+@dataclass
+class StepSpan:
+    """
+    Timing of one pipeline step.
+
+    `busy_seconds` is time spent running the step's own code on the event
+    loop (including any blocking calls it makes); the rest of the wall time,
+    `io_wait_seconds`, the step spent suspended on awaits. An `offloaded`
+    step ran on a worker thread, which the loop cannot see into, so all of
+    its wall time counts as busy.
+    """
+
+    key: str
+    name: str
+    offset_seconds: float = 0.0  # start, relative to the pipeline start
+    wall_seconds: float = 0.0
+    busy_seconds: float = 0.0
+    result_bytes: int = 0
+    status: str = "pending"  # pending | running | ok | error | cancelled | resumed
+    error: str | None = None
+    offloaded: bool = False
+
+    @property
+    def io_wait_seconds(self) -> float:
+        return max(self.wall_seconds - self.busy_seconds, 0.0)
+
+    @property
+    def wait_summary(self) -> str:
+        return "offloaded" if self.offloaded else f"{self.io_wait_seconds:.2f}s io wait"
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), "io_wait_seconds": self.io_wait_seconds}
+
+
+class _TimedCoroutine:
+    """Drives a coroutine and adds up the time spent inside each resumption."""
+
+    def __init__(self, coro):
+        self.coro = coro
+        self.busy_seconds = 0.0
+
+    def __await__(self):
+        value, error = None, None
+        while True:
+            started = time.perf_counter()
+            try:
+                if error is not None:
+                    future = self.coro.throw(error)
+                else:
+                    future = self.coro.send(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.busy_seconds += time.perf_counter() - started
+            try:
+                value, error = (yield future), None
+            except BaseException as e:
+                value, error = None, e
+
+
+def result_size(result) -> int:
+    """Approximate size of a step result, in bytes of JSON."""
+    if result is None:
+        return 0
+    if isinstance(result, bytes):
+        return len(result)
+    if isinstance(result, str):
+        return len(result.encode())
+    if hasattr(result, "model_dump_json"):
+        return len(result.model_dump_json())
+    try:
+        return len(encode_json(result))
+    except (TypeError, ValueError):
+        return 0
+
+
+class PipelineSpans:
+    """
+    Times the steps of one steps_executor run.
+
+    When `trace_name` is given the run gets an agents `trace()` and each step
+    a custom span inside it. Steps started with `start` run in a copy of a
+    context in which the trace is current, so their spans, and the
+    `Runner.run` calls made by a step, nest under it without the trace ever
+    becoming current in the caller's context.
+    """
+
+    def __init__(self, step_keys: list[str], step_names: list[str], trace_name=None):
+        self.started = time.perf_counter()
+        self.spans = [StepSpan(key, name) for key, name in zip(step_keys, step_names)]
+        self.trace = trace(trace_name) if trace_name else None
+        self.finished = False
+        self._context = contextvars.copy_context()
+        if self.trace is not None:
+            self._context.run(self.trace.start, mark_as_current=True)
+
+    def start(
+        self, index: int, step_func, context, offloaded: bool = False
+    ) -> asyncio.Task:
+        """Run step `index` as a task in which the pipeline's trace is current."""
+        return asyncio.create_task(
+            self.run(index, step_func, context, offloaded),
+            context=self._context.copy(),
+        )
+
+    async def run(self, index: int, step_func, context, offloaded: bool = False):
+        span = self.spans[index]
+        span.offloaded = offloaded
+        if self.trace is None:
+            return await self._run(span, step_func, context)
+        with custom_span(span.name, {"key": span.key}) as agents_span:
+            try:
+                return await self._run(span, step_func, context)
+            finally:
+                if span.status == "error":
+                    agents_span.set_error({"message": span.error, "data": None})
+                agents_span.span_data.data.update(span.as_dict())
+
+    async def _run(self, span: StepSpan, step_func, context):
+        span.status = "running"
+        started = time.perf_counter()
+        span.offset_seconds = started - self.started
+        timed = _TimedCoroutine(step_func(context))
+        try:
+            result = await timed
+            span.status = "ok"
+            span.result_bytes = result_size(result)
+            return result
+        except asyncio.CancelledError:
+            span.status = "cancelled"
+            raise
+        except BaseException as e:
+            span.status = "error"
+            span.error = str(e)
+            raise
+        finally:
+            span.wall_seconds = time.perf_counter() - started
+            span.busy_seconds = (
+                span.wall_seconds if span.offloaded else timed.busy_seconds
+            )
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def finish(self):
+        """Close the trace and log the step timings; later calls do nothing."""
+        if self.finished:
+            return
+        self.finished = True
+        if self.trace is not None:
+            self.trace.finish()
+        logging.info(
+            "Pipeline timings (%.2fs): %s",
+            self.elapsed_seconds,
+            [
+                f"{span.key}: {span.wall_seconds:.2f}s wall, "
+                f"{span.wait_summary}, {span.result_bytes} B"
+                for span in self.spans
+                if span.status in ("ok", "error", "cancelled")
+            ],
+        )
+
+    def as_dicts(self) -> list[dict]:
+        return [span.as_dict() for span in self.spans]
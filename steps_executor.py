@@ -1,7 +1,93 @@
 import asyncio
+import contextvars
+import functools
+import inspect
 import logging
-import time
+import os
+from concurrent.futures import ThreadPoolExecutor
 import gradio as gr
+import pandas as pd
+from abstracta_transport import close_async_transport
+from step_checkpoints import step_checkpoints
+from step_spans import PipelineSpans
+
+# Threads shared by every pipeline for blocking step functions and "blocking_yield" outputs.
+ABSTRACTA_STEP_WORKERS = int(os.getenv("ABSTRACTA_STEP_WORKERS", "8"))
+
+step_executor = ThreadPoolExecutor(max_workers=ABSTRACTA_STEP_WORKERS, thread_name_prefix="abstracta-step")
+
+# Default seconds a single step may run, and a whole pipeline; 0 means no limit.
+ABSTRACTA_STEP_TIMEOUT = float(os.getenv("ABSTRACTA_STEP_TIMEOUT", "300"))
+ABSTRACTA_PIPELINE_TIMEOUT = float(os.getenv("ABSTRACTA_PIPELINE_TIMEOUT", "900"))
+# Longest a pipeline goes without yielding. Gradio only notices a closed tab when the
+# generator yields, so this bounds how long an abandoned run keeps working.
+ABSTRACTA_PIPELINE_HEARTBEAT = float(os.getenv("ABSTRACTA_PIPELINE_HEARTBEAT", "1"))
+
+# cancel_key -> the pipeline currently running for it
+_active_runs = {}
+
+
+async def run_blocking(fn, *args):
+    """Run `fn(*args)` on the step executor, keeping the caller's context variables (trace, metrics)."""
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(step_executor, call)
+
+
+async def _closing_transport(coro):
+    # The step's loop ends with it; close the HTTP client it may have opened.
+    try:
+        return await coro
+    finally:
+        await close_async_transport()
+
+
+def _blocking_step(func):
+    """Wrap a blocking step function so it runs on the step executor; coroutines get their own event loop there."""
+    if inspect.iscoroutinefunction(func):
+        return lambda context: run_blocking(asyncio.run, _closing_transport(func(context)))
+    return lambda context: run_blocking(func, context)
+
+
+def _loop_step(func):
+    """Wrap a plain step function to run on the loop, awaiting what it returns when that is awaitable (e.g. a lambda returning a coroutine)."""
+    async def run(context):
+        result = func(context)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    return run
+
+
+def _with_timeout(func, seconds, name):
+    async def run(context):
+        try:
+            async with asyncio.timeout(seconds) as deadline:
+                return await func(context)
+        except TimeoutError:
+            if deadline.expired():
+                raise TimeoutError(f"Step '{name}' timed out after {seconds:g}s") from None
+            raise
+
+    return run
+
+
+class _PipelineRun:
+    """Step tasks of one steps_executor run, so a newer run with the same cancel_key can stop them."""
+
+    def __init__(self):
+        self.tasks = {}  # task -> step index
+        self.superseded = False
+
+    def supersede(self):
+        self.superseded = True
+        for task in self.tasks:
+            task.cancel()
+
+
+async def _outputs(step, fns, context):
+    if step.get("blocking_yield"):
+        return await run_blocking(lambda: tuple(f(context) for f in fns))
+    return tuple(f(context) for f in fns)
 
 async def steps_executor(
     steps_info,
@@ -9,13 +95,33 @@ async def steps_executor(
     build_progress_fn=None,
     final_message="Process completed successfully.",
     final_outputs=None,
+    trace_name=None,
+    run_id=None,
+    delta_updates=True,
+    timeout=ABSTRACTA_PIPELINE_TIMEOUT,
+    cancel_key=None,
+    report=None,
 ):
     """
     Executes a sequence of asynchronous steps with progress reporting and yields intermediate outputs.
 
     Each step is a dictionary with keys:
       - "name": str - The display name of the step.
-      - "func": callable - An async function accepting a `context` dict and returning its result.
+      - "func": callable - A function (normally async) accepting a `context` dict and returning its result.
+      - "depends_on": list[str], optional - Keys of the steps whose results it reads. Steps
+        whose dependencies are all done run concurrently; a step without "depends_on" waits
+        for the step listed before it.
+      - "blocking": bool, optional - Run "func" on the step executor instead of the event
+        loop (default False). An async function marked blocking runs on its own event loop
+        in the worker thread, so it must not use clients bound to the caller's loop. A plain
+        function left on the loop may return an awaitable, which is then awaited.
+      - "blocking_yield": bool, optional - Compute this step's "yield" / "yield_before"
+        outputs on the step executor (e.g. when they build DataFrames).
+      - "checkpoint": bool, optional - Set to False for steps that must run again when a
+        failed run is resumed (see `run_id`).
+      - "timeout": float, optional - Seconds the step may run before it fails with
+        TimeoutError (default ABSTRACTA_STEP_TIMEOUT; 0 or None for no limit). A blocking
+        step's thread cannot be interrupted; only the pipeline stops waiting for it.
 
     The function maintains a shared `context` dictionary that is passed to each step function,
     allowing steps to access results from previous steps.
@@ -24,9 +130,38 @@ async def steps_executor(
         steps_info (list of dict): List of steps to execute. Each dict must have "name" and "func".
         initial_outputs (tuple or None): Optional initial outputs to yield before starting steps.
         build_progress_fn (callable or None): Function to build progress UI. Signature:
-            build_progress_fn(step_names: list[str], current_step_index: int, animate: bool) -> str (HTML).
+            build_progress_fn(step_names: list[str], current_step_index: int, animate: bool,
+                              spans: list[StepSpan]) -> str (HTML).
         final_message (str): Message to yield if no explicit final_outputs provided.
         final_outputs (tuple or None): Final outputs to yield after all steps complete.
+        trace_name (str or None): When given, the run is recorded as an agents trace with one
+            span per step; agent calls made by a step nest under its span.
+        run_id (str or None): When given, each step result is checkpointed under this ID
+            until the run succeeds. Running the same ID again after a failure reuses the saved
+            results and only runs the steps that did not complete.
+        delta_updates (bool): Replace every output equal to the value last yielded for the same
+            position with a no-op `gr.update()`, so unchanged URLs, JSON and DataFrames are sent
+            to the browser once. Pass False to always get full values.
+        timeout (float or None): Seconds the whole pipeline may run before the running steps
+            are cancelled and TimeoutError is raised (default ABSTRACTA_PIPELINE_TIMEOUT).
+        cancel_key (hashable or None): Starting another pipeline with the same key (e.g. the
+            Gradio session) cancels this one, which then ends with a "superseded" message.
+        report (dict or None): When given, the run is headless: no progress HTML or outputs
+            are built and nothing is yielded. The dict is filled with the outcome ("status":
+            ok | error | timeout | superseded | cancelled, "error"), "elapsed_seconds", the
+            per-step timings ("steps") and the step results by key ("results").
+
+    When the consumer stops iterating (Gradio closes the generator after the tab goes away),
+    the running steps are cancelled, which aborts their in-flight HTTP and agent calls. While
+    steps run, an unchanged update is yielded every ABSTRACTA_PIPELINE_HEARTBEAT seconds so
+    that Gradio notices a closed tab without waiting for the step to finish.
+
+    Updates are yielded as soon as a step changes state (started, finished, failed); nothing
+    is paced on the server. The "running" animation in fn_report_build_progress is CSS, so it
+    keeps moving in the browser while a step runs without any further updates.
+
+    Every step is timed (wall time, time waiting on I/O, result size); the timings are logged
+    when the run ends and shown as a waterfall under the progress list.
 
     Yields:
         tuple: Outputs to be consumed by the UI after each step and at start/end.
@@ -34,88 +169,302 @@ async def steps_executor(
     logging.info("Starting steps_executor with %d steps.", len(steps_info))
 
     context = {}
+    changed = _OutputDeltas() if delta_updates else tuple
+    render = report is None
 
-    if initial_outputs is not None:
+    if initial_outputs is not None and render:
         logging.debug("Yielding initial outputs.")
-        yield initial_outputs
-        await asyncio.sleep(0.5)
+        yield changed(initial_outputs)
 
     total_steps = len(steps_info)
     step_names = [step["name"] for step in steps_info]
+    step_keys = [step["key"] for step in steps_info]
+    dependencies = _step_dependencies(steps_info)
+    timings = PipelineSpans(step_keys, step_names, trace_name)
 
-    for i, step in enumerate(steps_info):
-        step_name = step["name"]
-        step_key = step["key"]
-        step_func = step["func"]
-        step_yield = step["yield"] # tuple of lambdas that consume context and return anything based on that context.
-        step_yield_before = step["yield_before"] if "yield_before" in step else []
+    # Outputs (after the progress HTML) most recently sent; a step without "yield_before"
+    # keeps them on screen while it runs.
+    last_outputs = ("", "", gr.update(visible=False), gr.update(visible=False))
+    pending = list(range(total_steps))
+    run = _PipelineRun()
+    running = run.tasks  # task -> step index
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout if timeout else None
 
-        logging.info("Starting step %d/%d: %s", i + 1, total_steps, step_name)
+    if run_id is not None:
+        restored = step_checkpoints.load(run_id)
+        for i, step in enumerate(steps_info):
+            if step["key"] in restored and step.get("checkpoint", True):
+                context[step["key"]] = restored[step["key"]]
+                timings.spans[i].status = "resumed"
+                pending.remove(i)
+        if len(pending) < total_steps:
+            logging.info("Resuming run %s, reusing: %s", run_id, [key for key in step_keys if key in context])
 
-        # Yield progress UI with animation on current step
-        if build_progress_fn:
-            progress_html = build_progress_fn(step_names, i, animate=True)
-        else:
-            progress_html = ""
+    def progress(i, animate):
+        if not build_progress_fn or not render:
+            return ""
+        return build_progress_fn(step_names, i, animate=animate, spans=timings.spans)
 
-        # Yield progress update before running the step
-        if step_yield_before:
-            yield (progress_html, *(f(context) for f in step_yield_before))
-        else:
-            yield (progress_html, "", "", gr.update(visible=False), gr.update(visible=False))
-        await asyncio.sleep(0.5)
+    if cancel_key is not None:
+        if cancel_key in _active_runs:
+            logging.info("Cancelling the previous run for %s.", cancel_key)
+            _active_runs[cancel_key].supersede()
+        _active_runs[cancel_key] = run
 
-        try:
-            # Execute the async step function, passing the shared context dict
-            step_result = await step_func(context)
-            logging.info("Completed step '%s' successfully.", step_name)
-        except Exception as e:
-            logging.error("Error in step '%s': %s", step_name, e, exc_info=True)
-            yield (progress_html.replace("⏳","❌") + f"<br>❌❌❌ <code>{e}</code>", *(f(context) for f in step_yield))
-            raise
+    try:
+        while pending or running:
+            # Start every step whose dependencies have all produced a result.
+            for i in [i for i in pending if all(key in context for key in dependencies[i])]:
+                pending.remove(i)
+                step = steps_info[i]
+                logging.info("Starting step %d/%d: %s", i + 1, total_steps, step["name"])
+                # Execute the step function, passing the shared context dict
+                func = step["func"]
+                offloaded = step.get("blocking", False)
+                if offloaded:
+                    func = _blocking_step(func)
+                elif not inspect.iscoroutinefunction(func):
+                    func = _loop_step(func)
+                step_timeout = step.get("timeout", ABSTRACTA_STEP_TIMEOUT)
+                if step_timeout:
+                    func = _with_timeout(func, step_timeout, step["name"])
+                running[timings.start(i, func, context, offloaded)] = i
 
-        # Store the result keyed by step name in context for downstream steps
-        context[step_key] = step_result
+                # Yield progress update before running the step
+                if render:
+                    if step.get("yield_before"):
+                        last_outputs = await _outputs(step, step["yield_before"], context)
+                    yield changed((progress(i, animate=True), *last_outputs))
 
-        # Yield progress UI without animation to indicate step done
-        if build_progress_fn:
-            progress_html_done = build_progress_fn(step_names, i, animate=False)
-        else:
-            progress_html_done = ""
+            if not running:
+                error = ValueError(f"Steps {[step_keys[i] for i in pending]} have unsatisfiable dependencies: {[dependencies[i] for i in pending]}")
+                _fill_report(report, "error", str(error), timings, context)
+                raise error
 
-        #yield (progress_html_done, "", "", gr.update(visible=False), gr.update(visible=False))
-        yield (progress_html_done, *(f(context) for f in step_yield))
-        await asyncio.sleep(0.5)
+            wait = ABSTRACTA_PIPELINE_HEARTBEAT
+            if deadline is not None:
+                wait = min(wait, max(deadline - loop.time(), 0))
+            done, _ = await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+            if run.superseded or (deadline is not None and loop.time() >= deadline and not done):
+                reason = "Superseded by a newer run." if run.superseded else f"Pipeline timed out after {timeout:g}s."
+                logging.warning("Stopping pipeline: %s", reason)
+                i = min(running.values(), default=0)
+                await _cancel(running)
+                timings.finish()
+                _fill_report(report, "superseded" if run.superseded else "timeout", reason, timings, context)
+                if render:
+                    yield changed((progress(i, animate=False) + f"<br>⛔ <code>{reason}</code>", *last_outputs))
+                if run.superseded:
+                    return
+                raise TimeoutError(reason)
+
+            if not done:
+                if render:
+                    yield changed((progress(min(running.values()), animate=True), *last_outputs))
+                continue
+
+            for task in sorted(done, key=running.get):
+                i = running.pop(task)
+                step = steps_info[i]
+                step_yield = step["yield"] # tuple of lambdas that consume context and return anything based on that context.
+                try:
+                    step_result = task.result()
+                    logging.info("Completed step '%s' successfully.", step["name"])
+                except Exception as e:
+                    logging.error("Error in step '%s': %s", step["name"], e, exc_info=True)
+                    await _cancel(running)
+                    timings.finish()
+                    _fill_report(report, "error", str(e), timings, context)
+                    if render:
+                        yield changed((progress(i, animate=False).replace("⏳","❌") + f"<br>❌❌❌ <code>{e}</code>", *await _outputs(step, step_yield, context)))
+                    raise
+
+                # Store the result keyed by step name in context for downstream steps
+                context[step["key"]] = step_result
+                if run_id is not None and step.get("checkpoint", True):
+                    step_checkpoints.save(run_id, step["key"], step_result)
+
+                # Yield progress UI without animation to indicate step done
+                if render:
+                    last_outputs = await _outputs(step, step_yield, context)
+                    yield changed((progress(i, animate=bool(running)), *last_outputs))
+    finally:
+        # Only non-empty when the run failed or the consumer stopped iterating.
+        await _cancel(running)
+        # Still open when the consumer stopped iterating (e.g. the tab was
+        # closed): close the trace so the cancelled run is exported too.
+        timings.finish()
+        if cancel_key is not None and _active_runs.get(cancel_key) is run:
+            del _active_runs[cancel_key]
+        if report is not None and "status" not in report:
+            _fill_report(report, "cancelled", None, timings, context)
 
     logging.info("All steps completed.")
+    if run_id is not None:
+        step_checkpoints.discard(run_id)
+    _fill_report(report, "ok", None, timings, context)
 
+    if not render:
+        return
     if final_outputs is not None:
         logging.debug("Yielding explicit final outputs.")
-        yield final_outputs
-        await asyncio.sleep(0.5)
+        if build_progress_fn:
+            # Keep the timings on screen under the final status message.
+            final_outputs = (_append_html(final_outputs[0], fn_report_waterfall(timings.spans)), *final_outputs[1:])
+        yield changed(final_outputs)
     else:
         logging.debug("Yielding default final message.")
-        yield (gr.update(value=final_message, visible=False), *(f(context) for f in step_yield))
-        await asyncio.sleep(0.5)
+        yield changed((gr.update(value=final_message, visible=False), *await _outputs(steps_info[-1], steps_info[-1]["yield"], context)))
+
+
+def _fill_report(report, status, error, timings, context):
+    if report is None:
+        return
+    report.update(
+        status=status,
+        error=error,
+        elapsed_seconds=timings.elapsed_seconds,
+        steps=timings.as_dicts(),
+        results=dict(context),
+    )
+
+
+def _same_output(a, b) -> bool:
+    if a is b:
+        return True
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_same_output(a[key], b[key]) for key in a)
+    if isinstance(a, pd.DataFrame) or isinstance(b, pd.DataFrame):
+        return isinstance(a, pd.DataFrame) and isinstance(b, pd.DataFrame) and a.equals(b) and list(a.columns) == list(b.columns)
+    try:
+        return type(a) is type(b) and bool(a == b)
+    except (TypeError, ValueError):  # e.g. arrays, whose == is elementwise
+        return False
+
+
+class _OutputDeltas:
+    """Turns each yielded tuple into updates for only the outputs that changed since the last one."""
+
+    def __init__(self):
+        self.sent = {}  # output position -> last value yielded there
+
+    def __call__(self, outputs):
+        delta = []
+        for i, value in enumerate(outputs):
+            if i in self.sent and _same_output(self.sent[i], value):
+                delta.append(gr.update())
+            else:
+                self.sent[i] = value
+                delta.append(value)
+        return tuple(delta)
+
+
+def _step_dependencies(steps_info):
+    """
+    Context keys each step waits for: its "depends_on" list, or else the previous step's
+    key, so pipelines that declare nothing still run strictly in order.
+    """
+    keys = {step["key"] for step in steps_info}
+    dependencies = []
+    for i, step in enumerate(steps_info):
+        if "depends_on" in step:
+            unknown = set(step["depends_on"]) - keys
+            if unknown:
+                raise ValueError(f"Step '{step['key']}' depends on unknown steps: {sorted(unknown)}")
+            dependencies.append(list(step["depends_on"]))
+        else:
+            dependencies.append([steps_info[i - 1]["key"]] if i else [])
+    return dependencies
+
+
+async def _cancel(running):
+    for task in running:
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+    running.clear()
+
+
+# Animated "..." after the running step, driven by the browser.
+PROGRESS_CSS = (
+    "<style>"
+    ".abstracta-dots::after{content:'.';animation:abstracta-dots 1.5s steps(1) infinite}"
+    "@keyframes abstracta-dots{0%{content:'.'}33%{content:'..'}66%{content:'...'}}"
+    "</style>"
+)
+
 
+def _append_html(output, html):
+    if isinstance(output, dict) and isinstance(output.get("value"), str):
+        return {**output, "value": output["value"] + html}
+    if isinstance(output, str):
+        return output + html
+    return output
 
-def fn_report_build_progress(steps: list[str], current_step, animate=False):
-    """Return HTML showing step progress with optional animation."""
-    html = "<ul style='list-style:none;padding:0'>"
-    for i, step in enumerate(steps):
-        if i < current_step:
+
+def fn_report_waterfall(spans) -> str:
+    """Return HTML with one bar per finished step, placed on the pipeline timeline."""
+    finished = [span for span in spans if span.status in ("ok", "error", "cancelled")]
+    if not finished:
+        return ""
+    total = max(span.offset_seconds + span.wall_seconds for span in finished) or 1.0
+    html = "<div style='margin-top:12px;font-size:12px'>"
+    for span in finished:
+        left = 100 * span.offset_seconds / total
+        width = max(100 * span.wall_seconds / total, 0.5)
+        busy = 100 * span.busy_seconds / span.wall_seconds if span.wall_seconds else 100
+        color = {"error": "#dc2626", "cancelled": "#94a3b8"}.get(span.status, "#2563eb")
+        html += (
+            f"<div style='display:flex;align-items:center;gap:8px;margin:2px 0'>"
+            f"<div style='width:30%;white-space:nowrap;overflow:hidden;text-overflow:ellipsis'>{span.name}</div>"
+            f"<div style='flex:1;position:relative;height:10px;background:#f1f5f9;border-radius:4px'>"
+            # Solid part: time running the step's code; light part: waiting on I/O.
+            f"<div style='position:absolute;left:{left:.2f}%;width:{width:.2f}%;height:100%;border-radius:4px;"
+            f"background:linear-gradient(90deg,{color} {busy:.0f}%,{color}55 {busy:.0f}%)'></div></div>"
+            f"<div style='width:26%;white-space:nowrap'>{span.wall_seconds:.2f}s"
+            f" ({span.wait_summary}, {span.result_bytes:,} B)</div>"
+            f"</div>"
+        )
+    html += f"<div style='color:#64748b'>Total {total:.2f}s</div></div>"
+    return html
+
+
+def fn_report_build_progress(steps: list[str], current_step, animate=False, spans=None):
+    """
+    Return HTML showing step progress with optional animation and a timing waterfall.
+
+    With `spans`, each step's icon follows its own status, since several steps may be
+    running at once; otherwise steps before `current_step` are done and the rest pending.
+    """
+    if spans:
+        statuses = [span.status for span in spans]
+    else:
+        statuses = ["ok" if i < current_step else "running" if i == current_step else "pending" for i in range(len(steps))]
+    html = PROGRESS_CSS if animate else ""
+    html += "<ul style='list-style:none;padding:0'>"
+    for step, status in zip(steps, statuses):
+        if status == "ok":
             html += f"<li>✅ <b>{step}</b></li>"
-        elif i == current_step:
-            dots = "." * ((int(time.time() * 2) % 3) + 1) if animate else ""
+        elif status == "resumed":
+            html += f"<li>✅ <b>{step}</b> <i>(reused from the previous attempt)</i></li>"
+        elif status == "running":
+            dots = "<span class='abstracta-dots'></span>" if animate else ""
             html += f"<li>⏳ <b>{step}{dots}</b></li>"
+        elif status == "error":
+            html += f"<li>❌ <b>{step}</b></li>"
+        elif status == "cancelled":
+            html += f"<li>⛔ <s>{step}</s></li>"
         else:
             html += f"<li>⬜ {step}</li>"
     html += "</ul>"
 
-    percent = int((current_step / len(steps)) * 100)
+    percent = int(((statuses.count("ok") + statuses.count("resumed")) / len(steps)) * 100)
     html += (
         f"<div style='background:#eee;border-radius:8px;height:12px;overflow:hidden;margin-top:8px'>"
         f"<div style='background:#2563eb;height:100%;width:{percent}%;transition:width 0.3s'></div>"
         f"</div>"
     )
+    if spans:
+        html += fn_report_waterfall(spans)
     return html
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import pytest
+from fake_abstracta_server import FakeAbstractaConfig, FakeAbstractaServer, client_env
+
+ROWS = 2500
+USERS = 50
+
+_server = None
+
+
+def pytest_configure(config):
+    # The clients read their URLs when first imported, so the fake server has
+    # to be up and in the environment before any test module imports them.
+    global _server
+    _server = FakeAbstractaServer(
+        FakeAbstractaConfig(rows=ROWS, users=USERS, services=4)
+    ).start()
+    os.environ.update(client_env(_server.base_url))
+    os.environ.update(ABSTRACTA_CLIENT_ID="test", ABSTRACTA_FOR_USER="user1")
+    os.environ.setdefault("OPENAI_AGENTS_DISABLE_TRACING", "1")
+    os.environ.setdefault("GRADIO_ANALYTICS_ENABLED", "False")
+    # Keep the on-disk caches out of the developer's home directory.
+    cache_dir = tempfile.mkdtemp(prefix="abstracta-tests-")
+    os.environ["ABSTRACTA_AGENT_CACHE_DIR"] = os.path.join(cache_dir, "agent_payloads")
+    os.environ["ABSTRACTA_RESULT_CACHE_DIR"] = os.path.join(cache_dir, "results")
+
+
+def pytest_unconfigure(config):
+    if _server is not None:
+        _server.stop()
+
+
+@pytest.fixture(scope="session")
+def fake_server():
+    return _server
+
+
+@pytest.fixture(scope="session")
+def client():
+    from abstracta_client import AbstractaClient
+
+    return AbstractaClient()
+
+
+@pytest.fixture(scope="session")
+def access_token(client):
+    return client.perform_auth()
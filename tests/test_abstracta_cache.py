@@ -0,0 +1,134 @@
+import pytest
+import requests
+import abstracta_cache
+from abstracta_cache import MetadataCache, TTLCache, metadata_cache
+from api_builder_agent import APIBuilderPayload
+
+
+class Clock:
+    """Stands in for `time.monotonic` in abstracta_cache."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(abstracta_cache.time, "monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def empty_metadata_cache():
+    metadata_cache.clear()
+    yield metadata_cache
+    metadata_cache.clear()
+
+
+def server_requests(fake_server):
+    return requests.get(f"{fake_server.base_url}/_fake/stats").json()["requests"]
+
+
+def test_entries_expire_after_their_ttl(clock):
+    cache = TTLCache(ttl=60)
+    cache.set("key", "value")
+
+    clock.now += 59
+    assert cache.get("key") == "value"
+    clock.now += 1
+    assert cache.get("key") is None
+    assert cache.stats() == {"entries": 0, "hits": 1, "misses": 1, "ttl": 60}
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(ttl=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_invalidate_one_key_or_all():
+    cache = TTLCache(ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.invalidate("a")
+    assert (cache.get("a"), cache.get("b")) == (None, 2)
+    cache.invalidate()
+    assert cache.get("b") is None
+
+
+def test_metadata_is_scoped_to_the_for_user_identity(monkeypatch):
+    cache = MetadataCache()
+    cache.set("services", ["orders"], "demo", "app0", "db0")
+
+    monkeypatch.setenv("ABSTRACTA_FOR_USER", "someone-else")
+
+    assert cache.get("services", "demo", "app0", "db0") is None
+
+
+def test_invalidate_evicts_one_path_or_the_whole_entity():
+    cache = MetadataCache()
+    cache.set("applications", ["app0"], "demo")
+    cache.set("applications", ["app1"], "other")
+
+    cache.invalidate("applications", "demo")
+    assert cache.get("applications", "demo") is None
+    assert cache.get("applications", "other") == ["app1"]
+    cache.invalidate("applications")
+    assert cache.get("applications", "other") is None
+
+
+def test_disabled_cache_never_serves(monkeypatch):
+    monkeypatch.setenv("ABSTRACTA_CACHE_ENABLED", "false")
+    cache = MetadataCache()
+    cache.set("organizations", ["demo"])
+
+    assert cache.get("organizations") is None
+
+
+def test_repeated_lookups_are_served_from_the_cache(
+    client, access_token, fake_server, empty_metadata_cache
+):
+    first = client.get_services(access_token, "demo", "app0", "db0")
+    before = server_requests(fake_server)
+
+    assert client.get_services(access_token, "demo", "app0", "db0") == first
+    assert client.get_applications(access_token, "demo") == client.get_applications(
+        access_token, "demo"
+    )
+    # One request for the applications, then one for the stats call itself.
+    assert server_requests(fake_server) == before + 2
+
+
+def test_creating_a_service_evicts_its_datasource_listing(
+    client, access_token, empty_metadata_cache
+):
+    def names():
+        services = client.get_services(access_token, "demo", "app0", "db0")
+        return [service["dtbl_table_name"] for service in services]
+
+    assert "cached_orders" not in names()
+
+    client.create_api(
+        access_token,
+        APIBuilderPayload(
+            serviceName="cached_orders",
+            orgName="demo",
+            appName="app0",
+            datasourceName="db0",
+            originalResourceName="orders",
+            sampleParameterValues={"id": "1"},
+        ),
+    )
+
+    assert "cached_orders" in names()
@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+import requests
+from conftest import ROWS
+from profile_builder_agent import ProfileBuilderPayload
+from user_directory import user_directory
+
+SERVICE = ("demo", "app0", "db0", "service0", "1.0.0")
+
+
+@pytest.fixture
+def jitter(fake_server):
+    """Random per-request latency, so parallel pages complete out of order."""
+    requests.post(f"{fake_server.base_url}/_fake/config", json={"jitter_ms": 20})
+    yield
+    requests.post(f"{fake_server.base_url}/_fake/config", json={"jitter_ms": 0})
+
+
+def test_iter_data_pages_through_every_row(client, access_token):
+    rows = list(client.iter_data(access_token, *SERVICE, page_size=1000))
+    assert [row["id"] for row in rows] == list(range(1, ROWS + 1))
+
+
+def test_iter_data_batches_follow_the_page_windows(client, access_token):
+    pages = list(client.iter_data(access_token, *SERVICE, page_size=1000, batches=True))
+    assert [len(page) for page in pages] == [1000, 1000, ROWS - 2000]
+
+
+@pytest.mark.parametrize("limit", [1, 50, 1000, 1500])
+def test_iter_data_stops_at_limit(client, access_token, limit):
+    rows = list(client.iter_data(access_token, *SERVICE, page_size=1000, limit=limit))
+    assert [row["id"] for row in rows] == list(range(1, limit + 1))
+
+
+def test_get_data_applies_the_query(client, access_token):
+    from query_builder import build_data_query
+
+    query = build_data_query(["id", "state"], [["state", "=", "CA"]], "id", "desc")
+    rows = client.get_data(access_token, *SERVICE, query=query)
+    assert rows and all(row.keys() == {"id", "state"} for row in rows)
+    assert all(row["state"] == "CA" for row in rows)
+    assert [row["id"] for row in rows] == sorted(
+        (row["id"] for row in rows), reverse=True
+    )
+
+
+def test_get_data_unknown_service_raises(client, access_token):
+    with pytest.raises(Exception, match="Failed to get data"):
+        client.get_data(access_token, "demo", "app0", "db0", "nope", "1.0.0")
+
+
+def test_read_data_parallel_yields_pages_in_row_order(client, access_token, jitter):
+    url = client.generate_api_url(*SERVICE)
+    pages = list(
+        client.read_data_parallel(access_token, url, page_size=100, parallelism=8)
+    )
+    assert [row["id"] for page in pages for row in page] == list(range(1, ROWS + 1))
+
+
+def test_read_data_parallel_stops_at_limit(client, access_token):
+    url = client.generate_api_url(*SERVICE)
+    pages = list(
+        client.read_data_parallel(
+            access_token, url, page_size=100, parallelism=4, limit=250
+        )
+    )
+    assert [row["id"] for page in pages for row in page] == list(range(1, 251))
+
+
+def test_async_read_data_parallel_yields_pages_in_row_order(jitter):
+    from abstracta_async_client import AsyncAbstractaClient
+
+    async def read():
+        client = AsyncAbstractaClient()
+        access_token = await client.perform_auth()
+        url = client.generate_api_url(*SERVICE)
+        return [
+            row
+            async for page in client.read_data_parallel(
+                access_token, url, page_size=100, parallelism=8
+            )
+            for row in page
+        ]
+
+    rows = asyncio.run(read())
+    assert [row["id"] for row in rows] == list(range(1, ROWS + 1))
+
+
+def _profile_payload(user_names):
+    return ProfileBuilderPayload(
+        orgName="demo",
+        profile_key="state",
+        profile_value="CA",
+        profile_description="Users in California",
+        user_names=user_names,
+    )
+
+
+def test_assign_profile_reports_each_user(client, access_token):
+    payload = _profile_payload(["user1", "user2", "nobody", "user1"])
+    client.add_profile(access_token, payload)
+
+    results = client.assign_profile_to_users(access_token, payload)
+
+    assert [(r["user_name"], r["status"]) for r in results] == [
+        ("user1", "assigned"),
+        ("user2", "assigned"),
+        ("nobody", "not_found"),
+    ]
+    assert results[0]["user_sys_no"] == 1
+    assert results[2]["error"]
+
+
+def test_expired_user_directory_drops_deleted_users(client, access_token, monkeypatch):
+    user_directory.merge(
+        [
+            {"user_id": "ghost", "user_sys_no": 1},
+            {"user_id": "user2", "user_sys_no": 2},
+        ],
+        replace=True,
+    )
+    monkeypatch.setattr(user_directory, "ttl", 0)
+
+    found, missing = client._resolve_users(access_token, ["ghost", "user3"])
+
+    assert missing == ["ghost"]
+    assert found["user3"]["user_sys_no"] == 3
+
+
+def test_iter_data_starts_at_the_given_row(client, access_token):
+    rows = list(
+        client.iter_data(access_token, *SERVICE, page_size=30, limit=100, start=201)
+    )
+    assert [row["id"] for row in rows] == list(range(201, 301))
@@ -0,0 +1,104 @@
+import asyncio
+import batch_runner
+from abstracta_async_client import AsyncAbstractaClient
+from abstracta_transport import (
+    close_async_transport,
+    get_async_transport,
+    get_transport,
+)
+from steps_executor import steps_executor
+
+SERVICE = ("demo", "app0", "db0", "service0", "1.0.0")
+
+
+async def read_rows(transports):
+    client = AsyncAbstractaClient()
+    transports.append(client.transport)
+    access_token = await client.perform_auth()
+    return await client.get_data(access_token, *SERVICE)
+
+
+def test_sync_requests_reuse_pooled_connections(client, access_token):
+    for _ in range(5):
+        client.get_data_from_api_url(
+            access_token, client.generate_api_url(*SERVICE), to=1
+        )
+
+    pool = next(
+        pool
+        for pool in get_transport().get_pool_stats()["pools"]
+        if pool["requests"] >= 5
+    )
+    assert pool["connections_opened"] < pool["requests"]
+
+
+def test_each_loop_gets_its_own_async_transport():
+    async def transport():
+        try:
+            return get_async_transport()
+        finally:
+            await close_async_transport()
+
+    assert asyncio.run(transport()) is not asyncio.run(transport())
+
+
+def test_close_async_transport_closes_the_loops_client():
+    transports = []
+
+    async def read_and_close():
+        rows = await read_rows(transports)
+        await close_async_transport()
+        return rows, get_async_transport()
+
+    rows, replacement = asyncio.run(read_and_close())
+
+    assert rows
+    assert transports[0].client.is_closed
+    assert replacement is not transports[0]
+
+
+def test_batch_runner_closes_its_transport(monkeypatch):
+    transports = []
+
+    async def pipeline(requirements, regenerate=False, report=None, session=None):
+        report["results"] = {"rows": await read_rows(transports)}
+        report["status"] = "ok"
+        yield
+
+    monkeypatch.setattr(batch_runner, "_pipelines", lambda: {"api": pipeline})
+
+    report = asyncio.run(
+        batch_runner.run_batch([batch_runner.BatchItem("read", id="1")])
+    )
+
+    assert report["summary"]["ok"] == 1
+    assert transports[0].client.is_closed
+
+
+def test_offloaded_async_step_closes_its_transport():
+    transports = []
+
+    async def rows(context):
+        return await read_rows(transports)
+
+    steps = [
+        {
+            "key": "rows",
+            "name": "Rows",
+            # Runs on its own event loop in a worker thread.
+            "func": rows,
+            "blocking": True,
+            "yield": [lambda context: ""] * 4,
+        }
+    ]
+
+    async def run():
+        report = {}
+        async for _ in steps_executor(steps, report=report):
+            pass
+        return report
+
+    report = asyncio.run(run())
+
+    assert report["status"] == "ok"
+    assert transports[0].client.is_closed
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import pytest
+from agents import Agent
+import agent_cache
+from agent_cache import AgentPayloadCache, agent_payload_cache
+from profile_builder_agent import ProfileBuilderPayload, profileBuilderAgent
+from profile_ui_helper import createProfile
+
+REQUIREMENTS = "Give user4 and user5 the tier=gold profile"
+
+
+class FakeModel:
+    """Stands in for Runner.run and counts the calls that reach the model."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def run(self, agent, requirements, **kwargs):
+        self.calls.append(requirements)
+        if not AgentPayloadCache.cacheable(agent):
+            return type("RunResult", (), {"final_output": "plain text"})
+        result = ProfileBuilderPayload(
+            orgName="demo",
+            profile_key="tier",
+            profile_value=f"gold{len(self.calls)}",
+            profile_description="Gold tier users",
+            user_names=["user4", "user5"],
+        )
+        return type("RunResult", (), {"final_output": result})
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(agent_cache.Runner, "run", model.run)
+    return model
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AgentPayloadCache(directory=str(tmp_path), ttl=60)
+
+
+def run(cache, requirements, agent=profileBuilderAgent, **kwargs):
+    return asyncio.run(cache.run(agent, requirements, **kwargs))
+
+
+def test_same_requirements_reuse_the_payload(cache, model):
+    first = run(cache, REQUIREMENTS)
+    # Re-wrapped text is the same request.
+    second = run(cache, REQUIREMENTS.replace(" ", "\n  "))
+
+    assert second == first
+    assert len(model.calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_other_requirements_or_model_miss(cache, model):
+    run(cache, REQUIREMENTS)
+    run(cache, REQUIREMENTS + " too")
+    run(cache, REQUIREMENTS, agent=profileBuilderAgent.clone(model="other-model"))
+
+    assert len(model.calls) == 3
+    assert cache.stats()["entries"] == 3
+
+
+def test_refresh_calls_the_model_and_replaces_the_entry(cache, model):
+    run(cache, REQUIREMENTS)
+
+    refreshed = run(cache, REQUIREMENTS, refresh=True)
+
+    assert len(model.calls) == 2
+    assert run(cache, REQUIREMENTS) == refreshed
+    assert refreshed.profile_value == "gold2"
+
+
+def test_expired_entries_are_dropped(cache, model):
+    run(cache, REQUIREMENTS)
+    cache.ttl = 0
+
+    run(cache, REQUIREMENTS)
+
+    assert len(model.calls) == 2
+
+
+def test_entries_that_no_longer_validate_are_dropped(cache, model):
+    run(cache, REQUIREMENTS)
+    key = cache.key(profileBuilderAgent, REQUIREMENTS)
+    path = os.path.join(cache.directory, f"{key}.json")
+    with open(path) as f:
+        entry = json.load(f)
+    # e.g. a field added to the output type since the entry was written.
+    del entry["payload"]["user_names"]
+    with open(path, "w") as f:
+        json.dump(entry, f)
+
+    assert cache.get(profileBuilderAgent, key) is None
+    assert cache.stats()["entries"] == 0
+    run(cache, REQUIREMENTS)
+    assert len(model.calls) == 2
+
+
+def test_agents_without_a_pydantic_output_are_not_cached(cache, model):
+    agent = Agent(name="Chat", instructions="Answer briefly.")
+
+    assert run(cache, REQUIREMENTS, agent=agent) == "plain text"
+    run(cache, REQUIREMENTS, agent=agent)
+
+    assert len(model.calls) == 2
+    assert cache.stats()["entries"] == 0
+
+
+async def build(session, regenerate=False):
+    report = {}
+    async for _ in createProfile(
+        REQUIREMENTS, regenerate=regenerate, report=report, session=session
+    ):
+        pass
+    return report
+
+
+def test_pipelines_reuse_the_payload_against_the_server(model):
+    agent_payload_cache.clear()
+
+    first = asyncio.run(build("agent-cache-1"))
+    second = asyncio.run(build("agent-cache-2"))
+    regenerated = asyncio.run(build("agent-cache-3", regenerate=True))
+
+    assert [first["status"], second["status"], regenerated["status"]] == ["ok"] * 3
+    assert len(model.calls) == 2
+    assert (
+        second["results"]["construct_payload"] == first["results"]["construct_payload"]
+    )
+    assert regenerated["results"]["construct_payload"].profile_value == "gold2"
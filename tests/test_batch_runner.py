@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+import batch_runner
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs the batch in a fresh process with the model stubbed, so that the
+# clients are imported (and .env loaded) the way the command line does it.
+SCRIPT = """
+import os, sys, types
+import agents
+from profile_builder_agent import ProfileBuilderPayload
+
+async def run(agent, requirements, **kwargs):
+    return types.SimpleNamespace(final_output=ProfileBuilderPayload(
+        orgName="demo", profile_key="region", profile_value="EMEA",
+        profile_description="Users in EMEA", user_names=["user1"],
+    ))
+
+agents.Runner.run = staticmethod(run)
+import batch_runner
+code = batch_runner.main(sys.argv[1:])
+print(os.environ["ABSTRACTA_FOR_USER"], file=sys.stderr)
+sys.exit(code)
+"""
+
+
+def test_fake_abstracta_wins_over_dotenv(tmp_path):
+    # A developer's .env pointing at the real deployment.
+    (tmp_path / ".env").write_text(
+        "ABSTRACTA_API_URL=http://127.0.0.1:9/rest/data/queryv2\n"
+        "ABSTRACTA_METADATA_API_URL=http://127.0.0.1:9/rest/metadata\n"
+        "ABSTRACTA_AUTH_URL=http://127.0.0.1:9/token\n"
+        "ABSTRACTA_FOR_USER=from-dotenv\n"
+    )
+    (tmp_path / "items.txt").write_text("Give user1 the region=EMEA profile\n")
+    env = {
+        name: value
+        for name, value in os.environ.items()
+        if not name.startswith("ABSTRACTA_")
+    }
+    env.update(
+        PYTHONPATH=ROOT,
+        ABSTRACTA_AGENT_CACHE_DIR=str(tmp_path / "agent_payloads"),
+        ABSTRACTA_RESULT_CACHE_DIR=str(tmp_path / "results"),
+        ABSTRACTA_FAKE_ROWS="10",
+        ABSTRACTA_FAKE_USERS="5",
+        ABSTRACTA_FAKE_SERVICES="1",
+    )
+
+    process = subprocess.run(
+        [sys.executable, "-c", SCRIPT, "items.txt", "--pipeline", "profile"]
+        + ["--fake-abstracta", "--output", "report.json"],
+        cwd=tmp_path,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert process.returncode == 0, process.stderr
+    # The .env was loaded, only the fake's URLs took precedence.
+    assert process.stderr.splitlines()[-1] == "from-dotenv"
+    report = json.loads((tmp_path / "report.json").read_text())
+    assert report["items"][0]["status"] == "ok"
+
+
+def test_fake_abstracta_refuses_clients_that_are_already_imported(tmp_path):
+    import abstracta_client  # noqa: F401 - reads the URLs of this process
+
+    items = tmp_path / "items.txt"
+    items.write_text("anything\n")
+
+    with pytest.raises(SystemExit):
+        batch_runner.main([str(items), "--fake-abstracta"])
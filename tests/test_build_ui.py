@@ -0,0 +1,85 @@
+import asyncio
+import time
+import pytest
+from gradio_client import Client
+import agent_cache
+from api_builder_agent import APIBuilderPayload
+
+AGENT_SECONDS = 1.0
+
+
+class FakeAgent:
+    """Stands in for the model: returns a payload after `AGENT_SECONDS`."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def run(self, agent, requirements, **kwargs):
+        start = time.monotonic()
+        await asyncio.sleep(AGENT_SECONDS)
+        self.calls.append((requirements, start, time.monotonic()))
+        result = APIBuilderPayload(
+            serviceName=f"svc{len(self.calls)}",
+            serviceDisplayName="Orders",
+            serviceDesc="Orders",
+            orgName="demo",
+            appName="app0",
+            datasourceName="db0",
+            originalResourceName="orders",
+            versionComments="test",
+            sampleParameterValues={"id": "1"},
+        )
+        return type("RunResult", (), {"final_output": result})
+
+
+@pytest.fixture
+def fake_agent(monkeypatch):
+    agent = FakeAgent()
+    monkeypatch.setattr(agent_cache.Runner, "run", agent.run)
+    return agent
+
+
+@pytest.fixture(scope="module")
+def app_url():
+    import main
+
+    demo = main.build_ui()
+    demo.launch(prevent_thread_lock=True, quiet=True)
+    yield demo.local_url
+    demo.close()
+
+
+def status(outputs):
+    message = outputs[0]
+    return message["value"] if isinstance(message, dict) else message
+
+
+def test_builds_from_different_sessions_overlap(app_url, fake_agent):
+    jobs = [
+        Client(app_url, verbose=False).submit(
+            f"orders api {i}", True, api_name="/buildAPI"
+        )
+        for i in range(2)
+    ]
+
+    results = [job.result(timeout=30) for job in jobs]
+
+    assert all("All done" in status(result) for result in results)
+    assert all(result[1] for result in results)
+    (_, first_start, first_end), (_, second_start, _) = sorted(
+        fake_agent.calls, key=lambda call: call[1]
+    )
+    assert second_start < first_end
+
+
+def test_resubmit_from_the_same_session_supersedes_the_build(app_url, fake_agent):
+    client = Client(app_url, verbose=False)
+    old = client.submit("orders api old", True, api_name="/buildAPI")
+    time.sleep(AGENT_SECONDS / 2)
+    new = client.submit("orders api new", True, api_name="/buildAPI")
+
+    old_result, new_result = old.result(timeout=30), new.result(timeout=30)
+
+    assert "Superseded by a newer run" in status(old_result)
+    assert "All done" in status(new_result)
+    assert [call[0] for call in fake_agent.calls] == ["orders api new"]
@@ -0,0 +1,95 @@
+import pytest
+import fake_abstracta_server
+from catalog_index import CatalogIndex
+
+
+@pytest.fixture
+def fake(fake_server):
+    return fake_server.app.state.fake
+
+
+@pytest.fixture
+def index(client, access_token):
+    index = CatalogIndex(client)
+    index.load(access_token)
+    return index
+
+
+def names(services):
+    return sorted((s["dtbl_table_name"], s["dtbl_version"]) for s in services)
+
+
+def test_lookups_wait_for_the_first_load(client):
+    index = CatalogIndex(client)
+
+    assert index.organizations() is None
+    assert index.applications("demo") is None
+    assert index.data_sources("demo", "app0") is None
+    assert index.services("demo", "app0", "db0") is None
+
+
+def test_index_answers_like_the_api(client, access_token, index):
+    applications = client.get_applications(access_token, "demo")
+
+    assert index.organizations() == client.get_organizations(access_token)
+    assert index.applications("demo") == applications
+    for app in applications:
+        assert sorted(index.data_sources("demo", app)) == sorted(
+            client.get_data_sources(access_token, "demo", app)
+        )
+    assert names(index.services("demo", "app0", "db0")) == names(
+        client.get_services(access_token, "demo", "app0", "db0")
+    )
+
+
+def test_unknown_paths_are_empty(index):
+    assert index.applications("nope") == []
+    assert index.data_sources("demo", "nope") == []
+    assert index.services("demo", "app0", "nope") == []
+
+
+def test_apps_and_datasources_without_services_are_listed(fake, access_token, index):
+    with fake._lock:
+        fake._ensure_path("demo", "empty_app", "empty_db")
+        fake._db.commit()
+
+    index.refresh(access_token)
+
+    assert "empty_app" in index.applications("demo")
+    assert index.data_sources("demo", "empty_app") == ["empty_db"]
+    assert index.services("demo", "empty_app", "empty_db") == []
+
+
+def test_refresh_picks_up_new_services(fake, access_token, index):
+    version = fake.add_service("demo", "app0", "db0", "indexed_later", rows=1)
+
+    index.refresh(access_token)
+
+    assert ("indexed_later", version) in names(index.services("demo", "app0", "db0"))
+
+
+def test_refresh_picks_up_services_created_in_the_same_instant(
+    fake, access_token, index, monkeypatch
+):
+    # The newest row the index has seen, and one created after that read
+    # with the very same timestamp.
+    now = fake_abstracta_server._timestamp()
+    monkeypatch.setattr(fake_abstracta_server, "_timestamp", lambda: now)
+    fake.add_service("demo", "app1", "db1", "same_instant_a", rows=1)
+    index.refresh(access_token)
+    fake.add_service("demo", "app1", "db1", "same_instant_b", rows=1)
+
+    index.refresh(access_token)
+
+    services = [name for name, _ in names(index.services("demo", "app1", "db1"))]
+    assert {"same_instant_a", "same_instant_b"} <= set(services)
+    assert len(services) == len(set(services))
+
+
+def test_add_service_is_visible_before_the_next_refresh(index):
+    index.add_service("demo", "app2", "new_db", "created_here", "1.0.0")
+
+    assert "new_db" in index.data_sources("demo", "app2")
+    assert names(index.services("demo", "app2", "new_db")) == [
+        ("created_here", "1.0.0")
+    ]
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import math
+import socket
+import pytest
+import requests
+import main
+from client_metrics import (
+    Histogram,
+    client_metrics,
+    instrumented,
+    start_metrics_server,
+)
+
+
+@pytest.fixture
+def metrics():
+    client_metrics.reset()
+    yield client_metrics
+    client_metrics.reset()
+
+
+def operation(name, client="sync"):
+    return next(
+        row
+        for row in client_metrics.snapshot()
+        if (row["operation"], row["client"]) == (name, client)
+    )
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert list(histogram.cumulative()) == [(0.1, 1), (1.0, 3), (math.inf, 4)]
+    assert histogram.quantile(0.5) == pytest.approx(0.55)
+    assert math.isnan(Histogram().quantile(0.5))
+
+
+def test_instrumented_records_calls_errors_and_rows(metrics):
+    @instrumented
+    def read(fail=False):
+        if fail:
+            raise Exception("failed")
+        return [1, 2, 3]
+
+    @instrumented
+    def stream():
+        yield [1, 2]
+        yield [3]
+
+    @instrumented
+    async def aread():
+        return [1]
+
+    read()
+    with pytest.raises(Exception):
+        read(fail=True)
+    list(stream())
+    asyncio.run(aread())
+
+    assert (operation("read")["calls"], operation("read")["errors"]) == (2, 1)
+    assert operation("read")["rows"] == 3
+    assert operation("stream")["rows"] == 3
+    assert operation("aread", "async")["calls"] == 1
+
+
+def test_client_operations_count_their_bytes(metrics, client, access_token):
+    url = client.generate_api_url("demo", "app0", "db0", "service0", "1.0.0")
+    client.get_data_from_api_url(access_token, url, to=10)
+
+    read = operation("get_data_from_api_url")
+    assert read["rows"] == 10
+    assert read["request_bytes"] > 0 and read["response_bytes"] > 0
+
+
+def test_disabled_metrics_record_nothing(monkeypatch, metrics):
+    monkeypatch.setattr(client_metrics, "enabled", False)
+
+    instrumented(lambda: [1])()
+
+    assert client_metrics.snapshot() == []
+
+
+def test_prometheus_exposition(metrics):
+    @instrumented
+    def read():
+        client_metrics.record_transfer(10, 20)
+        return [1, 2, 3]
+
+    read()
+    text = client_metrics.render_prometheus()
+
+    labels = 'operation="read",client="sync"'
+    assert "# TYPE abstracta_client_operation_duration_seconds histogram" in text
+    assert f'_duration_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f"abstracta_client_operation_duration_seconds_count{{{labels}}} 1" in text
+    assert f"abstracta_client_rows_total{{{labels}}} 3" in text
+    assert f"abstracta_client_request_bytes_total{{{labels}}} 10" in text
+    assert f"abstracta_client_response_bytes_total{{{labels}}} 20" in text
+
+
+def test_metrics_endpoint_serves_on_loopback(metrics, client, access_token):
+    client.get_organizations(access_token)
+    server = start_metrics_server(0)
+    try:
+        host, port = server.server_address[:2]
+        response = requests.get(f"http://{host}:{port}/metrics")
+        missing = requests.get(f"http://{host}:{port}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert host == "127.0.0.1"
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert 'operation="get_organizations"' in response.text
+    assert missing.status_code == 404
+
+
+class NoUI:
+    def launch(self):
+        pass
+
+
+@pytest.fixture
+def render(monkeypatch):
+    """`main.render` without the catalog load or the Gradio app."""
+    monkeypatch.setattr(main.catalog_index, "load", lambda: None)
+    monkeypatch.setattr(main.catalog_index, "start_background_refresh", lambda: None)
+    monkeypatch.setattr(main, "build_ui", NoUI)
+    started = []
+    monkeypatch.setattr(
+        main,
+        "start_metrics_server",
+        lambda port: started.append(port) or start_metrics_server(port),
+    )
+    return started
+
+
+def test_metrics_endpoint_is_off_by_default(render, monkeypatch):
+    monkeypatch.setattr(main, "ABSTRACTA_METRICS_PORT", "")
+
+    main.render()
+
+    assert render == []
+
+
+def test_port_in_use_does_not_stop_the_app(render, monkeypatch, caplog):
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", 0))
+        taken.listen()
+        port = taken.getsockname()[1]
+        monkeypatch.setattr(main, "ABSTRACTA_METRICS_PORT", str(port))
+
+        with caplog.at_level(logging.WARNING):
+            main.render()
+
+    assert render == [port]
+    assert "Metrics endpoint not started" in caplog.text
@@ -0,0 +1,55 @@
+import main
+from conftest import ROWS
+
+SERVICE = ("service0/1.0.0", "demo", "app0", "db0")
+NO_FILTERS = ([], [["", "", ""]], "", "asc")
+
+
+def ids(preview):
+    return preview[1]["value"]["id"].tolist()
+
+
+def interactive(update):
+    return update["interactive"]
+
+
+def test_select_service_shows_the_first_page():
+    link, data, page, previous, next_, *_ = main.select_service(*SERVICE)
+
+    assert ids((link, data)) == list(range(1, main.PREVIEW_ROW_LIMIT + 1))
+    assert page == 0
+    assert not interactive(previous) and interactive(next_)
+
+
+def test_next_and_previous_page_through_the_rows():
+    limit = main.PREVIEW_ROW_LIMIT
+
+    second = main.turn_page(1)(*SERVICE, *NO_FILTERS, 0)
+    first = main.turn_page(-1)(*SERVICE, *NO_FILTERS, second[2])
+
+    assert second[2] == 1
+    assert ids(second) == list(range(limit + 1, 2 * limit + 1))
+    assert second[1]["label"].endswith(f"rows {limit + 1}–{2 * limit}")
+    assert interactive(second[3]) and interactive(second[4])
+    assert first[2] == 0
+    assert ids(first) == list(range(1, limit + 1))
+
+
+def test_next_is_disabled_past_the_last_row():
+    last_page = ROWS // main.PREVIEW_ROW_LIMIT
+
+    preview = main.apply_filters(*SERVICE, *NO_FILTERS, last_page)
+
+    assert preview[1]["value"].empty
+    assert preview[1]["label"].endswith("no more rows")
+    assert not interactive(preview[4])
+
+
+def test_pages_apply_the_filter_panel():
+    filters = [["state", "=", "CA"]]
+
+    preview = main.turn_page(1)(*SERVICE, ["id", "state"], filters, "id", "asc", 0)
+
+    rows = preview[1]["value"]
+    assert set(rows["state"]) == {"CA"}
+    assert rows["id"].is_monotonic_increasing
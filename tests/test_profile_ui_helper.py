@@ -0,0 +1,76 @@
+import asyncio
+import pytest
+import agent_cache
+from abstracta_async_client import AsyncAbstractaClient
+from profile_builder_agent import ProfileBuilderPayload
+from profile_ui_helper import createProfile
+
+REQUIREMENTS = "Give user1, user2 and user3 the region=EMEA profile"
+
+
+@pytest.fixture
+def fake_agent(monkeypatch):
+    async def run(agent, requirements, **kwargs):
+        result = ProfileBuilderPayload(
+            orgName="demo",
+            profile_key="region",
+            profile_value="EMEA",
+            profile_description="Users in EMEA",
+            user_names=["user1", "user2", "user3"],
+        )
+        return type("RunResult", (), {"final_output": result})
+
+    monkeypatch.setattr(agent_cache.Runner, "run", run)
+
+
+@pytest.fixture
+def flaky_assignments(monkeypatch):
+    """Posts of profileAttributes/manage by user; user 3's first one fails."""
+    posted = []
+    failed = []
+    assign = AsyncAbstractaClient.assign_profile_to_user
+
+    async def flaky(self, access_token, user_sys_no, profile_id):
+        posted.append(user_sys_no)
+        if user_sys_no == 3 and not failed:
+            failed.append(user_sys_no)
+            raise Exception("Failed to add profile")
+        await assign(self, access_token, user_sys_no, profile_id)
+
+    monkeypatch.setattr(AsyncAbstractaClient, "assign_profile_to_user", flaky)
+    return posted
+
+
+async def build(session, regenerate=False):
+    report = {}
+    async for _ in createProfile(
+        REQUIREMENTS, regenerate=regenerate, report=report, session=session
+    ):
+        pass
+    return report
+
+
+def test_retry_only_assigns_the_users_that_failed(fake_agent, flaky_assignments):
+    with pytest.raises(Exception, match="assigned to 2/3 users"):
+        asyncio.run(build("profile-retry"))
+    assert sorted(flaky_assignments) == [1, 2, 3]
+
+    flaky_assignments.clear()
+    report = asyncio.run(build("profile-retry"))
+
+    assert report["status"] == "ok"
+    assert flaky_assignments == [3]
+    assert [
+        (r["user_name"], r["status"]) for r in report["results"]["assign_profile"]
+    ] == [("user1", "assigned"), ("user2", "assigned"), ("user3", "assigned")]
+
+
+def test_regenerate_assigns_every_user_again(fake_agent, flaky_assignments):
+    with pytest.raises(Exception, match="assigned to 2/3 users"):
+        asyncio.run(build("profile-regenerate"))
+
+    flaky_assignments.clear()
+    report = asyncio.run(build("profile-regenerate", regenerate=True))
+
+    assert report["status"] == "ok"
+    assert sorted(flaky_assignments) == [1, 2, 3]
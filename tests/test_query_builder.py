@@ -0,0 +1,94 @@
+import pytest
+from query_builder import (
+    QuerySpec,
+    bind_sql,
+    build_condition,
+    build_data_query,
+    sql_literal,
+)
+
+SERVICE = ("demo", "app0", "db0", "service0", "1.0.0")
+
+
+def test_literals_escape_quotes():
+    assert sql_literal("O'Brien") == "'O''Brien'"
+    assert sql_literal(None) == "NULL"
+    assert sql_literal(True) == "1"
+    assert sql_literal(2.5) == "2.5"
+
+
+@pytest.mark.parametrize(
+    "operator, value, expected",
+    [
+        ("=", "CA", "state = 'CA'"),
+        ("!=", "CA", "state <> 'CA'"),
+        ("in", "CA, NY", "state IN ('CA', 'NY')"),
+        ("is null", None, "state IS NULL"),
+        ("contains", "A", "state LIKE '%A%' ESCAPE '!'"),
+        ("starts with", "C", "state LIKE 'C%' ESCAPE '!'"),
+    ],
+)
+def test_conditions(operator, value, expected):
+    assert build_condition("state", operator, value) == expected
+
+
+def test_like_wildcards_in_values_are_escaped():
+    assert build_condition("note", "contains", "50%") == "note LIKE '%50!%%' ESCAPE '!'"
+    assert build_condition("note", "starts with", "a_b!") == (
+        "note LIKE 'a!_b!!%' ESCAPE '!'"
+    )
+
+
+@pytest.mark.parametrize("column", ["a; drop table x", "1a", "a b", ""])
+def test_invalid_columns_are_rejected(column):
+    with pytest.raises(ValueError, match="Invalid column name"):
+        build_condition(column, "=", 1)
+
+
+def test_unsupported_operator_is_rejected():
+    with pytest.raises(ValueError, match="Unsupported filter operator"):
+        build_condition("a", "~", 1)
+
+
+def test_bound_values_are_never_reinterpreted():
+    assert bind_sql("a = :a AND b = :b", a=":b", b="x") == "a = ':b' AND b = 'x'"
+    with pytest.raises(ValueError, match="Missing value"):
+        bind_sql("a = :a")
+
+
+@pytest.mark.parametrize("column", [None, ""])
+def test_order_by_without_a_column_is_a_no_op(column):
+    spec = QuerySpec().order_by("id").order_by(column, "desc")
+
+    assert spec.fields()["orderby"] == "id ASC"
+    assert "orderby" not in QuerySpec().order_by(column).fields()
+
+
+def test_data_query_skips_blank_filter_rows():
+    spec = build_data_query(["id"], [["", "", ""], ["state", "=", "CA"]], "", "asc")
+
+    assert spec.fields() == {
+        "where": "state = 'CA'",
+        "from": 1,
+        "to": 100,
+        "columns": "id",
+    }
+
+
+def test_equal_specs_share_a_cache_key():
+    first = build_data_query(["id"], [["state", "=", "CA"]], "id", "desc")
+    second = build_data_query(["id"], [["state", "=", "CA"]], "id", "desc")
+
+    assert first.cache_key() == second.cache_key()
+    assert first.cache_key() != first.page(1, 50).cache_key()
+
+
+def test_like_filters_match_wildcards_literally(client, access_token):
+    def names(operator, value):
+        query = build_data_query(["name"], [["name", operator, value]])
+        return [
+            row["name"] for row in client.get_data(access_token, *SERVICE, query=query)
+        ]
+
+    assert names("starts with", "item 1") and names("starts with", "item 1_") == []
+    assert names("contains", "1%") == []
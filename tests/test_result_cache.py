@@ -0,0 +1,146 @@
+import json
+import os
+import time
+import numpy
+import pytest
+import main
+import result_cache as result_cache_module
+from query_builder import build_data_query
+from result_cache import META_FILE, ResultCache, result_cache
+from result_decoder import ColumnarTable
+
+SERVICE = ("demo", "app0", "db0", "service0", "1.0.0")
+ROWS = [
+    {"id": 1, "amount": 1.5, "active": True, "name": "a", "tags": ["x"]},
+    {"id": 2, "amount": None, "active": False, "name": None, "tags": []},
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(directory=str(tmp_path), ttl=60, max_bytes=10**9)
+
+
+def age(cache, key, seconds):
+    """Make an entry look `seconds` older, both fetched and last read."""
+    meta_path = os.path.join(cache.directory, key, META_FILE)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta["created_at"] -= seconds
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    read_at = time.time() - seconds
+    os.utime(meta_path, (read_at, read_at))
+
+
+def test_tables_round_trip_with_their_dtypes(cache):
+    table = ColumnarTable.from_rows(ROWS)
+
+    cache.put("key", table, SERVICE)
+    cached = cache.get("key")
+
+    assert cached.column_names == table.column_names
+    assert len(cached) == 2
+    for name, column in table.columns.items():
+        assert cached.columns[name].dtype == column.dtype
+    assert isinstance(cached.columns["id"], numpy.memmap)
+    assert cached.to_pandas().equals(table.to_pandas())
+    assert cache.stats()["hits"] == 1
+
+
+def test_keys_cover_the_query_window_and_identity(cache, monkeypatch):
+    query = build_data_query(["id"], [["state", "=", "CA"]])
+    base = cache.key(*SERVICE, query=query, limit=100)
+
+    assert cache.key(*SERVICE, query=query, limit=100) == base
+    different = {
+        cache.key(*SERVICE, limit=100),
+        cache.key(*SERVICE, query=query.page(1, 50), limit=100),
+        cache.key(*SERVICE, query=query, limit=50),
+        cache.key(*SERVICE, query=query, limit=100, start=101),
+        cache.key(*SERVICE[:-1], "2.0.0", query=query, limit=100),
+    }
+    assert base not in different and len(different) == 5
+
+    monkeypatch.setenv("ABSTRACTA_FOR_USER", "someone-else")
+    assert cache.key(*SERVICE, query=query, limit=100) != base
+    monkeypatch.undo()
+    monkeypatch.setattr(result_cache_module, "ABSTRACTA_API_URL", "http://other")
+    assert cache.key(*SERVICE, query=query, limit=100) != base
+
+
+def test_expired_entries_are_dropped(cache):
+    cache.put("key", ColumnarTable.from_rows(ROWS), SERVICE)
+    age(cache, "key", 61)
+
+    assert cache.get("key") is None
+    assert not os.path.exists(os.path.join(cache.directory, "key"))
+
+
+def test_least_recently_read_entries_are_evicted(cache):
+    table = ColumnarTable.from_rows(ROWS)
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.put(key, table, SERVICE)
+        age(cache, key, 30 - i)
+    # Reading "a" makes "b" the least recently read.
+    cache.get("a")
+    entry_size = sum(
+        entry.stat().st_size for entry in os.scandir(os.path.join(cache.directory, "a"))
+    )
+    # Room for three entries, with slack: the metadata of each differs by a
+    # few bytes (timestamps).
+    cache.max_bytes = 3 * entry_size + entry_size // 2
+
+    cache.put("d", table, SERVICE)
+
+    assert [cache.get(key) is None for key in "abcd"] == [False, True, False, False]
+
+
+def test_invalidate_drops_every_entry_below_a_path(cache):
+    table = ColumnarTable.from_rows(ROWS)
+    cache.put("v1", table, SERVICE)
+    cache.put("v2", table, (*SERVICE[:-1], "2.0.0"))
+    cache.put("other", table, ("demo", "app1", "db0", "service1", "1.0.0"))
+
+    cache.invalidate(*SERVICE)
+    assert [cache.get(key) is None for key in ("v1", "v2", "other")] == [
+        True,
+        False,
+        False,
+    ]
+    cache.invalidate("demo", "app0")
+    assert cache.get("v2") is None and cache.get("other") is not None
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+
+
+def test_unreadable_entries_are_discarded(cache):
+    cache.put("key", ColumnarTable.from_rows(ROWS), SERVICE)
+    with open(os.path.join(cache.directory, "key", "0.npy"), "wb") as f:
+        f.write(b"not an array")
+
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResultCache(directory=str(tmp_path), enabled=False)
+    cache.put("key", ColumnarTable.from_rows(ROWS), SERVICE)
+
+    assert cache.get("key") is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_previews_are_served_from_the_cache_until_reloaded(fake_server):
+    requests = fake_server.app.state.fake.stats
+    result_cache.invalidate(*SERVICE)
+
+    first = main.get_data(*SERVICE)[1]["value"]
+    before = requests["requests"]
+    cached = main.get_data(*SERVICE)[1]["value"]
+    served_from_cache = requests["requests"] - before
+    main.get_data(*SERVICE, refresh=True)
+
+    assert cached.equals(first)
+    assert served_from_cache == 0
+    assert requests["requests"] - before > served_from_cache
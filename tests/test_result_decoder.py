@@ -0,0 +1,103 @@
+import numpy
+from conftest import ROWS
+from result_decoder import ColumnarTable, decode_json, encode_json, rows_to_dataframe
+
+SERVICE = ("demo", "app0", "db0", "service0", "1.0.0")
+
+
+def dtypes(rows):
+    table = ColumnarTable.from_rows(rows)
+    return {name: column.dtype for name, column in table.columns.items()}
+
+
+def test_columns_get_the_narrowest_dtype():
+    rows = [
+        {"i": 1, "f": 1.5, "b": True, "s": "a", "mixed": 1, "n": None},
+        {"i": 2, "f": 2, "b": False, "s": "b", "mixed": "x", "n": None},
+    ]
+
+    assert dtypes(rows) == {
+        "i": numpy.int64,
+        "f": numpy.float64,
+        "b": numpy.bool_,
+        "s": object,
+        "mixed": object,
+        "n": object,
+    }
+
+
+def test_nulls_in_numeric_columns_become_nan():
+    table = ColumnarTable.from_rows([{"n": 1}, {"n": None}])
+
+    assert table.columns["n"].dtype == numpy.float64
+    assert numpy.isnan(table.columns["n"][1])
+
+
+def test_nulls_in_boolean_columns_keep_them_as_objects():
+    table = ColumnarTable.from_rows([{"b": True}, {"b": None}])
+
+    assert table.columns["b"].tolist() == [True, None]
+
+
+def test_integers_too_large_for_int64_are_kept_exact():
+    table = ColumnarTable.from_rows([{"i": 2**70}, {"i": 1}])
+
+    assert table.columns["i"].tolist() == [2**70, 1]
+
+
+def test_missing_keys_are_filled_with_nulls():
+    table = ColumnarTable.from_batches([[{"a": "x"}], [{"b": "y"}, {"a": "z"}]])
+
+    assert len(table) == 3
+    assert table.columns["a"].tolist() == ["x", None, "z"]
+    assert table.columns["b"].tolist() == [None, "y", None]
+
+
+def test_nested_dq_fields_are_flattened():
+    rows = [{"id": 1, "_dq": {"status": "ok", "checks": {"ISNULL": False}}}]
+
+    assert ColumnarTable.from_rows(rows).column_names == [
+        "id",
+        "_dq.status",
+        "_dq.checks.ISNULL",
+    ]
+
+
+def test_unprefixed_leaves_do_not_clobber_columns():
+    rows = [{"status": "new", "_dq": {"status": "ok", "score": 1}}]
+
+    table = ColumnarTable.from_rows(rows, flatten_prefix=False)
+
+    assert table.column_names == ["status", "_dq.status", "score"]
+    assert table.columns["status"].tolist() == ["new"]
+
+
+def test_flatten_can_be_disabled():
+    rows = [{"_dq": {"status": "ok"}}]
+
+    df = rows_to_dataframe(rows, flatten=())
+
+    assert list(df.columns) == ["_dq"]
+    assert df["_dq"][0] == {"status": "ok"}
+
+
+def test_json_round_trip_falls_back_to_str():
+    value = {"a": [1, 2.5, None], "b": numpy.datetime64("2024-01-02")}
+
+    assert decode_json(encode_json(value)) == {
+        "a": [1, 2.5, None],
+        "b": "2024-01-02",
+    }
+
+
+def test_service_pages_decode_into_one_table(client, access_token):
+    table = ColumnarTable.from_batches(
+        client.iter_data(access_token, *SERVICE, page_size=1000, batches=True),
+        flatten=(),
+    )
+    df = table.to_pandas()
+
+    assert len(table) == ROWS
+    assert df["id"].tolist() == list(range(1, ROWS + 1))
+    assert df["id"].dtype == numpy.int64
+    assert df["amount"].dtype == numpy.float64
@@ -0,0 +1,184 @@
+import asyncio
+import threading
+import time
+import pytest
+import requests
+from abstracta_async_client import AsyncAbstractaClient
+from single_flight import AsyncSingleFlight, SingleFlight
+
+SERVICE = ("demo", "app0", "db0", "service0", "1.0.0")
+
+
+@pytest.fixture
+def latency(fake_server):
+    """Slow responses, so concurrent identical reads overlap."""
+    requests.post(f"{fake_server.base_url}/_fake/config", json={"latency_ms": 200})
+    yield fake_server.app.state.fake.stats
+    requests.post(f"{fake_server.base_url}/_fake/config", json={"latency_ms": 0})
+
+
+def run_together(count, fn):
+    """Call `fn` from `count` threads released at once; return the results."""
+    start = threading.Barrier(count)
+    results = [None] * count
+
+    def call(i):
+        start.wait()
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def slow(result, calls):
+    def fn():
+        calls.append(1)
+        time.sleep(0.2)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return fn
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(enabled=True)
+    calls = []
+    result = object()
+
+    results = run_together(8, lambda: flight.do("key", slow(result, calls)))
+
+    assert all(r is result for r in results)
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_waiters_receive_the_leaders_error():
+    flight = SingleFlight(enabled=True)
+    calls = []
+    error = Exception("upstream failed")
+
+    results = run_together(4, lambda: flight.do("key", slow(error, calls)))
+
+    assert all(r is error for r in results)
+    assert len(calls) == 1
+
+
+def test_different_keys_and_later_calls_run_again():
+    flight = SingleFlight(enabled=True)
+    calls = []
+
+    run_together(2, lambda: flight.do(threading.get_ident(), slow(1, calls)))
+    flight.do("key", slow(1, calls))
+    flight.do("key", slow(1, calls))
+
+    assert len(calls) == 4
+
+
+def test_disabled_single_flight_runs_every_call():
+    flight = SingleFlight(enabled=False)
+    calls = []
+
+    run_together(4, lambda: flight.do("key", slow(1, calls)))
+
+    assert len(calls) == 4
+
+
+def test_concurrent_tasks_share_one_execution():
+    flight = AsyncSingleFlight(enabled=True)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def all_fetch():
+        return await asyncio.gather(*(flight.do("key", fetch) for _ in range(8)))
+
+    assert asyncio.run(all_fetch()) == ["result"] * 8
+    assert len(calls) == 1
+    assert flight.stats() == {"executed": 1, "coalesced": 7, "in_flight": 0}
+
+
+def test_cancelled_waiter_does_not_cancel_the_others():
+    flight = AsyncSingleFlight(enabled=True)
+    finished = []
+
+    async def fetch():
+        await asyncio.sleep(0.1)
+        finished.append(1)
+        return "result"
+
+    async def cancel_one():
+        first = asyncio.create_task(flight.do("key", fetch))
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(cancel_one()) == ("result", True)
+    assert finished == [1]
+
+
+def test_call_is_cancelled_with_its_last_waiter():
+    flight = AsyncSingleFlight(enabled=True)
+    cancelled = []
+
+    async def fetch():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def cancel_all():
+        waiters = [asyncio.create_task(flight.do("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0)
+
+    asyncio.run(cancel_all())
+
+    assert cancelled == [1]
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_identical_concurrent_reads_reach_the_server_once(
+    client, access_token, latency
+):
+    url = client.generate_api_url(*SERVICE)
+    before = latency["requests"]
+
+    pages = run_together(
+        8, lambda: client.get_data_from_api_url(access_token, url, to=50)
+    )
+
+    assert all(page == pages[0] for page in pages)
+    assert latency["requests"] - before == 1
+
+
+def test_identical_concurrent_async_reads_reach_the_server_once(latency):
+    async def read_all():
+        client = AsyncAbstractaClient()
+        access_token = await client.perform_auth()
+        url = client.generate_api_url(*SERVICE)
+        before = latency["requests"]
+        pages = await asyncio.gather(
+            *(client.get_data_from_api_url(access_token, url, to=50) for _ in range(8))
+        )
+        return pages, latency["requests"] - before
+
+    pages, requests_made = asyncio.run(read_all())
+
+    assert all(page == pages[0] for page in pages)
+    assert requests_made == 1
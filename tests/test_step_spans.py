@@ -0,0 +1,119 @@
+import asyncio
+import time
+import pytest
+from agents import (
+    TracingProcessor,
+    custom_span,
+    get_current_trace,
+    set_trace_processors,
+    set_tracing_disabled,
+)
+from agents.tracing import default_processor
+from steps_executor import fn_report_waterfall, steps_executor
+
+NO_OUTPUTS = [lambda context: ""] * 4
+
+
+class Recorder(TracingProcessor):
+    def __init__(self):
+        self.traces = []
+        self.spans = []
+
+    def on_trace_start(self, trace):
+        self.traces.append(trace)
+
+    def on_trace_end(self, trace):
+        pass
+
+    def on_span_start(self, span):
+        pass
+
+    def on_span_end(self, span):
+        self.spans.append(span)
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self):
+        pass
+
+
+@pytest.fixture
+def tracing():
+    recorder = Recorder()
+    set_tracing_disabled(False)
+    set_trace_processors([recorder])
+    yield recorder
+    set_trace_processors([default_processor()])
+    set_tracing_disabled(True)
+
+
+def step(key, func, **options):
+    return {"key": key, "name": key, "func": func, "yield": NO_OUTPUTS, **options}
+
+
+async def run(steps, **kwargs):
+    report = {}
+    async for _ in steps_executor(steps, report=report, **kwargs):
+        pass
+    return report
+
+
+def test_step_spans_nest_under_the_pipeline_trace(tracing):
+    async def agent(context):
+        # Stands in for Runner.run, which opens spans of its own.
+        with custom_span("model call"):
+            await asyncio.sleep(0.01)
+        return "payload"
+
+    async def failing(context):
+        raise Exception("create failed")
+
+    async def pipeline():
+        with pytest.raises(Exception, match="create failed"):
+            await run(
+                [step("agent", agent), step("create", failing)], trace_name="pipeline"
+            )
+        return get_current_trace()
+
+    assert asyncio.run(pipeline()) is None
+
+    (trace,) = tracing.traces
+    spans = {span.span_data.name: span for span in tracing.spans}
+    assert {span.trace_id for span in spans.values()} == {trace.trace_id}
+    assert spans["agent"].parent_id is None
+    assert spans["model call"].parent_id == spans["agent"].span_id
+    assert spans["agent"].span_data.data["status"] == "ok"
+    assert spans["create"].error["message"] == "create failed"
+
+
+def test_offloaded_steps_count_as_busy():
+    def crunch(context):
+        time.sleep(0.1)
+        return "done"
+
+    async def wait(context):
+        await asyncio.sleep(0.1)
+
+    report = asyncio.run(
+        run([step("crunch", crunch, blocking=True), step("wait", wait)])
+    )
+
+    crunched, waited = report["steps"]
+    assert crunched["offloaded"] and not waited["offloaded"]
+    assert crunched["busy_seconds"] == crunched["wall_seconds"]
+    assert crunched["io_wait_seconds"] == 0
+    assert waited["io_wait_seconds"] > 0.05
+
+
+def test_waterfall_labels_offloaded_steps():
+    from step_spans import StepSpan
+
+    spans = [
+        StepSpan("a", "Crunch", 0, 0.1, 0.1, 10, "ok", offloaded=True),
+        StepSpan("b", "Wait", 0.1, 0.2, 0.01, 10, "ok"),
+    ]
+
+    html = fn_report_waterfall(spans)
+
+    assert "offloaded" in html and "0.19s io wait" in html
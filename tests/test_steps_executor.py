@@ -0,0 +1,292 @@
+import asyncio
+import threading
+import gradio as gr
+import pytest
+from abstracta_async_client import AsyncAbstractaClient
+from result_decoder import rows_to_dataframe
+from step_checkpoints import step_checkpoints
+from steps_executor import _active_runs, steps_executor
+
+NO_OUTPUTS = [lambda context: ""] * 4
+
+
+class Recorder:
+    """Step functions that log when they start, finish or are cancelled."""
+
+    def __init__(self):
+        self.events = []
+        self.failing = set()
+
+    def step(self, key, seconds=0.0, **options):
+        async def func(context):
+            self.events.append(("start", key))
+            try:
+                await asyncio.sleep(seconds)
+            except asyncio.CancelledError:
+                self.events.append(("cancelled", key))
+                raise
+            if key in self.failing:
+                raise Exception(f"{key} failed")
+            self.events.append(("end", key))
+            return f"{key} result"
+
+        return {"key": key, "name": key, "func": func, "yield": NO_OUTPUTS, **options}
+
+    def index(self, event, key):
+        return self.events.index((event, key))
+
+    def started(self):
+        return [key for event, key in self.events if event == "start"]
+
+
+async def run(steps, report=None, **kwargs):
+    """Run `steps` headless and return the report."""
+    report = {} if report is None else report
+    async for _ in steps_executor(steps, report=report, **kwargs):
+        pass
+    return report
+
+
+def test_steps_run_after_their_dependencies():
+    recorder = Recorder()
+    steps = [
+        recorder.step("llm", 0.2, depends_on=[]),
+        recorder.step("auth", 0.1, depends_on=[]),
+        recorder.step("create", depends_on=["llm", "auth"]),
+        recorder.step("url", depends_on=["llm"]),
+        # Without "depends_on" a step waits for the one listed before it.
+        recorder.step("grant"),
+    ]
+
+    report = asyncio.run(run(steps))
+
+    assert report["status"] == "ok"
+    assert report["results"]["create"] == "create result"
+    # Independent steps overlap.
+    assert recorder.index("start", "auth") < recorder.index("end", "llm")
+    assert recorder.index("start", "create") > recorder.index("end", "llm")
+    assert recorder.index("start", "create") > recorder.index("end", "auth")
+    assert recorder.index("start", "url") > recorder.index("end", "llm")
+    assert recorder.index("start", "grant") > recorder.index("end", "url")
+
+
+def test_unknown_dependencies_raise():
+    recorder = Recorder()
+    with pytest.raises(ValueError, match="unknown steps"):
+        asyncio.run(run([recorder.step("a", depends_on=["missing"])]))
+
+
+def test_dependency_cycles_raise():
+    recorder = Recorder()
+    steps = [recorder.step("a", depends_on=["b"]), recorder.step("b", depends_on=["a"])]
+    report = {}
+
+    with pytest.raises(ValueError, match="unsatisfiable"):
+        asyncio.run(run(steps, report))
+
+    assert report["status"] == "error"
+    assert recorder.events == []
+
+
+def test_failed_step_cancels_the_others():
+    recorder = Recorder()
+    recorder.failing.add("bad")
+    steps = [
+        recorder.step("slow", 5, depends_on=[]),
+        recorder.step("bad", 0.05, depends_on=[]),
+    ]
+    report = {}
+
+    with pytest.raises(Exception, match="bad failed"):
+        asyncio.run(run(steps, report))
+
+    assert report["status"] == "error"
+    assert ("cancelled", "slow") in recorder.events
+
+
+def test_retry_resumes_from_the_failed_step():
+    recorder = Recorder()
+    recorder.failing.add("create")
+    steps = [
+        recorder.step("llm", depends_on=[]),
+        recorder.step("auth", depends_on=[], checkpoint=False),
+        recorder.step("create", depends_on=["llm", "auth"]),
+    ]
+    run_id = "test-resume"
+    step_checkpoints.discard(run_id)
+
+    with pytest.raises(Exception, match="create failed"):
+        asyncio.run(run(steps, run_id=run_id))
+    assert step_checkpoints.load(run_id) == {"llm": "llm result"}
+
+    recorder.events.clear()
+    recorder.failing.clear()
+    report = asyncio.run(run(steps, run_id=run_id))
+
+    assert report["status"] == "ok"
+    # The agent step is reused; the token is never checkpointed.
+    assert recorder.started() == ["auth", "create"]
+    assert [span["status"] for span in report["steps"]] == ["resumed", "ok", "ok"]
+    assert step_checkpoints.load(run_id) == {}
+
+
+def test_step_timeout():
+    recorder = Recorder()
+    report = {}
+
+    with pytest.raises(TimeoutError, match="'slow' timed out"):
+        asyncio.run(run([recorder.step("slow", 5, timeout=0.1)], report))
+
+    assert report["status"] == "error"
+
+
+def test_pipeline_timeout_cancels_running_steps():
+    recorder = Recorder()
+    steps = [recorder.step("a", 5, depends_on=[]), recorder.step("b", 5, depends_on=[])]
+    report = {}
+
+    with pytest.raises(TimeoutError, match="Pipeline timed out"):
+        asyncio.run(run(steps, report, timeout=0.2))
+
+    assert report["status"] == "timeout"
+    assert {("cancelled", "a"), ("cancelled", "b")} <= set(recorder.events)
+
+
+def test_newer_run_supersedes_the_previous_one():
+    recorder = Recorder()
+
+    async def both():
+        old = asyncio.create_task(run([recorder.step("old", 5)], cancel_key="session"))
+        await asyncio.sleep(0.05)
+        new = await run([recorder.step("new", 0.05)], cancel_key="session")
+        return await old, new
+
+    old, new = asyncio.run(both())
+
+    assert old["status"] == "superseded"
+    assert new["status"] == "ok"
+    assert ("cancelled", "old") in recorder.events
+    assert "session" not in _active_runs
+
+
+def test_closing_the_generator_cancels_running_steps():
+    recorder = Recorder()
+
+    async def abandon():
+        # Gradio stops reading and closes the generator when the tab closes.
+        steps = steps_executor([recorder.step("slow", 5)])
+        await steps.__anext__()
+        await asyncio.sleep(0.05)
+        await steps.aclose()
+
+    asyncio.run(abandon())
+
+    assert recorder.events == [("start", "slow"), ("cancelled", "slow")]
+
+
+def test_plain_function_returning_a_coroutine_is_awaited():
+    async def fetch(context):
+        await asyncio.sleep(0)
+        return "fetched"
+
+    steps = [
+        {
+            "key": "fetch",
+            "name": "Fetch",
+            "func": lambda context: fetch(context),
+            "yield": NO_OUTPUTS,
+        },
+        {
+            "key": "plain",
+            "name": "Plain",
+            "func": lambda context: context["fetch"].upper(),
+            "yield": NO_OUTPUTS,
+        },
+    ]
+
+    report = asyncio.run(run(steps))
+
+    assert report["results"] == {"fetch": "fetched", "plain": "FETCHED"}
+    assert not any(span["offloaded"] for span in report["steps"])
+
+
+def test_blocking_steps_run_off_the_loop():
+    loop_thread = threading.get_ident()
+    steps = [
+        {
+            "key": "crunch",
+            "name": "Crunch",
+            "func": lambda context: threading.get_ident(),
+            "blocking": True,
+            "yield": NO_OUTPUTS,
+        }
+    ]
+
+    report = asyncio.run(run(steps))
+
+    assert report["results"]["crunch"] != loop_thread
+    assert report["steps"][0]["offloaded"]
+
+
+SERVICE = ("demo", "app0", "db0", "service0", "1.0.0")
+
+
+def preview_steps():
+    """Fetch a page from the fake server, then two steps that show it again."""
+    client = AsyncAbstractaClient()
+
+    async def rows(context):
+        access_token = await client.perform_auth()
+        return await client.get_data_from_api_url(
+            access_token, client.generate_api_url(*SERVICE), to=20
+        )
+
+    outputs = [
+        lambda context: client.generate_api_url(*SERVICE),
+        lambda context: "",
+        lambda context: gr.update(
+            value=rows_to_dataframe(context["rows"]), visible=True
+        ),
+        lambda context: gr.update(visible=False),
+    ]
+    return [
+        {"key": "rows", "name": "Rows", "func": rows, "yield": outputs},
+        {
+            "key": "count",
+            "name": "Count",
+            "func": lambda c: len(c["rows"]),
+            "yield": outputs,
+        },
+        {"key": "done", "name": "Done", "func": lambda c: True, "yield": outputs},
+    ]
+
+
+async def collect(steps, **kwargs):
+    return [update async for update in steps_executor(steps, **kwargs)]
+
+
+def sent(updates, position):
+    """Updates that set a value at `position`, rather than keeping it."""
+    return [update[position] for update in updates if update[position] != gr.update()]
+
+
+def test_unchanged_outputs_are_sent_once():
+    steps = preview_steps()
+    url = steps[0]["yield"][0](None)
+
+    updates = asyncio.run(collect(steps))
+
+    dataframes = [output for output in sent(updates, 3) if "value" in output]
+    assert len(dataframes) == 1
+    assert list(dataframes[0]["value"]["id"]) == list(range(1, 21))
+    assert sent(updates, 1) == ["", url]
+
+
+def test_full_outputs_without_delta_updates():
+    updates = asyncio.run(collect(preview_steps(), delta_updates=False))
+
+    first = next(i for i, update in enumerate(updates) if "value" in update[3])
+    # Every later update repeats the DataFrame.
+    assert all("value" in update[3] for update in updates[first:])
+    assert len(updates) - first > 1
+    assert gr.update() not in [update[1] for update in updates]
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import pytest
+from abstracta_async_client import AsyncAbstractaClient
+from abstracta_client import TokenManager
+
+
+class CountingFetch:
+    """Token fetch against the fake server that counts its calls."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.client.request_access_token()
+
+
+@pytest.fixture
+def fetch(client):
+    return CountingFetch(client)
+
+
+def test_token_is_reused_until_it_is_stale(fetch):
+    tokens = TokenManager(refresh_margin=30)
+
+    first = tokens.get_token(fetch)
+
+    assert tokens.get_token(fetch) == first
+    assert fetch.calls == 1
+
+
+def test_token_within_the_refresh_margin_is_refreshed(fetch):
+    # The fake issues tokens valid for 300s, all inside this margin.
+    tokens = TokenManager(refresh_margin=600)
+
+    first = tokens.get_token(fetch)
+
+    assert tokens.get_token(fetch) != first
+    assert fetch.calls == 2
+
+
+def test_force_refresh_and_invalidate_fetch_a_new_token(fetch):
+    tokens = TokenManager()
+    first = tokens.get_token(fetch)
+
+    second = tokens.get_token(fetch, force_refresh=True)
+    tokens.invalidate()
+    third = tokens.get_token(fetch)
+
+    assert len({first, second, third}) == 3
+    assert fetch.calls == 3
+
+
+def test_new_credentials_fetch_a_new_token(fetch, monkeypatch):
+    tokens = TokenManager()
+    first = tokens.get_token(fetch)
+
+    monkeypatch.setenv("ABSTRACTA_CLIENT_ID", "someone-else")
+
+    assert tokens.get_token(fetch) != first
+    assert fetch.calls == 2
+
+
+def test_concurrent_threads_share_one_refresh(fetch):
+    tokens = TokenManager()
+    start = threading.Barrier(8)
+    results = []
+
+    def get():
+        start.wait()
+        results.append(tokens.get_token(fetch))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(results)) == 1
+    assert fetch.calls == 1
+
+
+def test_concurrent_tasks_share_one_refresh():
+    tokens = TokenManager()
+    client = AsyncAbstractaClient()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        return await client.request_access_token()
+
+    async def get_all():
+        return await asyncio.gather(*(tokens.get_token_async(fetch) for _ in range(8)))
+
+    assert len(set(asyncio.run(get_all()))) == 1
+    assert calls == 1
+
+
+def test_cached_token_is_accepted_by_the_server(client):
+    from abstracta_client import ABSTRACTA_API_URL
+
+    access_token = client.perform_auth()
+
+    assert client.perform_auth() == access_token
+    rows = client.get_data_from_api_url(
+        access_token, f"{ABSTRACTA_API_URL}/demo/app0/db0/service0/1.0.0", to=5
+    )
+    assert len(rows) == 5
@@ -0,0 +1,102 @@
+import asyncio
+import time
+import pytest
+import requests
+from conftest import ROWS
+from abstracta_async_client import AsyncAbstractaClient
+from abstracta_transport import close_async_transport
+from update_coalescing import coalesce, coalesced
+
+SERVICE = ("demo", "app0", "db0", "service0", "1.0.0")
+
+
+@pytest.fixture
+def latency(fake_server):
+    """A few milliseconds per request, so pages arrive over several intervals."""
+    requests.post(f"{fake_server.base_url}/_fake/config", json={"latency_ms": 5})
+    yield
+    requests.post(f"{fake_server.base_url}/_fake/config", json={"latency_ms": 0})
+
+
+async def rows_loaded(service=SERVICE):
+    """Progress text after each page read from the fake server."""
+    client = AsyncAbstractaClient()
+    access_token = await client.perform_auth()
+    loaded = 0
+    try:
+        async for page in client.read_data_parallel(
+            access_token, client.generate_api_url(*service), page_size=50
+        ):
+            loaded += len(page)
+            yield f"{loaded} rows loaded"
+    finally:
+        await close_async_transport()
+
+
+async def collect(updates):
+    return [(value, time.monotonic()) async for value in updates]
+
+
+def test_fast_updates_are_merged_and_the_last_is_kept(latency):
+    sent = asyncio.run(collect(coalesce(rows_loaded(), min_interval=0.05)))
+
+    values = [value for value, _ in sent]
+    assert values[-1] == f"{ROWS} rows loaded"
+    assert len(values) < ROWS // 50
+    # Each update is a full replacement, so merging keeps them in order.
+    counts = [int(value.split()[0]) for value in values]
+    assert counts == sorted(counts)
+    gaps = [b - a for (_, a), (_, b) in zip(sent, sent[1:-1])]
+    assert all(gap >= 0.045 for gap in gaps)
+
+
+def test_updates_are_spaced_by_their_size():
+    async def pages():
+        for i in range(5):
+            yield "x" * 1000
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.3)
+
+    sent = asyncio.run(
+        collect(coalesce(pages(), min_interval=0, max_bytes_per_second=10_000))
+    )
+
+    # 1000 bytes at 10 kB/s take 0.1s: the first goes out at once, the
+    # other four are merged into one sent when that time is up.
+    assert len(sent) == 2
+    assert sent[1][1] - sent[0][1] >= 0.09
+
+
+def test_last_value_is_sent_before_an_error():
+    async def progress_then_fail():
+        async for value in rows_loaded():
+            yield value
+        async for value in rows_loaded(("demo", "app0", "db0", "nope", "1.0.0")):
+            yield value
+
+    @coalesced(min_interval=60)
+    async def slow_ui():
+        async for value in progress_then_fail():
+            yield value
+
+    sent = []
+
+    async def consume():
+        async for value in slow_ui():
+            sent.append(value)
+
+    with pytest.raises(Exception, match="Failed to get data"):
+        asyncio.run(consume())
+
+    assert sent == ["50 rows loaded", f"{ROWS} rows loaded"]
+
+
+def test_typewriter_effect_sends_the_whole_text_in_fewer_updates():
+    from main import typewriter_effect
+
+    text = "Create an API for the orders table"
+
+    sent = asyncio.run(collect(typewriter_effect(text)))
+
+    assert sent[-1][0] == text
+    assert len(sent) < len(text) / 2
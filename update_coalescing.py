@@ -0,0 +1,98 @@
+import asyncio
+import functools
+import os
+
+# Shortest time between two updates sent by a coalesced generator.
+ABSTRACTA_UI_MIN_INTERVAL = float(os.getenv("ABSTRACTA_UI_MIN_INTERVAL", "0.1"))
+# Upper bound on the update bytes a coalesced generator sends per second; 0 disables it.
+ABSTRACTA_UI_MAX_BYTES_PER_SECOND = int(
+    os.getenv("ABSTRACTA_UI_MAX_BYTES_PER_SECOND", str(256 * 1024))
+)
+
+_NOTHING = object()
+
+
+def update_size(value) -> int:
+    """Approximate bytes an update puts on the wire (its text content)."""
+    if isinstance(value, str):
+        return len(value.encode())
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(update_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(update_size(item) for item in value)
+    return 0
+
+
+async def coalesce(
+    updates,
+    min_interval: float = ABSTRACTA_UI_MIN_INTERVAL,
+    max_bytes_per_second: int = ABSTRACTA_UI_MAX_BYTES_PER_SECOND,
+):
+    """
+    Re-yield the values of the async generator `updates`, at most one per
+    `min_interval` seconds and within `max_bytes_per_second`.
+
+    Values produced while the previous one is still "on the wire" replace
+    each other, and the newest is sent when the interval is over, so the
+    last value is never lost. Only use this for generators whose every value
+    replaces the previous one in full (not for delta updates, where a
+    dropped value would be missing from the page).
+    """
+    loop = asyncio.get_running_loop()
+    iterator = updates.__aiter__()
+    next_value = None  # task reading the next value from `updates`
+    latest = _NOTHING
+    send_at = 0.0
+    try:
+        while True:
+            if next_value is None:
+                next_value = asyncio.ensure_future(iterator.__anext__())
+            timeout = None if latest is _NOTHING else max(send_at - loop.time(), 0)
+            done, _ = await asyncio.wait({next_value}, timeout=timeout)
+            if next_value in done:
+                task, next_value = next_value, None
+                try:
+                    latest = task.result()
+                except StopAsyncIteration:
+                    break
+                except Exception:
+                    # Show the last state (often the error message) before failing.
+                    if latest is not _NOTHING:
+                        yield latest
+                    raise
+                if loop.time() < send_at:
+                    continue
+            yield latest
+            delay = min_interval
+            if max_bytes_per_second:
+                delay = max(delay, update_size(latest) / max_bytes_per_second)
+            send_at = loop.time() + delay
+            latest = _NOTHING
+        if latest is not _NOTHING:
+            yield latest
+    finally:
+        if next_value is not None:
+            next_value.cancel()
+            await asyncio.gather(next_value, return_exceptions=True)
+        await updates.aclose()
+
+
+def coalesced(
+    min_interval: float = ABSTRACTA_UI_MIN_INTERVAL,
+    max_bytes_per_second: int = ABSTRACTA_UI_MAX_BYTES_PER_SECOND,
+):
+    """Decorate an async generator function so its values go through `coalesce`."""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            async for value in coalesce(
+                fn(*args, **kwargs), min_interval, max_bytes_per_second
+            ):
+                yield value
+
+        return wrapper
+
+    return decorator
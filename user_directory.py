@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+# Seconds before the directory is rebuilt from scratch, so deleted or renamed
+# users drop out of it. In between, unknown names only trigger a top-up with
+# users created since the last refresh.
+ABSTRACTA_USER_DIRECTORY_TTL = float(os.getenv("ABSTRACTA_USER_DIRECTORY_TTL", "300"))
+# Rows per queryv2 call when paging through vw_users.
+ABSTRACTA_USER_PAGE_SIZE = int(os.getenv("ABSTRACTA_USER_PAGE_SIZE", "1000"))
+
+
+class UserDirectory:
+    """
+    Hash index of Abstracta users keyed by `user_id`.
+
+    Users are merged in pages ordered by `user_sys_no`, so a refresh only
+    needs the users whose `user_sys_no` is above the highest one already
+    indexed. The directory is stale `ttl` seconds after the last full
+    rebuild; top-ups do not postpone it.
+    """
+
+    def __init__(self, ttl: float = ABSTRACTA_USER_DIRECTORY_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_user_id = {}
+        self._last_user_sys_no = None
+        self._rebuilt_at = None
+
+    @property
+    def last_user_sys_no(self):
+        return self._last_user_sys_no
+
+    def is_stale(self) -> bool:
+        return (
+            self._rebuilt_at is None or time.monotonic() - self._rebuilt_at > self.ttl
+        )
+
+    def merge(self, users, replace: bool = False):
+        """Add `users` rows to the index, or rebuild it from them when `replace`."""
+        by_user_id = {} if replace else dict(self._by_user_id)
+        last_user_sys_no = None if replace else self._last_user_sys_no
+        for user in users:
+            by_user_id[user["user_id"]] = user
+            if last_user_sys_no is None or user["user_sys_no"] > last_user_sys_no:
+                last_user_sys_no = user["user_sys_no"]
+        with self._lock:
+            self._by_user_id = by_user_id
+            self._last_user_sys_no = last_user_sys_no
+            if replace:
+                self._rebuilt_at = time.monotonic()
+
+    def find(self, user_names: list[str]):
+        """Return ({user_name: user row}, [user names not in the directory])."""
+        by_user_id = self._by_user_id
+        found = {}
+        missing = []
+        for user_name in user_names:
+            if user_name in by_user_id:
+                found[user_name] = by_user_id[user_name]
+            else:
+                missing.append(user_name)
+        return found, missing
+
+    def __len__(self):
+        return len(self._by_user_id)
+
+    def clear(self):
+        with self._lock:
+            self._by_user_id = {}
+            self._last_user_sys_no = None
+            self._rebuilt_at = None
+
+
+user_directory = UserDirectory()